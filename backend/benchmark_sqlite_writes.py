@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Multi-process SQLite write benchmark for UTOPAI.
+
+Runs the same award-style write transaction (update a user's counters and
+insert a progress row) from several processes at once, like gunicorn workers
+sharing src/database/app.db, once with SQLite's default settings and once with
+the PRAGMAs from src/services/sqlite_tuning.py. Each mode uses a fresh
+temporary database.
+
+Usage:
+  python benchmark_sqlite_writes.py [processes] [transactions per process]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, event, exc, text
+
+from src.services.sqlite_tuning import tune_sqlite_connection
+
+USERS = 50
+
+
+def _engine(path: str, tuned: bool):
+    engine = create_engine(f"sqlite:///{path}")
+    if tuned:
+        event.listen(engine, 'connect', lambda dbapi_connection, record: tune_sqlite_connection(dbapi_connection))
+    return engine
+
+
+def _setup(path: str, tuned: bool):
+    engine = _engine(path, tuned)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE user (id INTEGER PRIMARY KEY, total_points INTEGER NOT NULL, completed_count INTEGER NOT NULL)"
+        ))
+        connection.execute(text(
+            "CREATE TABLE user_progress (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, "
+            "activity_id INTEGER NOT NULL, score INTEGER, completed_at TIMESTAMP)"
+        ))
+        connection.execute(text("INSERT INTO user (id, total_points, completed_count) VALUES (:id, 0, 0)"),
+                           [{'id': user_id} for user_id in range(1, USERS + 1)])
+    engine.dispose()
+
+
+def _worker(path: str, tuned: bool, transactions: int, worker_id: int, results):
+    engine = _engine(path, tuned)
+    committed = locked = 0
+    for i in range(transactions):
+        user_id = (worker_id * transactions + i) % USERS + 1
+        try:
+            with engine.begin() as connection:
+                # Write first, as the app's award path does, so the write lock is taken up front
+                connection.execute(text(
+                    "UPDATE user SET total_points = total_points + 10, completed_count = completed_count + 1 WHERE id = :id"
+                ), {'id': user_id})
+                connection.execute(text(
+                    "INSERT INTO user_progress (user_id, activity_id, score, completed_at) "
+                    "VALUES (:user_id, :activity_id, 100, CURRENT_TIMESTAMP)"
+                ), {'user_id': user_id, 'activity_id': i})
+                connection.execute(text("SELECT COUNT(*) FROM user_progress WHERE user_id = :id"), {'id': user_id})
+            committed += 1
+        except exc.OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            locked += 1
+    engine.dispose()
+    results.put((committed, locked))
+
+
+def run(tuned: bool, processes: int, transactions: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        _setup(path, tuned)
+
+        results = multiprocessing.Queue()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(path, tuned, transactions, worker_id, results))
+            for worker_id in range(processes)
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+    committed = sum(c for c, _ in outcomes)
+    locked = sum(l for _, l in outcomes)
+    return committed, locked, elapsed
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    transactions = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+
+    print(f"SQLite write benchmark: {processes} processes x {transactions} transactions")
+    baseline = None
+    for label, tuned in (('default', False), ('tuned', True)):
+        committed, locked, elapsed = run(tuned, processes, transactions)
+        throughput = committed / elapsed
+        baseline = baseline or throughput
+        print(f"  {label:8} {throughput:8.0f} commits/s  {locked:4} 'database is locked' errors  "
+              f"{elapsed:6.2f} s  ({throughput / baseline:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Worker boot measurement for UTOPAI.
+
+Imports src.main in fresh interpreters (like a gunicorn worker booting)
+against the configured DATABASE_URL and reports how long the import takes
+and how many SQL statements it issues.
+
+Usage:
+  python measure_startup.py [runs]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {backend!r})
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+statements = []
+event.listen(Engine, 'before_cursor_execute', lambda conn, cursor, statement, *args: statements.append(statement))
+
+started = time.perf_counter()
+from src.main import app
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'statements': len(statements)}}))
+"""
+
+
+def measure(runs: int = 10):
+    backend = os.path.dirname(os.path.abspath(__file__))
+    probe = PROBE.format(backend=backend)
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', probe],
+            check=True, capture_output=True, text=True, cwd=backend
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    seconds = [sample['seconds'] for sample in samples]
+    print(f"Worker boot over {runs} runs")
+    print(f"  median import time: {statistics.median(seconds) * 1000:.1f} ms")
+    print(f"  min / max:          {min(seconds) * 1000:.1f} / {max(seconds) * 1000:.1f} ms")
+    print(f"  SQL statements:     {samples[-1]['statements']}")
+
+
+if __name__ == '__main__':
+    measure(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
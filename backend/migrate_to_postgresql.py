@@ -1,138 +1,253 @@
 #!/usr/bin/env python3
 """
-Migration script to move data from SQLite to PostgreSQL
-Run this after setting up PostgreSQL on Railway
+Streaming SQLite -> PostgreSQL migration for UTOPAI.
+
+Copies every table from the SQLite file into the database configured by
+DATABASE_URL, keeping primary keys so foreign keys stay valid:
+
+- the target schema comes from the Flask-Migrate migrations
+- rows are read in primary-key order, one keyset page (`--chunk-size`) at a
+  time, so memory stays bounded however large user_progress is
+- each page is bulk-loaded with COPY (Postgres) or executemany (others) in
+  the same transaction that records how far the table got, so an interrupted
+  run resumes exactly where it stopped when started again
+- sequences are reset to MAX(id) and the denormalised user counters are
+  verified at the end
+
+Usage:
+  DATABASE_URL=postgresql://... python migrate_to_postgresql.py migrate [--source PATH] [--chunk-size N] [--fresh]
+  DATABASE_URL=postgresql://... python migrate_to_postgresql.py status
 """
+import argparse
+import io
+import json
 import os
 import sys
-import sqlite3
-import json
-from datetime import datetime
+import time
+from datetime import date, datetime
 
 sys.path.insert(0, os.path.dirname(__file__))
 
-def export_sqlite_data():
-    """Export data from SQLite database"""
-    sqlite_path = os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db')
-    
-    if not os.path.exists(sqlite_path):
-        print("No SQLite database found. Starting fresh.")
-        return None
-    
-    print(f"Exporting data from {sqlite_path}")
-    
-    conn = sqlite3.connect(sqlite_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    data = {}
-    
-    # Export tables
-    tables = ['users', 'islands', 'activities', 'badges', 'user_progress', 'user_badges']
-    
+import sqlalchemy as sa
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db')
+
+# Per-table resume state, kept in the target until the migration completes
+progress_metadata = sa.MetaData()
+migration_progress = sa.Table(
+    '_sqlite_migration_progress', progress_metadata,
+    sa.Column('table_name', sa.String(100), primary_key=True),
+    sa.Column('last_key', sa.Text),  # JSON-encoded primary key of the last copied row
+    sa.Column('rows_copied', sa.BigInteger, nullable=False, default=0),
+    sa.Column('completed', sa.Boolean, nullable=False, default=False)
+)
+
+
+def _copy_value(value) -> str:
+    """One field in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def _copy_rows(connection, table, columns, rows):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY "{table.name}" ({column_list}) FROM STDIN', buffer)
+    finally:
+        cursor.close()
+
+
+def _load_rows(connection, table, columns, rows):
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        _copy_rows(connection, table, columns, rows)
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def _source_tables(source_engine):
+    return set(sa.inspect(source_engine).get_table_names())
+
+
+def _reset_sequences(connection, tables):
+    if connection.dialect.name != 'postgresql':
+        return
     for table in tables:
-        try:
-            cursor.execute(f"SELECT * FROM {table}")
-            rows = cursor.fetchall()
-            data[table] = [dict(row) for row in rows]
-            print(f"Exported {len(rows)} rows from {table}")
-        except sqlite3.OperationalError as e:
-            print(f"Table {table} not found: {e}")
-            data[table] = []
-    
-    conn.close()
-    
-    # Save to JSON file
-    export_file = 'sqlite_export.json'
-    with open(export_file, 'w') as f:
-        json.dump(data, f, indent=2, default=str)
-    
-    print(f"Data exported to {export_file}")
-    return export_file
-
-def import_to_postgresql():
-    """Import data to PostgreSQL database"""
+        primary_key = list(table.primary_key.columns)
+        if len(primary_key) != 1 or not isinstance(primary_key[0].type, sa.Integer) or not primary_key[0].autoincrement:
+            continue
+        column = primary_key[0].name
+        sequence = connection.execute(
+            sa.text("SELECT pg_get_serial_sequence(:table, :column)"),
+            {'table': f'"{table.name}"', 'column': column}
+        ).scalar()
+        if sequence:
+            connection.execute(sa.text(
+                f'SELECT setval(:sequence, COALESCE(MAX("{column}"), 1), MAX("{column}") IS NOT NULL) FROM "{table.name}"'
+            ), {'sequence': sequence})
+
+
+def migrate_table(source_engine, target_engine, table, chunk_size: int, report=print) -> int:
+    """Copy one table in keyset-paginated chunks, resuming from the recorded key"""
+    primary_key = list(table.primary_key.columns)
+    if len(primary_key) != 1:
+        raise SystemExit(f"{table.name}: keyset copy needs a single-column primary key")
+    key = primary_key[0]
+
+    source_columns = {column['name'] for column in sa.inspect(source_engine).get_columns(table.name)}
+    # Columns added by later migrations are left to their server defaults
+    columns = [column.name for column in table.columns if column.name in source_columns]
+    select_columns = [table.c[name] for name in columns]
+    key_index = columns.index(key.name)
+
+    with target_engine.connect() as target:
+        state = target.execute(
+            sa.select(migration_progress).where(migration_progress.c.table_name == table.name)
+        ).first()
+    if state and state.completed:
+        report(f"{table.name}: already copied ({state.rows_copied} rows)")
+        return 0
+
+    last_key = json.loads(state.last_key) if state and state.last_key is not None else None
+    copied = state.rows_copied if state else 0
+    with source_engine.connect() as source:
+        total = source.execute(sa.select(sa.func.count()).select_from(table)).scalar()
+
+    started = time.perf_counter()
+    copied_now = 0
+    while True:
+        query = sa.select(*select_columns).order_by(key).limit(chunk_size)
+        if last_key is not None:
+            query = query.where(key > last_key)
+        with source_engine.connect() as source:
+            rows = source.execute(query).fetchall()
+        if not rows:
+            break
+
+        last_key = rows[-1][key_index]
+        copied += len(rows)
+        copied_now += len(rows)
+
+        # Rows and progress commit together, so a crash never loses or duplicates a chunk
+        with target_engine.begin() as target:
+            _load_rows(target, table, columns, rows)
+            _save_progress(target, table.name, last_key, copied, completed=False)
+
+        rate = copied_now / max(time.perf_counter() - started, 1e-6)
+        report(f"{table.name}: {copied}/{total} rows ({rate:.0f} rows/s)")
+
+    with target_engine.begin() as target:
+        _save_progress(target, table.name, last_key, copied, completed=True)
+        _reset_sequences(target, [table])
+    report(f"{table.name}: done, {copied} rows")
+    return copied_now
+
+
+def _save_progress(connection, table_name, last_key, rows_copied, completed):
+    values = {'last_key': json.dumps(last_key), 'rows_copied': rows_copied, 'completed': completed}
+    updated = connection.execute(
+        migration_progress.update().where(migration_progress.c.table_name == table_name).values(**values)
+    ).rowcount
+    if not updated:
+        connection.execute(migration_progress.insert().values(table_name=table_name, **values))
+
+
+def migrate(source_path: str, chunk_size: int, fresh: bool):
+    from flask_migrate import upgrade
     from src.main import app
-    from src.models.user import db, User, Island, Activity, Badge, UserProgress, UserBadge
-    
-    export_file = 'sqlite_export.json'
-    
-    if not os.path.exists(export_file):
-        print("No export file found. Running fresh database initialization.")
-        from src.database_init import init_database
-        init_database()
-        return
-    
-    print("Importing data to PostgreSQL...")
-    
-    with open(export_file, 'r') as f:
-        data = json.load(f)
-    
+    from src.models.user import db
+    from src.services.user_counters import check_counters
+
+    if not os.path.exists(source_path):
+        raise SystemExit(f"No SQLite database at {source_path}")
+
+    source_engine = sa.create_engine(f"sqlite:///{source_path}")
+
+    with app.app_context():
+        target_engine = db.engine
+        print(f"Source: {source_path}")
+        print(f"Target: {target_engine.url.render_as_string(hide_password=True)}")
+
+        resuming = sa.inspect(target_engine).has_table(migration_progress.name)
+        if fresh:
+            db.drop_all()
+            with target_engine.begin() as connection:
+                connection.execute(sa.text('DROP TABLE IF EXISTS alembic_version'))
+                connection.execute(sa.text(f'DROP TABLE IF EXISTS {migration_progress.name}'))
+            resuming = False
+
+        upgrade()
+        progress_metadata.create_all(target_engine)
+
+        available = _source_tables(source_engine)
+        tables = [table for table in db.metadata.sorted_tables if table.name in available]
+
+        if not resuming:
+            with target_engine.connect() as connection:
+                non_empty = [table.name for table in tables
+                             if connection.execute(sa.select(sa.literal(1)).select_from(table).limit(1)).first()]
+            if non_empty:
+                raise SystemExit(f"Target already has data in {', '.join(non_empty)}; use --fresh to replace it")
+
+        print(f"{'Resuming' if resuming else 'Starting'} migration of {len(tables)} tables in chunks of {chunk_size}")
+        for table in tables:
+            migrate_table(source_engine, target_engine, table, chunk_size)
+
+        drifted = check_counters(repair=True, report=lambda line: None)
+        print(f"User counters verified ({drifted} repaired)")
+
+        progress_metadata.drop_all(target_engine)
+        print("Migration complete!")
+
+
+def status():
+    from src.main import app
+    from src.models.user import db
+
     with app.app_context():
-        # Clear existing data
-        db.drop_all()
-        db.create_all()
-        
-        # Import islands
-        for island_data in data.get('islands', []):
-            island = Island(**{k: v for k, v in island_data.items() if k != 'id'})
-            db.session.add(island)
-        
-        db.session.commit()
-        
-        # Import activities
-        for activity_data in data.get('activities', []):
-            activity = Activity(**{k: v for k, v in activity_data.items() if k != 'id'})
-            db.session.add(activity)
-        
-        db.session.commit()
-        
-        # Import badges
-        for badge_data in data.get('badges', []):
-            badge = Badge(**{k: v for k, v in badge_data.items() if k != 'id'})
-            db.session.add(badge)
-        
-        db.session.commit()
-        
-        # Import users
-        for user_data in data.get('users', []):
-            user = User(**{k: v for k, v in user_data.items() if k != 'id'})
-            db.session.add(user)
-        
-        db.session.commit()
-        
-        # Import user progress
-        for progress_data in data.get('user_progress', []):
-            progress = UserProgress(**{k: v for k, v in progress_data.items() if k != 'id'})
-            db.session.add(progress)
-        
-        # Import user badges
-        for badge_data in data.get('user_badges', []):
-            user_badge = UserBadge(**{k: v for k, v in badge_data.items() if k != 'id'})
-            db.session.add(user_badge)
-        
-        db.session.commit()
-        
-        print("Data import complete!")
-        print(f"Islands: {Island.query.count()}")
-        print(f"Activities: {Activity.query.count()}")
-        print(f"Badges: {Badge.query.count()}")
-        print(f"Users: {User.query.count()}")
+        if not sa.inspect(db.engine).has_table(migration_progress.name):
+            print("No migration in progress")
+            return
+        with db.engine.connect() as connection:
+            for row in connection.execute(sa.select(migration_progress).order_by(migration_progress.c.table_name)):
+                print(f"{row.table_name}: {row.rows_copied} rows{' (done)' if row.completed else ''}")
+
 
 def main():
     """Main migration function"""
+    parser = argparse.ArgumentParser(description='UTOPAI SQLite -> PostgreSQL migration')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    migrate_parser = subcommands.add_parser('migrate', help='Copy (or resume copying) all data')
+    migrate_parser.add_argument('--source', default=DEFAULT_SOURCE, help='SQLite database file')
+    migrate_parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per keyset page')
+    migrate_parser.add_argument('--fresh', action='store_true', help='Drop all target tables first')
+
+    subcommands.add_parser('status', help='Show per-table progress of an interrupted migration')
+
+    args = parser.parse_args()
     print("UTOPAI Database Migration Tool")
     print("=" * 40)
-    
-    if len(sys.argv) > 1 and sys.argv[1] == 'export':
-        export_sqlite_data()
-    elif len(sys.argv) > 1 and sys.argv[1] == 'import':
-        import_to_postgresql()
+
+    if args.command == 'migrate':
+        migrate(args.source, args.chunk_size, args.fresh)
     else:
-        print("Usage:")
-        print("  python migrate_to_postgresql.py export  # Export SQLite data")
-        print("  python migrate_to_postgresql.py import  # Import to PostgreSQL")
+        status()
+
 
 if __name__ == '__main__':
     main()
-
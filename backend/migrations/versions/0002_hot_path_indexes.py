@@ -0,0 +1,74 @@
+"""hot path indexes and uniqueness
+
+Composite indexes for the hottest lookups, and unique indexes on
+(user_id, activity_id) and (user_id, badge_id). Duplicate rows left behind
+by double-clicks are removed first: for progress the completed row (or the
+newest one) is kept, for badges the earliest award.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 22:08:45.608177
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('activity', 'ix_activity_island_active_order', ['island_id', 'is_active', 'order_number'], False),
+    ('parent_child_relation', 'ix_parent_child_relation_parent_id', ['parent_id'], False),
+    ('user', 'ix_user_active_points', ['is_active', 'total_points'], False),
+    ('user_badge', 'uq_user_badge_user_badge', ['user_id', 'badge_id'], True),
+    ('user_progress', 'ix_user_progress_user_status', ['user_id', 'status'], False),
+    ('user_progress', 'uq_user_progress_user_activity', ['user_id', 'activity_id'], True),
+]
+
+
+def _remove_duplicate_progress(bind):
+    groups = bind.execute(sa.text(
+        "SELECT user_id, activity_id FROM user_progress "
+        "GROUP BY user_id, activity_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    for user_id, activity_id in groups:
+        rows = bind.execute(sa.text(
+            "SELECT id, status FROM user_progress "
+            "WHERE user_id = :user_id AND activity_id = :activity_id ORDER BY id DESC"
+        ), {'user_id': user_id, 'activity_id': activity_id}).fetchall()
+        keep = next((row.id for row in rows if row.status == 'completed'), rows[0].id)
+        bind.execute(sa.text(
+            "DELETE FROM user_progress "
+            "WHERE user_id = :user_id AND activity_id = :activity_id AND id != :keep"
+        ), {'user_id': user_id, 'activity_id': activity_id, 'keep': keep})
+
+
+def _remove_duplicate_badges(bind):
+    bind.execute(sa.text(
+        "DELETE FROM user_badge WHERE id NOT IN ("
+        "SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM user_badge GROUP BY user_id, badge_id) AS keepers"
+        ")"
+    ))
+
+
+def upgrade():
+    bind = op.get_bind()
+    _remove_duplicate_progress(bind)
+    _remove_duplicate_badges(bind)
+
+    inspector = sa.inspect(bind)
+    for table, name, columns, unique in INDEXES:
+        # Databases bootstrapped with db.create_all() may already have them
+        if name in {index['name'] for index in inspector.get_indexes(table)}:
+            continue
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for table, name, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,54 @@
+"""user counters
+
+Denormalised completed_count, in_progress_count, badge_count and
+island_bits on user, populated from the existing rows.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 22:14:41.564656
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('completed_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('in_progress_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('badge_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('island_bits', sa.BigInteger(), server_default='0', nullable=False))
+
+    bind = op.get_bind()
+    bind.execute(sa.text(
+        'UPDATE "user" SET '
+        "completed_count = (SELECT COUNT(*) FROM user_progress p WHERE p.user_id = \"user\".id AND p.status = 'completed'), "
+        "in_progress_count = (SELECT COUNT(*) FROM user_progress p WHERE p.user_id = \"user\".id AND p.status = 'in_progress'), "
+        'badge_count = (SELECT COUNT(*) FROM user_badge b WHERE b.user_id = "user".id)'
+    ))
+
+    islands = bind.execute(sa.text(
+        "SELECT island_id, COUNT(*) FROM activity WHERE is_active = :active GROUP BY island_id"
+    ), {'active': True}).fetchall()
+    for island_id, total in islands:
+        bind.execute(sa.text(
+            'UPDATE "user" SET island_bits = island_bits + :mask WHERE id IN ('
+            "SELECT p.user_id FROM user_progress p JOIN activity a ON a.id = p.activity_id "
+            "WHERE a.island_id = :island_id AND a.is_active = :active AND p.status = 'completed' "
+            "GROUP BY p.user_id HAVING COUNT(DISTINCT p.activity_id) >= :total)"
+        ), {'mask': 1 << island_id, 'island_id': island_id, 'active': True, 'total': total})
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('island_bits')
+        batch_op.drop_column('badge_count')
+        batch_op.drop_column('in_progress_count')
+        batch_op.drop_column('completed_count')
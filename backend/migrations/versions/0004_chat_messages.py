@@ -0,0 +1,88 @@
+"""chat messages
+
+Append-only chat_message rows replace the chat_session.messages JSON blob.
+Existing blobs are copied into rows before the column is dropped.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 22:18:36.990976
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('chat_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('token_estimate', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['chat_session.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id', 'seq', name='uq_chat_message_session_seq')
+    )
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('channel', sa.String(length=20), server_default='activity', nullable=False))
+        batch_op.add_column(sa.Column('last_seq', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_chat_session_user_activity', ['user_id', 'activity_id', 'channel'], unique=False)
+
+    bind = op.get_bind()
+    chat_message = sa.table('chat_message',
+        sa.column('session_id', sa.Integer), sa.column('seq', sa.Integer), sa.column('role', sa.String),
+        sa.column('content', sa.Text), sa.column('token_estimate', sa.Integer), sa.column('created_at')
+    )
+    for session_id, messages, created_at in bind.execute(sa.text(
+        "SELECT id, messages, created_at FROM chat_session WHERE messages IS NOT NULL"
+    )).fetchall():
+        try:
+            history = json.loads(messages) or []
+        except ValueError:
+            continue
+        rows = [
+            {'session_id': session_id, 'seq': seq, 'role': message.get('role', 'user'),
+             'content': message.get('content', ''), 'token_estimate': len(message.get('content', '')) // 4 + 1,
+             'created_at': created_at}
+            for seq, message in enumerate(history, 1) if isinstance(message, dict)
+        ]
+        if rows:
+            bind.execute(chat_message.insert(), rows)
+            bind.execute(sa.text("UPDATE chat_session SET last_seq = :seq WHERE id = :id"),
+                         {'seq': len(rows), 'id': session_id})
+
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.drop_column('messages')
+
+
+def downgrade():
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('messages', sa.TEXT(), nullable=True))
+
+    bind = op.get_bind()
+    history = {}
+    for session_id, role, content in bind.execute(sa.text(
+        "SELECT session_id, role, content FROM chat_message ORDER BY session_id, seq"
+    )):
+        history.setdefault(session_id, []).append({'role': role, 'content': content})
+    for session_id, messages in history.items():
+        bind.execute(sa.text("UPDATE chat_session SET messages = :messages WHERE id = :id"),
+                     {'messages': json.dumps(messages), 'id': session_id})
+
+    with op.batch_alter_table('chat_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_session_user_activity')
+        batch_op.drop_column('last_seq')
+        batch_op.drop_column('channel')
+
+    op.drop_table('chat_message')
@@ -0,0 +1,36 @@
+"""server sessions
+
+Server-side Flask session records, keyed by the sid carried in the cookie.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 22:22:21.881145
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('stored_session',
+    sa.Column('sid', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sid')
+    )
+    with op.batch_alter_table('stored_session', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stored_session_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stored_session', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stored_session_expires_at'))
+
+    op.drop_table('stored_session')
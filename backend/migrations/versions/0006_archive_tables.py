@@ -0,0 +1,89 @@
+"""archive tables
+
+Cold storage for completed progress and idle chat sessions, plus per-island
+rollups of archived progress so counters and totals stay exact.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 22:31:23.776252
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('archived_chat_message',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('role', sa.String(length=20), nullable=True),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('token_estimate', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_chat_message', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_chat_message_session_seq', ['session_id', 'seq'], unique=False)
+
+    op.create_table('archived_chat_session',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=True),
+    sa.Column('channel', sa.String(length=20), nullable=True),
+    sa.Column('last_seq', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_chat_session', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_chat_session_user_activity', ['user_id', 'activity_id', 'channel'], unique=False)
+
+    op.create_table('archived_progress_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('island_id', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('total_score', sa.Integer(), nullable=False),
+    sa.Column('total_attempts', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'island_id', name='uq_archived_progress_rollup_user_island')
+    )
+    op.create_table('archived_user_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('activity_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('score', sa.Integer(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('archived_user_progress', schema=None) as batch_op:
+        batch_op.create_index('ix_archived_user_progress_user_activity', ['user_id', 'activity_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('archived_user_progress', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_user_progress_user_activity')
+
+    op.drop_table('archived_user_progress')
+    op.drop_table('archived_progress_rollup')
+    with op.batch_alter_table('archived_chat_session', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_chat_session_user_activity')
+
+    op.drop_table('archived_chat_session')
+    with op.batch_alter_table('archived_chat_message', schema=None) as batch_op:
+        batch_op.drop_index('ix_archived_chat_message_session_seq')
+
+    op.drop_table('archived_chat_message')
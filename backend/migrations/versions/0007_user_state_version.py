@@ -0,0 +1,29 @@
+"""user state version
+
+Per-user counter bumped whenever the user's row, progress or badges
+change; response ETags are derived from it.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 23:05:12.318840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('state_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('state_version')
@@ -0,0 +1,52 @@
+"""activity slug
+
+Stable, unique slug per activity so routes can refer to an activity
+without matching on its display name. Existing rows get a slug derived
+from their name (suffixed with the id where two names collide).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 23:31:47.902114
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+_DANISH = str.maketrans({'æ': 'ae', 'ø': 'oe', 'å': 'aa'})
+
+
+def _slugify(name):
+    return re.sub(r'[^a-z0-9]+', '-', (name or '').lower().translate(_DANISH)).strip('-') or 'aktivitet'
+
+
+def upgrade():
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('slug', sa.String(length=100), nullable=True))
+
+    bind = op.get_bind()
+    taken = set()
+    for activity_id, name in bind.execute(sa.text("SELECT id, name FROM activity ORDER BY id")).fetchall():
+        slug = _slugify(name)[:90]
+        if slug in taken:
+            slug = f'{slug}-{activity_id}'
+        taken.add(slug)
+        bind.execute(sa.text("UPDATE activity SET slug = :slug WHERE id = :id"), {'slug': slug, 'id': activity_id})
+
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        batch_op.create_index('uq_activity_slug', ['slug'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('activity', schema=None) as batch_op:
+        batch_op.drop_index('uq_activity_slug')
+        batch_op.drop_column('slug')
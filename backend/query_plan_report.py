@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Query plan report for UTOPAI's hot lookup paths.
+
+Runs EXPLAIN (Postgres) or EXPLAIN QUERY PLAN (SQLite) for each hot query
+against the configured DATABASE_URL and flags any that is not served by an
+index. On Postgres sequential scans are disabled for the session so the
+report shows whether an index *can* serve the query even on tiny tables.
+
+Usage:
+  python query_plan_report.py          # print plans, exit 1 if any query scans a table
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from src.main import app
+from src.models.user import db, User, Activity, UserProgress, UserBadge, ParentChildRelation
+
+
+def hot_queries():
+    """(label, statement) pairs for the queries the API runs most"""
+    return [
+        ('progress by user and activity',
+         db.select(UserProgress).where(UserProgress.user_id == 1, UserProgress.activity_id == 1)),
+        ('progress count by user and status',
+         db.select(db.func.count(UserProgress.id)).where(UserProgress.user_id == 1, UserProgress.status == 'completed')),
+        ('badges by user',
+         db.select(UserBadge).where(UserBadge.user_id == 1)),
+        ('activities by island in order',
+         db.select(Activity).where(Activity.island_id == 1, Activity.is_active.is_(True)).order_by(Activity.order_number)),
+        ('leaderboard',
+         db.select(User).where(User.is_active.is_(True)).order_by(User.total_points.desc()).limit(5)),
+        ('children of parent',
+         db.select(ParentChildRelation).where(ParentChildRelation.parent_id == 1)),
+    ]
+
+
+def explain(connection, statement):
+    """Return (plan lines, index_served) for one statement"""
+    dialect = connection.dialect.name
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        lines = [row[-1] for row in rows]
+        # "SCAN user_progress" is a full table scan; "SCAN ... USING INDEX" walks an index
+        index_served = not any(
+            line.startswith('SCAN') and 'INDEX' not in line for line in lines
+        ) and not any('USE TEMP B-TREE FOR ORDER BY' in line for line in lines)
+        return lines, index_served
+
+    if dialect == 'postgresql':
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {sql}").fetchall()
+        lines = [row[0] for row in rows]
+        index_served = not any('Seq Scan' in line for line in lines) and not any(
+            line.strip().startswith('Sort') for line in lines
+        )
+        return lines, index_served
+
+    raise SystemExit(f"Unsupported dialect: {dialect}")
+
+
+def main():
+    failures = 0
+    with app.app_context():
+        with db.engine.connect() as connection:
+            print(f"Query plans on {connection.dialect.name}")
+            print("=" * 40)
+            for label, statement in hot_queries():
+                lines, index_served = explain(connection, statement)
+                print(f"\n{'✅' if index_served else '❌'} {label}")
+                for line in lines:
+                    print(f"    {line}")
+                if not index_served:
+                    failures += 1
+
+    print(f"\n{len(hot_queries()) - failures}/{len(hot_queries())} hot queries are index-served")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
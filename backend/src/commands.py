@@ -0,0 +1,162 @@
+import click
+from flask.cli import AppGroup
+
+rollups_cli = AppGroup('rollups', help='Daily activity rollups.')
+badges_cli = AppGroup('badges', help='Badge maintenance.')
+catalogue_cli = AppGroup('catalogue', help='In-process island, activity and badge catalogue.')
+events_cli = AppGroup('events', help='Progress event outbox.')
+counters_cli = AppGroup('counters', help='Denormalised per-user counters.')
+sessions_cli = AppGroup('sessions', help='Server-side session store.')
+sqlite_cli = AppGroup('sqlite', help='SQLite maintenance.')
+archive_cli = AppGroup('archive', help='Move cold progress and chat data to the archive tables.')
+
+
+@rollups_cli.command('backfill')
+@click.option('--chunk-size', default=500, show_default=True, help='Users per bulk insert.')
+def backfill_rollups_command(chunk_size):
+    """Rebuild daily rollups from existing progress history"""
+    from src.services.rollup_service import backfill_rollups
+
+    inserted = backfill_rollups(chunk_size=chunk_size, report=click.echo)
+    click.echo(f"Backfill complete: {inserted} daily rows")
+
+
+@catalogue_cli.command('invalidate')
+def invalidate_catalogue_command():
+    """Make every worker reload islands, activities and badges after their rows were edited"""
+    from src.models.user import db
+    from src.services.catalogue import CATALOGUE
+    from src.services.catalogue_version import bump_catalogue_version
+
+    bump_catalogue_version(CATALOGUE)
+    db.session.commit()
+    click.echo("Catalogue version bumped")
+
+
+# Kept under its old name for existing deploy scripts
+badges_cli.add_command(invalidate_catalogue_command)
+
+
+@badges_cli.command('backfill')
+@click.option('--badge-id', type=int, default=None, help='Only this badge (default: every active badge).')
+@click.option('--chunk-size', default=5000, show_default=True, help='Users per INSERT ... SELECT.')
+def backfill_badges_command(badge_id, chunk_size):
+    """Award new or changed badges to every user who already qualifies"""
+    from src.services.badge_backfill import backfill_badges
+
+    awarded = backfill_badges(badge_id=badge_id, chunk_size=chunk_size, report=click.echo)
+    click.echo(f"Backfill complete: {awarded} badges awarded")
+
+
+@events_cli.command('drain')
+@click.option('--limit', default=1000, show_default=True, help='Maximum events to deliver.')
+def drain_events_command(limit):
+    """Deliver due outbox events synchronously (e.g. after an outage)"""
+    from src.services.event_bus import event_bus
+
+    delivered = event_bus.drain(limit=limit)
+    click.echo(f"Delivered {delivered} events")
+
+
+@events_cli.command('purge')
+@click.option('--retain-days', type=int, default=None, help='Keep delivered events this many days (default: EVENT_OUTBOX_RETAIN_DAYS, 7).')
+def purge_events_command(retain_days):
+    """Delete delivered outbox events past the retention window (the sweeper also does this hourly)"""
+    from src.services.event_bus import event_bus
+
+    deleted = event_bus.purge(retain_days=retain_days)
+    click.echo(f"Deleted {deleted} delivered events")
+
+
+@counters_cli.command('check')
+@click.option('--repair', is_flag=True, help='Rewrite drifted counters from the source tables.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Users per grouped query.')
+def check_counters_command(repair, chunk_size):
+    """Compare User counters against UserProgress/UserBadge and report drift"""
+    from src.services.user_counters import check_counters
+
+    drifted = check_counters(repair=repair, chunk_size=chunk_size, report=click.echo)
+    click.echo(f"Check complete: {drifted} users drifted{' and repaired' if repair and drifted else ''}")
+
+
+@sessions_cli.command('sweep')
+def sweep_sessions_command():
+    """Delete expired sessions (workers also do this periodically)"""
+    from flask import current_app
+
+    deleted = current_app.session_interface.backend.sweep()
+    click.echo(f"Deleted {deleted} expired sessions")
+
+
+@sqlite_cli.command('checkpoint')
+@click.option('--mode', type=click.Choice(['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE']), default='TRUNCATE',
+              show_default=True, help='wal_checkpoint mode; TRUNCATE also shrinks the -wal file.')
+def checkpoint_sqlite_command(mode):
+    """Checkpoint the WAL of every SQLite database"""
+    from flask import current_app
+
+    checkpointers = current_app.extensions.get('sqlite_checkpointers', [])
+    if not checkpointers:
+        click.echo("No file-based SQLite databases configured")
+    for checkpointer in checkpointers:
+        busy, wal_pages, checkpointed = checkpointer.checkpoint(mode)
+        click.echo(f"{checkpointer.engine.url.database}: {checkpointed}/{wal_pages} WAL pages checkpointed"
+                   f"{' (busy)' if busy else ''}")
+
+
+def _archive_horizon(older_than_days, before):
+    from src.services.archive_service import horizon
+
+    return before if before else horizon(older_than_days)
+
+
+@archive_cli.command('progress')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive completions older than this (default: ARCHIVE_PROGRESS_DAYS, 365).')
+@click.option('--before', type=click.DateTime(), default=None,
+              help='Archive completions before this date instead, e.g. the start of the school year.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per transaction.')
+def archive_progress_command(older_than_days, before, batch_size):
+    """Move old completed progress into the archive, keeping per-island rollups"""
+    from src.services.archive_service import archive_progress, PROGRESS_DAYS
+
+    cutoff = _archive_horizon(older_than_days or PROGRESS_DAYS, before)
+    archived = archive_progress(cutoff, batch_size=batch_size, report=click.echo)
+    click.echo(f"Archived {archived} progress rows completed before {cutoff:%Y-%m-%d}")
+
+
+@archive_cli.command('chats')
+@click.option('--older-than-days', type=int, default=None,
+              help='Archive sessions idle longer than this (default: ARCHIVE_CHAT_DAYS, 90).')
+@click.option('--before', type=click.DateTime(), default=None, help='Archive sessions idle since before this date.')
+@click.option('--batch-size', default=200, show_default=True, help='Sessions per transaction.')
+def archive_chats_command(older_than_days, before, batch_size):
+    """Move idle chat sessions and their messages into the archive"""
+    from src.services.archive_service import archive_chats, CHAT_DAYS
+
+    cutoff = _archive_horizon(older_than_days or CHAT_DAYS, before)
+    archived = archive_chats(cutoff, batch_size=batch_size, report=click.echo)
+    click.echo(f"Archived {archived} chat sessions idle since before {cutoff:%Y-%m-%d}")
+
+
+@click.command('seed')
+@click.option('--with-test-users', is_flag=True, help='Also create the demo child accounts.')
+def seed_command(with_test_users):
+    """Seed islands, activities and badges (idempotent; run after db upgrade)"""
+    from src.database_init import seed_database
+
+    created = seed_database(with_test_users=with_test_users, report=click.echo)
+    click.echo(f"Seeding complete: {created} rows created")
+
+
+def register_commands(app):
+    """Attach the maintenance CLI groups to the app (`flask --app src.main <group> ...`)"""
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(badges_cli)
+    app.cli.add_command(catalogue_cli)
+    app.cli.add_command(events_cli)
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(sessions_cli)
+    app.cli.add_command(sqlite_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(seed_command)
@@ -1,146 +1,164 @@
 #!/usr/bin/env python3
 """
-Database initialization and seeding script for UTOPAI
+Database seeding for UTOPAI
+
+The schema itself is created by the Flask-Migrate migrations; this module only
+inserts content. Every step is idempotent, so it is safe to run on each deploy:
+
+  flask --app src.main db upgrade
+  flask --app src.main seed [--with-test-users]
 """
 import os
 import sys
+from datetime import date
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.main import app
 from src.models.user import db, Island, Activity, User, Badge
+from src.services.catalogue_version import bump_catalogue_version
+from src.services.catalogue import CATALOGUE
+
+ISLANDS = [
+    {
+        'name': "Prompt City",
+        'description': "Lær at mestre ChatGPT og prompting!",
+        'order_number': 1,
+        'unlock_requirement': 0,
+        'activities': [
+            {
+                'name': "Hvad er ChatGPT?",
+                'slug': "hvad-er-chatgpt",
+                'description': "Lær grundlæggende om AI og ChatGPT",
+                'activity_type': "intro",
+                'order_number': 1,
+                'points_reward': 50,
+                'difficulty_level': 1
+            },
+            {
+                'name': "Dit første prompt",
+                'slug': "dit-foerste-prompt",
+                'description': "Skriv dit første prompt til ChatGPT",
+                'activity_type': "prompt_builder",
+                'order_number': 2,
+                'points_reward': 100,
+                'difficulty_level': 1
+            },
+            {
+                'name': "Klare vs. uklare prompts",
+                'slug': "klare-vs-uklare-prompts",
+                'description': "Lær forskellen på gode og dårlige prompts",
+                'activity_type': "quiz",
+                'order_number': 3,
+                'points_reward': 75,
+                'difficulty_level': 2
+            },
+            {
+                'name': "Chat med AI-mentoren",
+                'slug': "chat-med-ai-mentoren",
+                'description': "Øv dig i at chatte med AI",
+                'activity_type': "chat",
+                'order_number': 4,
+                'points_reward': 150,
+                'difficulty_level': 2
+            },
+            {
+                'name': "Kreativ prompt-udfordring",
+                'slug': "kreativ-prompt-udfordring",
+                'description': "Lav dit mest kreative prompt!",
+                'activity_type': "creative",
+                'order_number': 5,
+                'points_reward': 200,
+                'difficulty_level': 3
+            }
+        ]
+    }
+]
+
+TEST_USERS = [
+    {
+        'username': "superhelt_barn",
+        'email': "superhelt@utopai.dk",
+        'date_of_birth': date(2015, 1, 1),
+        'chosen_theme': "superhelte",
+        'total_points': 250,
+        'current_island': 1
+    },
+    {
+        'username': "prinsesse_barn",
+        'email': "prinsesse@utopai.dk",
+        'date_of_birth': date(2016, 6, 15),
+        'chosen_theme': "prinsesse",
+        'total_points': 180,
+        'current_island': 1
+    }
+]
+
+
+def seed_islands():
+    """Insert islands and activities that don't exist yet (matched by order number)"""
+    created = 0
+    for island_data in ISLANDS:
+        island_fields = {k: v for k, v in island_data.items() if k != 'activities'}
+        island = Island.query.filter_by(order_number=island_fields['order_number']).first()
+        if not island:
+            island = Island(**island_fields)
+            db.session.add(island)
+            db.session.flush()
+            created += 1
+
+        existing_orders = {order for (order,) in db.session.query(Activity.order_number).filter_by(island_id=island.id)}
+        for activity_data in island_data['activities']:
+            if activity_data['order_number'] not in existing_orders:
+                db.session.add(Activity(island_id=island.id, **activity_data))
+                created += 1
+
+    if created:
+        bump_catalogue_version(CATALOGUE)
+    db.session.commit()
+    return created
+
+
+def seed_test_users():
+    """Create the demo child accounts if they don't exist"""
+    created = 0
+    for user_data in TEST_USERS:
+        if User.query.filter_by(email=user_data['email']).first():
+            continue
+        user = User(**user_data)
+        user.set_password("password123")
+        db.session.add(user)
+        created += 1
+
+    db.session.commit()
+    return created
+
+
+def seed_database(with_test_users=False, report=print):
+    """Seed all content; returns the number of rows created"""
+    from src.routes.gamification import seed_badges
+
+    created = seed_islands()
+    report(f"Islands and activities: {created} created")
+
+    badges_created = seed_badges()
+    report(f"Badges: {badges_created} created")
+    created += badges_created
+
+    if with_test_users:
+        users_created = seed_test_users()
+        report(f"Test users: {users_created} created")
+        created += users_created
+
+    return created
+
 
 def init_database():
-    """Initialize database with tables and seed data"""
+    """Seed the database configured for the app, including test users"""
+    from src.main import app
+
     with app.app_context():
-        print("Creating database tables...")
-        db.create_all()
-        
-        # Seed initial data if not exists
-        if Island.query.count() == 0:
-            print("Seeding islands...")
-            
-            # Create Ø 1: ChatGPT og Prompting
-            island1 = Island(
-                name="Prompt City",
-                description="Lær at mestre ChatGPT og prompting!",
-                order_number=1,
-                unlock_requirement=0
-            )
-            db.session.add(island1)
-            db.session.commit()
-            
-            print("Seeding activities...")
-            
-            # Activities for Ø 1
-            activities = [
-                Activity(
-                    title="Hvad er ChatGPT?",
-                    description="Lær grundlæggende om ChatGPT og kunstig intelligens",
-                    activity_type="intro",
-                    island_id=island1.id,
-                    order_number=1,
-                    points_reward=100
-                ),
-                Activity(
-                    title="Dit første prompt",
-                    description="Lær at skrive dine første prompts til ChatGPT",
-                    activity_type="prompt_builder",
-                    island_id=island1.id,
-                    order_number=2,
-                    points_reward=150
-                ),
-                Activity(
-                    title="Klare vs. uklare prompts",
-                    description="Forstå forskellen på gode og dårlige prompts",
-                    activity_type="quiz",
-                    island_id=island1.id,
-                    order_number=3,
-                    points_reward=120
-                ),
-                Activity(
-                    title="Chat med AI-mentoren",
-                    description="Øv dig i at have samtaler med AI",
-                    activity_type="chat",
-                    island_id=island1.id,
-                    order_number=4,
-                    points_reward=180
-                ),
-                Activity(
-                    title="Kreativ prompt-udfordring",
-                    description="Brug din kreativitet til at lave spændende prompts",
-                    activity_type="creative",
-                    island_id=island1.id,
-                    order_number=5,
-                    points_reward=200
-                )
-            ]
-            
-            for activity in activities:
-                db.session.add(activity)
-            
-            db.session.commit()
-            
-        # Seed badges if not exists
-        if Badge.query.count() == 0:
-            print("Seeding badges...")
-            
-            badges = [
-                # Beginner badges
-                Badge(name="Første Skridt", description="Færdiggjorde din første aktivitet", icon="🌟", requirement_type="activity_count", requirement_value=1, theme="both"),
-                Badge(name="Prompt Nybegynder", description="Skrev dit første prompt", icon="✏️", requirement_type="activity_type", requirement_value="prompt_builder", theme="both"),
-                Badge(name="AI Ven", description="Havde din første samtale med AI", icon="🤖", requirement_type="activity_type", requirement_value="chat", theme="both"),
-                
-                # Progress badges
-                Badge(name="Ø Mester", description="Færdiggjorde alle aktiviteter på en ø", icon="🏝️", requirement_type="island_complete", requirement_value=1, theme="both"),
-                Badge(name="Point Samler", description="Samlede 500 point", icon="💎", requirement_type="points", requirement_value=500, theme="both"),
-                Badge(name="Dedikeret Lærer", description="Samlede 1000 point", icon="🎓", requirement_type="points", requirement_value=1000, theme="both"),
-                
-                # Theme-specific badges
-                Badge(name="Superhelt Rekrut", description="Startede superhelte eventyret", icon="🦸‍♂️", requirement_type="theme_selection", requirement_value="superhelte", theme="superhelte"),
-                Badge(name="Prinsesse Eventyrer", description="Startede prinsesse eventyret", icon="👸", requirement_type="theme_selection", requirement_value="prinsesse", theme="prinsesse"),
-                
-                # Advanced badges
-                Badge(name="Prompt Mester", description="Skrev 10 høj-kvalitets prompts", icon="🎯", requirement_type="prompt_quality", requirement_value=10, theme="both"),
-                Badge(name="AI Ekspert", description="Færdiggjorde alle aktiviteter på Ø 1", icon="🧠", requirement_type="island_complete", requirement_value=1, theme="both"),
-                Badge(name="Kreativ Tænker", description="Færdiggjorde kreative udfordringer", icon="🎨", requirement_type="activity_type", requirement_value="creative", theme="both")
-            ]
-            
-            for badge in badges:
-                db.session.add(badge)
-            
-            db.session.commit()
-            
-        # Create test users if not exists
-        if User.query.count() == 0:
-            print("Creating test users...")
-            
-            from datetime import date
-            
-            test_users = [
-                User(
-                    username="superhelt_barn",
-                    email="superhelt@utopai.dk",
-                    date_of_birth=date(2015, 1, 1),  # 8 years old
-                    chosen_theme="superhelte",
-                    total_points=250,
-                    current_island=1
-                ),
-                User(
-                    username="prinsesse_barn",
-                    email="prinsesse@utopai.dk",
-                    date_of_birth=date(2016, 6, 15),  # 7 years old
-                    chosen_theme="prinsesse",
-                    total_points=180,
-                    current_island=1
-                )
-            ]
-            
-            for user in test_users:
-                user.set_password("password123")  # Use the proper password hashing method
-                db.session.add(user)
-            
-            db.session.commit()
-            
+        seed_database(with_test_users=True)
+
         print("Database initialization complete!")
         print(f"Islands: {Island.query.count()}")
         print(f"Activities: {Activity.query.count()}")
@@ -149,4 +167,3 @@ def init_database():
 
 if __name__ == '__main__':
     init_database()
-
@@ -5,6 +5,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
+from flask_migrate import Migrate
 from src.models.user import db
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
@@ -14,6 +15,18 @@ from src.routes.activity_1 import activity_1_bp
 from src.routes.activity_2 import activity_2_bp
 from src.routes.gamification import gamification_bp
 from src.routes.init_db import init_db_bp
+from src.routes.parent import parent_bp
+from src.routes.bootstrap import bootstrap_bp
+from src.routes.batch import batch_bp
+from src.commands import register_commands
+from src.services.event_bus import event_bus
+from src.services.server_session import init_sessions
+from src.services.read_replica import configure_read_replica, init_read_replica
+from src.services.db_pool import engine_options_from_env, init_db_pool, pool_status
+from src.services.sqlite_tuning import init_sqlite_tuning
+from src.services.query_budget import init_query_budget
+from src.services.route_check import check_unique_rules
+from src.services import user_counters  # noqa: F401  registers the counter flush hook
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'utopai-secret-key-2024-super-secure'
@@ -41,6 +54,12 @@ app.register_blueprint(activity_1_bp, url_prefix='/api')
 app.register_blueprint(activity_2_bp, url_prefix='/api')
 app.register_blueprint(gamification_bp, url_prefix='/api/gamification')
 app.register_blueprint(init_db_bp, url_prefix='/api')
+app.register_blueprint(parent_bp, url_prefix='/api/parent')
+app.register_blueprint(bootstrap_bp, url_prefix='/api')
+app.register_blueprint(batch_bp, url_prefix='/api')
+
+# Maintenance commands (flask --app src.main ...)
+register_commands(app)
 
 # Database configuration
 database_url = os.environ.get('DATABASE_URL')
@@ -54,90 +73,41 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Pool sizing, recycle and pre-ping from DB_POOL_* variables
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI'])
+# Optional read replica (DATABASE_REPLICA_URL) for endpoints marked @read_only
+configure_read_replica(app)
 db.init_app(app)
+init_db_pool(app, db)
+# WAL, busy_timeout etc. on every SQLite connection (development / single-node)
+init_sqlite_tuning(app, db)
+init_read_replica(app)
+# Per-request statement counts, @query_budget limits and N+1 warnings
+init_query_budget(app)
 
-# Initialize database and seed data
-with app.app_context():
-    db.create_all()
-    
-    # Seed initial data if not exists
-    from src.models.user import Island, Activity
-    
-    if Island.query.count() == 0:
-        # Create Ø 1: ChatGPT og Prompting
-        island1 = Island(
-            name="Prompt City",
-            description="Lær at mestre ChatGPT og prompting!",
-            order_number=1,
-            unlock_requirement=0
-        )
-        db.session.add(island1)
-        db.session.commit()
-        
-        # Create sample activities for Ø 1
-        activities = [
-            Activity(
-                island_id=island1.id,
-                name="Hvad er ChatGPT?",
-                description="Lær grundlæggende om AI og ChatGPT",
-                activity_type="intro",
-                order_number=1,
-                points_reward=50,
-                difficulty_level=1
-            ),
-            Activity(
-                island_id=island1.id,
-                name="Dit første prompt",
-                description="Skriv dit første prompt til ChatGPT",
-                activity_type="prompt_builder",
-                order_number=2,
-                points_reward=100,
-                difficulty_level=1
-            ),
-            Activity(
-                island_id=island1.id,
-                name="Klare vs. uklare prompts",
-                description="Lær forskellen på gode og dårlige prompts",
-                activity_type="quiz",
-                order_number=3,
-                points_reward=75,
-                difficulty_level=2
-            ),
-            Activity(
-                island_id=island1.id,
-                name="Chat med AI-mentoren",
-                description="Øv dig i at chatte med AI",
-                activity_type="chat",
-                order_number=4,
-                points_reward=150,
-                difficulty_level=2
-            ),
-            Activity(
-                island_id=island1.id,
-                name="Kreativ prompt-udfordring",
-                description="Lav dit mest kreative prompt!",
-                activity_type="creative",
-                order_number=5,
-                points_reward=200,
-                difficulty_level=3
-            )
-        ]
-        
-        for activity in activities:
-            db.session.add(activity)
-        
-        db.session.commit()
-        print("Database seeded with initial data!")
-    
-    # Seed badges
-    from src.routes.gamification import seed_badges
-    seed_badges()
+# Versioned schema migrations (flask --app src.main db upgrade)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'migrations'), render_as_batch=True)
+
+# Session data lives server-side; the cookie only carries a signed id
+init_sessions(app)
+
+# Post-commit progress events (badge checks etc. run off the request path)
+event_bus.init_app(app)
+
+# Schema and seed data are managed outside worker boot:
+#   flask --app src.main db upgrade   (versioned migrations)
+#   flask --app src.main seed          (idempotent content seeding)
 
 # Health check endpoint for Railway
 @app.route('/api/health')
 def health_check():
     return {'status': 'healthy', 'service': 'UTOPAI Backend'}, 200
 
+# Connection pool occupancy and wait times per database bind
+@app.route('/api/health/db-pool')
+def db_pool_health():
+    return {'binds': pool_status(db.engines)}, 200
+
 # Serve static files and handle SPA routing
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -160,6 +130,9 @@ def serve(path):
             return "index.html not found", 404
 
 
+# Two blueprints registering the same path would silently shadow one another
+check_unique_rules(app)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
 
@@ -1,10 +1,17 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.services.read_replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_active_points', 'is_active', 'total_points'),  # Leaderboard
+    )
+    # The state_version bump set on flush comes back with the UPDATE (RETURNING) instead of a reload
+    __mapper_args__ = {'eager_defaults': True}
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
@@ -18,6 +25,16 @@ class User(db.Model):
     current_island = db.Column(db.Integer, default=1)
     subscription_status = db.Column(db.String(20), default='trial')
 
+    # Denormalised counters, maintained in the same transaction as the
+    # UserProgress/UserBadge writes (see services/user_counters.py)
+    completed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    in_progress_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    badge_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    island_bits = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')  # Bit n set when island id n is completed
+    # Bumped with every change to the user, their progress or badges; feeds response ETags
+    state_version = db.Column(db.Integer, nullable=False, default=0, server_default='0',
+                              server_onupdate=db.FetchedValue())  # Bumped in the flush, see user_counters
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -67,6 +84,10 @@ class Parent(db.Model):
         }
 
 class ParentChildRelation(db.Model):
+    __table_args__ = (
+        db.Index('ix_parent_child_relation_parent_id', 'parent_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     parent_id = db.Column(db.Integer, db.ForeignKey('parent.id'), nullable=False)
     child_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -92,9 +113,15 @@ class Island(db.Model):
         }
 
 class Activity(db.Model):
+    __table_args__ = (
+        db.Index('ix_activity_island_active_order', 'island_id', 'is_active', 'order_number'),
+        db.Index('uq_activity_slug', 'slug', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     island_id = db.Column(db.Integer, db.ForeignKey('island.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), nullable=True)  # Stable key for routes that serve one specific activity
     description = db.Column(db.Text)
     activity_type = db.Column(db.String(50), nullable=False)  # quiz, chat, prompt_builder, etc.
     content = db.Column(db.Text)  # JSON content for the activity
@@ -109,6 +136,7 @@ class Activity(db.Model):
             'id': self.id,
             'island_id': self.island_id,
             'name': self.name,
+            'slug': self.slug,
             'description': self.description,
             'activity_type': self.activity_type,
             'content': self.content,
@@ -119,10 +147,16 @@ class Activity(db.Model):
         }
 
 class UserProgress(db.Model):
+    __table_args__ = (
+        db.Index('uq_user_progress_user_activity', 'user_id', 'activity_id', unique=True),
+        db.Index('ix_user_progress_user_status', 'user_id', 'status'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     activity_id = db.Column(db.Integer, db.ForeignKey('activity.id'), nullable=False)
-    status = db.Column(db.String(20), default='not_started')  # not_started, in_progress, completed
+    # active_history so status transitions are visible to the counter hooks
+    status = db.column_property(db.Column(db.String(20), default='not_started'), active_history=True)  # not_started, in_progress, completed
     score = db.Column(db.Integer)
     attempts = db.Column(db.Integer, default=0)
     started_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -145,7 +179,7 @@ class Badge(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     icon = db.Column(db.String(100))  # Icon name or path
-    requirement_type = db.Column(db.String(50), nullable=False)  # points, activities, streak, etc.
+    requirement_type = db.Column(db.String(50), nullable=False)  # points, activities, island, streak, weekly_activities
     requirement_value = db.Column(db.Integer, nullable=False)
     theme = db.Column(db.String(20))  # superhelte, prinsesse, or null for both
     is_active = db.Column(db.Boolean, default=True)
@@ -164,6 +198,10 @@ class Badge(db.Model):
         }
 
 class UserBadge(db.Model):
+    __table_args__ = (
+        db.Index('uq_user_badge_user_badge', 'user_id', 'badge_id', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     badge_id = db.Column(db.Integer, db.ForeignKey('badge.id'), nullable=False)
@@ -177,11 +215,55 @@ class UserBadge(db.Model):
             'earned_at': self.earned_at.isoformat() if self.earned_at else None
         }
 
+class UserBadgeSet(db.Model):
+    """Compact copy of a user's earned badges, kept in step with UserBadge.
+
+    Bit n of `bits` is set when badge id n is earned. `earned_at` holds one
+    little-endian uint32 unix timestamp per set bit, in ascending badge order.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    bits = db.Column(db.LargeBinary, nullable=False, default=b'')
+    earned_at = db.Column(db.LargeBinary, nullable=False, default=b'')
+
+class CatalogueVersion(db.Model):
+    """Version counters for content cached in-process (e.g. 'badges')"""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class EventOutbox(db.Model):
+    """Progress events written with the triggering transaction and delivered after commit"""
+    __table_args__ = (
+        db.Index('ix_event_outbox_status_available_at', 'status', 'available_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    event_type = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.Text)  # JSON object
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, delivered, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Next delivery attempt / lease expiry
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+
+class StoredSession(db.Model):
+    """Server-side Flask session; the cookie only carries the signed sid"""
+    sid = db.Column(db.String(64), primary_key=True)
+    data = db.Column(db.Text, nullable=False)  # Tagged JSON, as Flask's cookie sessions
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
 class ChatSession(db.Model):
+    __table_args__ = (
+        db.Index('ix_chat_session_user_activity', 'user_id', 'activity_id', 'channel'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     activity_id = db.Column(db.Integer, db.ForeignKey('activity.id'), nullable=True)
-    messages = db.Column(db.Text)  # JSON array of messages
+    channel = db.Column(db.String(20), nullable=False, default='activity', server_default='activity')  # activity, mentor
+    last_seq = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # seq of the newest ChatMessage
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -190,8 +272,137 @@ class ChatSession(db.Model):
             'id': self.id,
             'user_id': self.user_id,
             'activity_id': self.activity_id,
-            'messages': self.messages,
+            'channel': self.channel,
+            'message_count': self.last_seq,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+class ChatMessage(db.Model):
+    """One chat message; appended with the next seq of its session, never rewritten"""
+    __table_args__ = (
+        db.UniqueConstraint('session_id', 'seq', name='uq_chat_message_session_seq'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('chat_session.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # user, assistant
+    content = db.Column(db.Text, nullable=False)
+    token_estimate = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'role': self.role,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class UserDailyActivity(db.Model):
+    """Per-user daily rollup, updated incrementally on every award"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_user_daily_activity_user_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    points = db.Column(db.Integer, default=0, nullable=False)
+    completions = db.Column(db.Integer, default=0, nullable=False)
+    active_minutes = db.Column(db.Integer, default=0, nullable=False)
+    streak_length = db.Column(db.Integer, default=1, nullable=False)  # Consecutive active days ending on this day
+
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'points': self.points,
+            'completions': self.completions,
+            'active_minutes': self.active_minutes,
+            'streak_length': self.streak_length
+        }
+
+
+class ArchivedUserProgress(db.Model):
+    """Completed UserProgress moved out of the hot table by the archiver"""
+    __table_args__ = (
+        db.Index('ix_archived_user_progress_user_activity', 'user_id', 'activity_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Same id as the original UserProgress row
+    user_id = db.Column(db.Integer, nullable=False)
+    activity_id = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20))
+    score = db.Column(db.Integer)
+    attempts = db.Column(db.Integer)
+    started_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'activity_id': self.activity_id,
+            'status': self.status,
+            'score': self.score,
+            'attempts': self.attempts,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'archived': True
+        }
+
+
+class ArchivedProgressRollup(db.Model):
+    """Per-user, per-island aggregates of archived progress, so hot-path totals stay exact"""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'island_id', name='uq_archived_progress_rollup_user_island'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    island_id = db.Column(db.Integer, nullable=False)
+    completed = db.Column(db.Integer, nullable=False, default=0)
+    total_score = db.Column(db.Integer, nullable=False, default=0)
+    total_attempts = db.Column(db.Integer, nullable=False, default=0)
+
+
+class ArchivedChatSession(db.Model):
+    """Chat sessions idle past the horizon, with their messages in ArchivedChatMessage"""
+    __table_args__ = (
+        db.Index('ix_archived_chat_session_user_activity', 'user_id', 'activity_id', 'channel'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)  # Same id as the original ChatSession row
+    user_id = db.Column(db.Integer, nullable=False)
+    activity_id = db.Column(db.Integer)
+    channel = db.Column(db.String(20))
+    last_seq = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class ArchivedChatMessage(db.Model):
+    __table_args__ = (
+        db.Index('ix_archived_chat_message_session_seq', 'session_id', 'seq'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(20))
+    content = db.Column(db.Text)
+    token_estimate = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'seq': self.seq,
+            'role': self.role,
+            'content': self.content,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
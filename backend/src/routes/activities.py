@@ -1,8 +1,17 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Activity, UserProgress, Island
+from src.models.user import db, UserProgress, ChatSession, ChatMessage, ArchivedChatMessage
 from src.services.openai_service import openai_service
+from src.services.rollup_service import record_completion
+from src.services.event_bus import publish_completion
+from src.services.chat_store import (get_or_create_session, append_message, get_history, get_tail,
+                                     ACTIVITY_CHANNEL, MENTOR_CHANNEL, HISTORY_PAGE_SIZE)
+from src.services.read_replica import read_only
+from src.services.query_budget import query_budget
+from src.services.catalogue import catalogue
+from src.services.current_user import current_user, current_snapshot
+from src.services.archive_service import archived_island_totals, get_archived_chat_session, was_completed
+from src.services import progress_repository, progress_service
 from datetime import datetime
-import json
 
 activities_bp = Blueprint('activities', __name__)
 
@@ -12,107 +21,19 @@ def require_child_auth():
         return jsonify({'error': 'Child authentication required'}), 401
     return None
 
-@activities_bp.route('/islands/<int:island_id>/activities', methods=['GET'])
-def get_island_activities(island_id):
-    """Get all activities for an island"""
-    auth_error = require_child_auth()
-    if auth_error:
-        return auth_error
-    
-    try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
-        
-        # Get island
-        island = Island.query.get(island_id)
-        if not island:
-            return jsonify({'error': 'Island not found'}), 404
-        
-        # Get activities for island
-        activities = Activity.query.filter_by(
-            island_id=island_id, 
-            is_active=True
-        ).order_by(Activity.order_number).all()
-        
-        # Get user progress for each activity
-        activities_with_progress = []
-        for activity in activities:
-            progress = UserProgress.query.filter_by(
-                user_id=user_id,
-                activity_id=activity.id
-            ).first()
-            
-            activity_data = activity.to_dict()
-            activity_data['progress'] = progress.to_dict() if progress else {
-                'status': 'not_started',
-                'score': None,
-                'attempts': 0
-            }
-            
-            activities_with_progress.append(activity_data)
-        
-        return jsonify({
-            'island': island.to_dict(),
-            'activities': activities_with_progress,
-            'user_theme': user.chosen_theme
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+# Island listings and /activities/<id>/start|complete live in routes/islands.py
 
-@activities_bp.route('/activities/<int:activity_id>/start', methods=['POST'])
-def start_activity(activity_id):
-    """Start an activity"""
-    auth_error = require_child_auth()
-    if auth_error:
-        return auth_error
-    
-    try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
-        
-        # Get activity
-        activity = Activity.query.get(activity_id)
-        if not activity:
-            return jsonify({'error': 'Activity not found'}), 404
-        
-        # Get or create progress
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity_id
-        ).first()
-        
-        if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                activity_id=activity_id,
-                status='in_progress'
-            )
-            db.session.add(progress)
-        else:
-            progress.status = 'in_progress'
-        
-        db.session.commit()
-        
-        # Generate dynamic content based on activity type
-        content = None
-        if activity.activity_type in ['quiz', 'prompt_builder', 'creative']:
-            content = openai_service.generate_activity_content(
-                activity.activity_type,
-                user.chosen_theme,
-                activity.difficulty_level
-            )
-        
-        return jsonify({
-            'activity': activity.to_dict(),
-            'progress': progress.to_dict(),
-            'content': content,
-            'user_theme': user.chosen_theme
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+def _complete_and_award(user, activity_id, score):
+    """Complete the activity and award `score` points, unless it was completed before"""
+    if was_completed(user.id, activity_id):
+        return None
+    progress = progress_repository.complete(user.id, activity_id, score)
+    if progress is None:
+        return None
+    user.total_points += score
+    record_completion(user.id, score, progress.started_at, progress.completed_at)
+    publish_completion(user.id, activity_id, score, score=score)
+    return progress
 
 @activities_bp.route('/activities/<int:activity_id>/submit', methods=['POST'])
 def submit_activity_answer(activity_id):
@@ -123,24 +44,19 @@ def submit_activity_answer(activity_id):
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         data = request.get_json()
         
         # Get activity and progress
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity_id
-        ).first()
-        
-        if not progress:
-            return jsonify({'error': 'Activity not started'}), 400
+        if not progress_service.is_unlocked(user, catalogue.island(activity.island_id)):
+            return jsonify({'error': 'Island not unlocked'}), 403
         
-        # Increment attempts
-        progress.attempts += 1
+        # Count the attempt (starting the activity if needed) in one statement
+        progress = progress_repository.record_attempt(user_id, activity_id)
         
         # Process answer based on activity type
         result = {}
@@ -159,12 +75,8 @@ def submit_activity_answer(activity_id):
             }
             
             if is_correct or progress.attempts >= 3:
-                progress.status = 'completed'
-                progress.score = score
-                progress.completed_at = datetime.utcnow()
-                
                 # Award points
-                user.total_points += score
+                _complete_and_award(user, activity_id, score)
                 
         elif activity.activity_type == 'prompt_builder':
             user_prompt = data.get('prompt', '')
@@ -182,12 +94,8 @@ def submit_activity_answer(activity_id):
                 'score': score
             }
             
-            progress.status = 'completed'
-            progress.score = score
-            progress.completed_at = datetime.utcnow()
-            
             # Award points
-            user.total_points += score
+            _complete_and_award(user, activity_id, score)
             
         elif activity.activity_type == 'chat':
             message = data.get('message', '')
@@ -196,31 +104,29 @@ def submit_activity_answer(activity_id):
             if not openai_service.moderate_content(message):
                 return jsonify({'error': 'Upassende indhold detekteret'}), 400
             
-            # Get chat history from session or create new
-            chat_history = session.get(f'chat_history_{activity_id}', [])
-            chat_history.append({"role": "user", "content": message})
+            # Messages are appended to the stored conversation; only the tail goes to the model
+            chat_session = get_or_create_session(user_id, activity_id, ACTIVITY_CHANNEL)
+            append_message(chat_session, 'user', message)
+            db.session.commit()  # Don't hold the write transaction open during the model call
             
             # Get AI response
             ai_response = openai_service.chat_with_ai(
-                chat_history, 
+                get_tail(chat_session.id), 
                 user.chosen_theme, 
                 'chat'
             )
             
-            chat_history.append({"role": "assistant", "content": ai_response})
-            session[f'chat_history_{activity_id}'] = chat_history
+            append_message(chat_session, 'assistant', ai_response)
             
             result = {
                 'ai_response': ai_response,
-                'chat_history': chat_history
+                'chat_history': get_history(chat_session.id)['messages'],
+                'message_count': chat_session.last_seq
             }
             
             # Award points for participation
-            if len(chat_history) >= 6:  # At least 3 exchanges
-                progress.status = 'completed'
-                progress.score = 80
-                progress.completed_at = datetime.utcnow()
-                user.total_points += 80
+            if chat_session.last_seq >= 6 and progress.status != 'completed':  # At least 3 exchanges
+                _complete_and_award(user, activity_id, 80)
             
         elif activity.activity_type == 'creative':
             user_prompt = data.get('prompt', '')
@@ -238,12 +144,8 @@ def submit_activity_answer(activity_id):
                 'score': score
             }
             
-            progress.status = 'completed'
-            progress.score = score
-            progress.completed_at = datetime.utcnow()
-            
             # Award points
-            user.total_points += score
+            _complete_and_award(user, activity_id, score)
         
         db.session.commit()
         
@@ -266,7 +168,7 @@ def get_activity_hint(activity_id):
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
         # Get progress
@@ -295,10 +197,10 @@ def chat_with_mentor(activity_id):
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
@@ -308,29 +210,68 @@ def chat_with_mentor(activity_id):
         if not openai_service.moderate_content(message):
             return jsonify({'error': 'Upassende indhold detekteret'}), 400
         
-        # Get chat history
-        chat_history = session.get(f'mentor_chat_{activity_id}', [])
-        chat_history.append({"role": "user", "content": message})
+        chat_session = get_or_create_session(user_id, activity_id, MENTOR_CHANNEL)
+        append_message(chat_session, 'user', message)
+        db.session.commit()  # Don't hold the write transaction open during the model call
         
         # Get AI response
         ai_response = openai_service.chat_with_ai(
-            chat_history,
+            get_tail(chat_session.id),
             user.chosen_theme,
             activity.activity_type
         )
         
-        chat_history.append({"role": "assistant", "content": ai_response})
-        session[f'mentor_chat_{activity_id}'] = chat_history
+        append_message(chat_session, 'assistant', ai_response)
+        db.session.commit()
         
         return jsonify({
             'response': ai_response,
-            'chat_history': chat_history
+            'chat_history': get_history(chat_session.id)['messages'],
+            'message_count': chat_session.last_seq
         }), 200
         
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@activities_bp.route('/activities/<int:activity_id>/chat/history', methods=['GET'])
+def get_chat_history(activity_id):
+    """Page through a stored conversation (?channel=mentor|activity&before=<seq>|after=<seq>&limit=&archived=1)"""
+    auth_error = require_child_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        channel = request.args.get('channel', MENTOR_CHANNEL)
+        if channel not in (MENTOR_CHANNEL, ACTIVITY_CHANNEL):
+            return jsonify({'error': 'Unknown channel'}), 400
+        
+        archived = request.args.get('archived', type=int) == 1
+        if archived:
+            chat_session = get_archived_chat_session(session['user_id'], activity_id, channel)
+        else:
+            chat_session = ChatSession.query.filter_by(
+                user_id=session['user_id'],
+                activity_id=activity_id,
+                channel=channel
+            ).order_by(ChatSession.id).first()
+        if not chat_session:
+            return jsonify({'messages': [], 'has_more': False, 'first_seq': None, 'last_seq': None}), 200
+        
+        return jsonify(get_history(
+            chat_session.id,
+            before_seq=request.args.get('before', type=int),
+            after_seq=request.args.get('after', type=int),
+            limit=request.args.get('limit', HISTORY_PAGE_SIZE, type=int),
+            message_model=ArchivedChatMessage if archived else ChatMessage
+        )), 200
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @activities_bp.route('/user/progress', methods=['GET'])
+@read_only
+@query_budget(6)
 def get_user_progress():
     """Get overall user progress"""
     auth_error = require_child_auth()
@@ -339,24 +280,27 @@ def get_user_progress():
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         
         # Get all progress
         progress_records = UserProgress.query.filter_by(user_id=user_id).all()
         
         # Calculate statistics
-        total_activities = Activity.query.filter_by(is_active=True).count()
-        completed_activities = len([p for p in progress_records if p.status == 'completed'])
-        total_score = sum([p.score for p in progress_records if p.score])
+        total_activities = len(catalogue.activities())
+        completed_activities = user.completed_count
+        archived = archived_island_totals([user_id]).get(user_id, {})
+        total_score = sum([p.score for p in progress_records if p.score]) + sum(
+            score for _, score, _ in archived.values()
+        )
         
         # Get island progress
         island_progress = {}
-        for island in Island.query.filter_by(is_active=True).all():
-            island_activities = Activity.query.filter_by(island_id=island.id, is_active=True).all()
+        for island in catalogue.islands():
+            island_activities = catalogue.activities(island.id)
             completed_in_island = len([
                 p for p in progress_records 
                 if p.activity_id in [a.id for a in island_activities] and p.status == 'completed'
-            ])
+            ]) + archived.get(island.id, (0, 0, 0))[0]
             
             island_progress[island.id] = {
                 'total': len(island_activities),
@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Activity, UserProgress
+from src.models.user import db, UserProgress
 from src.services.openai_service import openai_service
+from src.services.catalogue import catalogue
+from src.services.current_user import current_user, current_snapshot
+from src.services import progress_repository
+from src.services.rollup_service import record_activity, record_completion
+from src.services.event_bus import event_bus, ACTIVITY_STARTED, STEP_COMPLETED, ACTIVITY_COMPLETED, POINTS_AWARDED
 from datetime import datetime
 import json
 
+# Resolved through the in-process catalogue; see the slugs in database_init.ISLANDS
+ACTIVITY_SLUG = 'hvad-er-chatgpt'
+
 activity_1_bp = Blueprint('activity_1', __name__)
 
 def require_child_auth():
@@ -21,33 +29,20 @@ def start_activity_1():
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         
         # Get activity 1
-        activity = Activity.query.filter_by(
-            title="Hvad er ChatGPT?",
-            island_id=1
-        ).first()
+        activity = catalogue.activity_by_slug(ACTIVITY_SLUG)
         
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Get or create progress
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity.id
-        ).first()
-        
-        if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                activity_id=activity.id,
-                status='in_progress'
-            )
-            db.session.add(progress)
-        else:
-            progress.status = 'in_progress'
+        # Get or create progress in one statement
+        progress = progress_repository.start(user_id, activity.id)
+        if progress is None:
+            return jsonify({'error': 'Activity already completed'}), 400
         
+        event_bus.publish(ACTIVITY_STARTED, user_id, activity_id=activity.id)
         db.session.commit()
         
         # Generate personalized introduction based on theme
@@ -92,8 +87,7 @@ def get_activity_1_step(step_id):
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         
         if step_id == 1:
             # Step 1: Interactive story introduction
@@ -154,14 +148,13 @@ def submit_activity_1_step(step_id):
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         data = request.get_json()
         
         # Get activity and progress
-        activity = Activity.query.filter_by(
-            title="Hvad er ChatGPT?",
-            island_id=1
-        ).first()
+        activity = catalogue.activity_by_slug(ACTIVITY_SLUG)
+        if not activity:
+            return jsonify({'error': 'Activity not found'}), 404
         
         progress = UserProgress.query.filter_by(
             user_id=user_id,
@@ -225,6 +218,15 @@ def submit_activity_1_step(step_id):
         
         # Award points
         user.total_points += points_earned
+        if progress.status == 'completed':
+            record_completion(user_id, points_earned, progress.started_at, progress.completed_at)
+        else:
+            record_activity(user_id, points=points_earned)
+        
+        event_bus.publish(STEP_COMPLETED, user_id, activity_id=activity.id, step_id=step_id, score=result.get('score', 0))
+        if progress.status == 'completed':
+            event_bus.publish(ACTIVITY_COMPLETED, user_id, activity_id=activity.id, score=progress.score)
+        event_bus.publish(POINTS_AWARDED, user_id, activity_id=activity.id, points=points_earned)
         
         db.session.commit()
         
@@ -248,8 +250,7 @@ def get_activity_1_hint():
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
         step_id = data.get('step_id')
@@ -1,9 +1,18 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Activity, UserProgress
+from src.models.user import db, UserProgress
 from src.services.openai_service import openai_service
+from src.services.catalogue import catalogue
+from src.services.current_user import current_user, current_snapshot
+from src.services import progress_repository
+from src.services.rollup_service import record_activity, record_completion
+from src.services.event_bus import event_bus, ACTIVITY_STARTED, STEP_COMPLETED, ACTIVITY_COMPLETED, POINTS_AWARDED
+from src.services.conditional_get import conditional, user_tag
 from datetime import datetime
 import json
 
+# Resolved through the in-process catalogue; see the slugs in database_init.ISLANDS
+ACTIVITY_SLUG = 'dit-foerste-prompt'
+
 activity_2_bp = Blueprint('activity_2', __name__)
 
 def require_child_auth():
@@ -21,33 +30,20 @@ def start_activity_2():
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         
         # Get activity 2
-        activity = Activity.query.filter_by(
-            name="Dit første prompt",
-            island_id=1
-        ).first()
+        activity = catalogue.activity_by_slug(ACTIVITY_SLUG)
         
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Get or create progress
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity.id
-        ).first()
-        
-        if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                activity_id=activity.id,
-                status='in_progress'
-            )
-            db.session.add(progress)
-        else:
-            progress.status = 'in_progress'
+        # Get or create progress in one statement
+        progress = progress_repository.start(user_id, activity.id)
+        if progress is None:
+            return jsonify({'error': 'Activity already completed'}), 400
         
+        event_bus.publish(ACTIVITY_STARTED, user_id, activity_id=activity.id)
         db.session.commit()
         
         # Generate personalized introduction based on theme
@@ -92,8 +88,7 @@ def get_activity_2_step(step_id):
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         
         if step_id == 1:
             # Step 1: Guided first conversation
@@ -145,8 +140,7 @@ def build_prompt():
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
         prompt_parts = data.get('prompt_parts', {})
@@ -186,8 +180,7 @@ def test_prompt():
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
         user_prompt = data.get('prompt', '')
@@ -229,14 +222,13 @@ def submit_activity_2_step(step_id):
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         data = request.get_json()
         
         # Get activity and progress
-        activity = Activity.query.filter_by(
-            title="Dit første prompt",
-            island_id=1
-        ).first()
+        activity = catalogue.activity_by_slug(ACTIVITY_SLUG)
+        if not activity:
+            return jsonify({'error': 'Activity not found'}), 404
         
         progress = UserProgress.query.filter_by(
             user_id=user_id,
@@ -307,6 +299,15 @@ def submit_activity_2_step(step_id):
         
         # Award points
         user.total_points += points_earned
+        if progress.status == 'completed':
+            record_completion(user_id, points_earned, progress.started_at, progress.completed_at)
+        else:
+            record_activity(user_id, points=points_earned)
+        
+        event_bus.publish(STEP_COMPLETED, user_id, activity_id=activity.id, step_id=step_id, score=result.get('score', 0))
+        if progress.status == 'completed':
+            event_bus.publish(ACTIVITY_COMPLETED, user_id, activity_id=activity.id, score=progress.score)
+        event_bus.publish(POINTS_AWARDED, user_id, activity_id=activity.id, points=points_earned)
         
         db.session.commit()
         
@@ -330,8 +331,7 @@ def get_activity_2_hint():
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         data = request.get_json()
         
         step_id = data.get('step_id')
@@ -353,6 +353,7 @@ def get_activity_2_hint():
         return jsonify({'error': str(e)}), 500
 
 @activity_2_bp.route('/activity/2/prompt-templates', methods=['GET'])
+@conditional(user_tag)
 def get_prompt_templates():
     """Get prompt templates for beginners"""
     auth_error = require_child_auth()
@@ -360,8 +361,7 @@ def get_prompt_templates():
         return auth_error
     
     try:
-        user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_snapshot()
         
         templates = openai_service.get_beginner_prompt_templates(user.chosen_theme)
         
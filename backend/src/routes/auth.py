@@ -1,5 +1,8 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db, User, Parent, ParentChildRelation
+from src.services.event_bus import event_bus, THEME_SELECTED
+from src.services.parent_dashboard import get_children
+from src.services.current_user import current_user
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__)
@@ -79,6 +82,7 @@ def login():
         if user_type == 'child':
             user = User.query.filter_by(email=data['email']).first()
             if user and user.check_password(data['password']):
+                session.regenerate()
                 session['user_id'] = user.id
                 session['user_type'] = 'child'
                 return jsonify({
@@ -90,12 +94,12 @@ def login():
         elif user_type == 'parent':
             parent = Parent.query.filter_by(email=data['email']).first()
             if parent and parent.check_password(data['password']):
+                session.regenerate()
                 session['user_id'] = parent.id
                 session['user_type'] = 'parent'
                 
                 # Get children
-                relations = ParentChildRelation.query.filter_by(parent_id=parent.id).all()
-                children = [User.query.get(rel.child_id).to_dict() for rel in relations]
+                children = [child.to_dict() for child in get_children(parent.id)]
                 
                 return jsonify({
                     'message': 'Login successful',
@@ -126,7 +130,7 @@ def get_current_user():
         user_id = session['user_id']
         
         if user_type == 'child':
-            user = User.query.get(user_id)
+            user = current_user()
             if user:
                 return jsonify({
                     'user': user.to_dict(),
@@ -137,8 +141,7 @@ def get_current_user():
             parent = Parent.query.get(user_id)
             if parent:
                 # Get children
-                relations = ParentChildRelation.query.filter_by(parent_id=parent.id).all()
-                children = [User.query.get(rel.child_id).to_dict() for rel in relations]
+                children = [child.to_dict() for child in get_children(parent.id)]
                 
                 return jsonify({
                     'user': parent.to_dict(),
@@ -164,11 +167,12 @@ def select_theme():
         if theme not in ['superhelte', 'prinsesse']:
             return jsonify({'error': 'Invalid theme. Must be "superhelte" or "prinsesse"'}), 400
         
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
         user.chosen_theme = theme
+        event_bus.publish(THEME_SELECTED, user.id, theme=theme)
         db.session.commit()
         
         return jsonify({
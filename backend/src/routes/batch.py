@@ -0,0 +1,31 @@
+from flask import Blueprint, request, jsonify
+from src.services.batch_dispatcher import batch_dispatcher, validate, BatchError, MAX_REQUESTS
+
+batch_bp = Blueprint('batch', __name__)
+
+@batch_bp.route('/batch', methods=['POST'])
+def run_batch():
+    """Run several API calls in one round trip.
+
+    Body: {"requests": [{"id": ..., "method": "GET", "path": "/api/...", "body": {...}}],
+           "parallel": false}
+    Results come back in request order, each with its own status and body.
+    """
+    data = request.get_json(silent=True) or {}
+
+    try:
+        items = validate(data.get('requests'))
+    except BatchError as e:
+        return jsonify({'error': str(e), 'max_requests': MAX_REQUESTS}), 400
+
+    try:
+        results, cookies = batch_dispatcher.run(items, parallel=bool(data.get('parallel')))
+
+        response = jsonify({'responses': results})
+        # A sub-request that logged in or out changes the session cookie of the whole batch
+        for cookie in cookies:
+            response.headers.add('Set-Cookie', cookie)
+        return response
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
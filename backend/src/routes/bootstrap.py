@@ -0,0 +1,57 @@
+from flask import Blueprint, request, jsonify, session
+from src.services import child_dashboard
+from src.services.current_user import current_user
+from src.services.read_replica import read_only
+from src.services.query_budget import query_budget
+
+bootstrap_bp = Blueprint('bootstrap', __name__)
+
+# Sections a client can ask for with ?include=; all of them by default
+SECTIONS = ('islands', 'badges', 'progress', 'leaderboard')
+
+def require_child_auth():
+    """Decorator to require child authentication"""
+    if 'user_id' not in session or session.get('user_type') != 'child':
+        return jsonify({'error': 'Child authentication required'}), 401
+    return None
+
+@bootstrap_bp.route('/bootstrap', methods=['GET'])
+@read_only
+# Eight queries warm; a user's first read also rebuilds their badge set
+@query_budget(12)
+def get_bootstrap():
+    """Everything the child dashboard needs on first paint (?include=islands,badges,progress,leaderboard)"""
+    auth_error = require_child_auth()
+    if auth_error:
+        return auth_error
+
+    include = request.args.get('include')
+    sections = [s.strip() for s in include.split(',') if s.strip()] if include else list(SECTIONS)
+    unknown = [s for s in sections if s not in SECTIONS]
+    if unknown:
+        return jsonify({'error': f"Unknown sections: {', '.join(unknown)}", 'sections': list(SECTIONS)}), 400
+
+    try:
+        user = current_user()
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        # The island map and the progress summary share one progress query
+        progress_records = None
+        if 'islands' in sections or 'progress' in sections:
+            progress_records = child_dashboard.load_progress(user.id)
+
+        data = {'user': user.to_dict(), 'user_type': 'child'}
+        if 'islands' in sections:
+            data['islands'] = child_dashboard.island_map(user, progress_records)['islands']
+        if 'badges' in sections:
+            data['badges'] = child_dashboard.badges(user)
+        if 'progress' in sections:
+            data['progress'] = child_dashboard.progress_summary(user, progress_records)
+        if 'leaderboard' in sections:
+            data['leaderboard'] = child_dashboard.cached_leaderboard()[0]
+
+        return jsonify(data)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,5 +1,17 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Badge, UserBadge, UserProgress, Activity, Island
+from src.models.user import db, User, Badge
+from src.services.rollup_service import record_completion, get_current_streak, get_window_totals
+from src.services.badge_cache import load_earned_badges, award_badges
+from src.services.catalogue import catalogue, CATALOGUE
+from src.services.current_user import current_user
+from src.services.catalogue_version import bump_catalogue_version
+from src.services.user_counters import has_completed_island
+from src.services.event_bus import event_bus, publish_completion, ACTIVITY_STARTED, POINTS_AWARDED, THEME_SELECTED
+from src.services.read_replica import read_only
+from src.services.query_budget import query_budget
+from src.services.archive_service import was_completed, get_archived_progress, ARCHIVE_PAGE_SIZE
+from src.services import child_dashboard, progress_repository, progress_service
+from src.services.conditional_get import conditional, user_tag, leaderboard_tag, PUBLIC
 from datetime import datetime
 import json
 
@@ -28,56 +40,36 @@ def award_points():
             return jsonify({'error': 'Activity ID required'}), 400
         
         # Get user and activity
-        user = User.query.get(user_id)
-        activity = Activity.query.get(activity_id)
+        user = current_user()
+        activity = catalogue.activity(activity_id)
         
         if not user or not activity:
             return jsonify({'error': 'User or activity not found'}), 404
         
-        # Check if user already completed this activity
-        existing_progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity_id,
-            status='completed'
-        ).first()
+        if not progress_service.is_unlocked(user, catalogue.island(activity.island_id)):
+            return jsonify({'error': 'Island not unlocked'}), 403
         
-        if existing_progress:
+        # The upsert only completes a row that isn't completed yet, so double clicks can't award twice
+        progress = None
+        if not was_completed(user_id, activity_id):
+            progress = progress_repository.complete(user_id, activity.id, points)
+        if progress is None:
             return jsonify({'error': 'Activity already completed'}), 400
         
         # Award points
         user.total_points += points
         
-        # Update or create progress record
-        progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity_id
-        ).first()
-        
-        if not progress:
-            progress = UserProgress(
-                user_id=user_id,
-                activity_id=activity_id,
-                status='completed',
-                score=points,
-                attempts=1,
-                completed_at=datetime.utcnow()
-            )
-            db.session.add(progress)
-        else:
-            progress.status = 'completed'
-            progress.score = points
-            progress.completed_at = datetime.utcnow()
+        record_completion(user_id, points, progress.started_at, progress.completed_at)
         
-        db.session.commit()
+        # Badges are checked by the event bus once this commit succeeds
+        publish_completion(user_id, activity_id, points, score=points)
         
-        # Check for new badges
-        new_badges = check_and_award_badges(user)
+        db.session.commit()
         
         return jsonify({
             'message': 'Points awarded successfully',
             'points_awarded': points,
-            'total_points': user.total_points,
-            'new_badges': [badge.to_dict() for badge in new_badges]
+            'total_points': user.total_points
         })
         
     except Exception as e:
@@ -85,6 +77,8 @@ def award_points():
         return jsonify({'error': str(e)}), 500
 
 @gamification_bp.route('/badges', methods=['GET'])
+@read_only
+@conditional(user_tag)
 def get_user_badges():
     """Get all badges for the current user"""
     auth_error = require_child_auth()
@@ -93,88 +87,32 @@ def get_user_badges():
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get all available badges
-        all_badges = Badge.query.filter(
-            (Badge.theme == user.chosen_theme) | (Badge.theme.is_(None))
-        ).filter_by(is_active=True).all()
-        
-        # Get user's earned badges
-        user_badges = db.session.query(UserBadge, Badge).join(Badge).filter(
-            UserBadge.user_id == user_id
-        ).all()
-        
-        earned_badge_ids = {ub.badge_id for ub, _ in user_badges}
-        
-        badges_data = []
-        for badge in all_badges:
-            badge_dict = badge.to_dict()
-            badge_dict['earned'] = badge.id in earned_badge_ids
-            badge_dict['earned_at'] = None
-            
-            # Add earned date if user has this badge
-            for user_badge, _ in user_badges:
-                if user_badge.badge_id == badge.id:
-                    badge_dict['earned_at'] = user_badge.earned_at.isoformat()
-                    break
-            
-            badges_data.append(badge_dict)
-        
-        return jsonify({
-            'badges': badges_data,
-            'total_badges': len(all_badges),
-            'earned_badges': len(earned_badge_ids)
-        })
+        # Catalogue comes from the in-process cache, earned set from one row
+        return jsonify(child_dashboard.badges(user))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @gamification_bp.route('/leaderboard', methods=['GET'])
+@read_only
+@query_budget(3)
+@conditional(leaderboard_tag, PUBLIC)
 def get_leaderboard():
     """Get the top 5 users leaderboard"""
     try:
-        # Get top 5 users by points
-        top_users = User.query.filter_by(is_active=True).order_by(
-            User.total_points.desc()
-        ).limit(5).all()
-        
-        leaderboard_data = []
-        for i, user in enumerate(top_users, 1):
-            # Get user's badge count
-            badge_count = UserBadge.query.filter_by(user_id=user.id).count()
-            
-            # Get user's completion percentage
-            total_activities = Activity.query.filter_by(is_active=True).count()
-            completed_activities = UserProgress.query.filter_by(
-                user_id=user.id,
-                status='completed'
-            ).count()
-            
-            completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
-            
-            leaderboard_data.append({
-                'rank': i,
-                'username': user.username,
-                'theme': user.chosen_theme,
-                'total_points': user.total_points,
-                'badge_count': badge_count,
-                'completion_percentage': round(completion_percentage, 1),
-                'current_island': user.current_island
-            })
-        
-        return jsonify({
-            'leaderboard': leaderboard_data,
-            'total_users': User.query.filter_by(is_active=True).count()
-        })
+        return jsonify(child_dashboard.cached_leaderboard()[0])
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @gamification_bp.route('/progress', methods=['GET'])
+@read_only
+@query_budget(6)
 def get_user_progress():
     """Get detailed progress for the current user"""
     auth_error = require_child_auth()
@@ -183,61 +121,31 @@ def get_user_progress():
     
     try:
         user_id = session['user_id']
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get all user progress
-        progress_records = UserProgress.query.filter_by(user_id=user_id).all()
-        
-        # Get all activities
-        all_activities = Activity.query.filter_by(is_active=True).all()
-        total_activities = len(all_activities)
+        progress_records = child_dashboard.load_progress(user_id)
+        return jsonify(child_dashboard.progress_summary(user, progress_records))
         
-        # Calculate statistics
-        completed_activities = len([p for p in progress_records if p.status == 'completed'])
-        in_progress_activities = len([p for p in progress_records if p.status == 'in_progress'])
-        
-        completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
-        
-        # Get island progress
-        islands = Island.query.filter_by(is_active=True).order_by(Island.order_number).all()
-        island_progress = {}
-        
-        for island in islands:
-            island_activities = [a for a in all_activities if a.island_id == island.id]
-            island_completed = len([
-                p for p in progress_records 
-                if p.status == 'completed' and any(a.id == p.activity_id for a in island_activities)
-            ])
-            
-            island_progress[str(island.id)] = {
-                'name': island.name,
-                'total': len(island_activities),
-                'completed': island_completed,
-                'percentage': (island_completed / len(island_activities) * 100) if island_activities else 0
-            }
-        
-        # Get recent progress (last 5 activities)
-        recent_progress = UserProgress.query.filter_by(user_id=user_id).order_by(
-            UserProgress.completed_at.desc().nullslast(),
-            UserProgress.started_at.desc()
-        ).limit(5).all()
-        
-        return jsonify({
-            'statistics': {
-                'total_points': user.total_points,
-                'total_activities': total_activities,
-                'completed_activities': completed_activities,
-                'in_progress_activities': in_progress_activities,
-                'completion_percentage': round(completion_percentage, 1),
-                'current_island': user.current_island,
-                'badge_count': UserBadge.query.filter_by(user_id=user_id).count()
-            },
-            'island_progress': island_progress,
-            'recent_progress': [p.to_dict() for p in recent_progress]
-        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@gamification_bp.route('/progress/archive', methods=['GET'])
+@read_only
+def get_archived_user_progress():
+    """Page through progress moved to the archive (?before=<id>&limit=)"""
+    auth_error = require_child_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        return jsonify(get_archived_progress(
+            session['user_id'],
+            before_id=request.args.get('before', type=int),
+            limit=request.args.get('limit', ARCHIVE_PAGE_SIZE, type=int)
+        ))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -258,34 +166,16 @@ def start_activity():
             return jsonify({'error': 'Activity ID required'}), 400
         
         # Check if activity exists
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Check if already started or completed
-        existing_progress = UserProgress.query.filter_by(
-            user_id=user_id,
-            activity_id=activity_id
-        ).first()
-        
-        if existing_progress:
-            if existing_progress.status == 'completed':
-                return jsonify({'error': 'Activity already completed'}), 400
-            else:
-                # Update attempts
-                existing_progress.attempts += 1
-                existing_progress.started_at = datetime.utcnow()
-        else:
-            # Create new progress record
-            progress = UserProgress(
-                user_id=user_id,
-                activity_id=activity_id,
-                status='in_progress',
-                attempts=1,
-                started_at=datetime.utcnow()
-            )
-            db.session.add(progress)
+        # Restarting counts another attempt; a completed activity can't be started again
+        progress = progress_repository.start(user_id, activity.id, allow_completed=False)
+        if progress is None:
+            return jsonify({'error': 'Activity already completed'}), 400
         
+        event_bus.publish(ACTIVITY_STARTED, user_id, activity_id=activity_id)
         db.session.commit()
         
         return jsonify({
@@ -299,80 +189,66 @@ def start_activity():
         return jsonify({'error': str(e)}), 500
 
 def check_and_award_badges(user):
-    """Check if user qualifies for new badges and award them"""
-    new_badges = []
+    """Check if user qualifies for new badges and award them.
+
+    Errors propagate so the event bus rolls back and retries the delivery.
+    """
+    qualifying = []
     
-    try:
-        # Get all available badges for user's theme
-        available_badges = Badge.query.filter(
-            (Badge.theme == user.chosen_theme) | (Badge.theme.is_(None))
-        ).filter_by(is_active=True).all()
+    # Get all available badges for user's theme
+    available_badges = catalogue.badges_for_theme(user.chosen_theme)
+    
+    # Get user's current badges
+    earned = load_earned_badges(user.id, badge_count=user.badge_count)
+    
+    for badge in available_badges:
+        if earned.has(badge.id):
+            continue  # User already has this badge
         
-        # Get user's current badges
-        current_badge_ids = {ub.badge_id for ub in UserBadge.query.filter_by(user_id=user.id).all()}
+        # Check if user qualifies for this badge
+        qualifies = False
         
-        for badge in available_badges:
-            if badge.id in current_badge_ids:
-                continue  # User already has this badge
-            
-            # Check if user qualifies for this badge
-            qualifies = False
-            
-            if badge.requirement_type == 'points':
-                qualifies = user.total_points >= badge.requirement_value
-            
-            elif badge.requirement_type == 'activities':
-                completed_count = UserProgress.query.filter_by(
-                    user_id=user.id,
-                    status='completed'
-                ).count()
-                qualifies = completed_count >= badge.requirement_value
-            
-            elif badge.requirement_type == 'island':
-                # Check if user completed specific island
-                island_activities = Activity.query.filter_by(
-                    island_id=badge.requirement_value,
-                    is_active=True
-                ).all()
-                
-                completed_island_activities = UserProgress.query.filter(
-                    UserProgress.user_id == user.id,
-                    UserProgress.status == 'completed',
-                    UserProgress.activity_id.in_([a.id for a in island_activities])
-                ).count()
-                
-                qualifies = completed_island_activities == len(island_activities)
-            
-            elif badge.requirement_type == 'streak':
-                # For now, just award based on consecutive days (simplified)
-                qualifies = user.total_points >= badge.requirement_value * 10
-            
-            if qualifies:
-                # Award the badge
-                user_badge = UserBadge(
-                    user_id=user.id,
-                    badge_id=badge.id,
-                    earned_at=datetime.utcnow()
-                )
-                db.session.add(user_badge)
-                new_badges.append(badge)
-        
-        if new_badges:
-            db.session.commit()
+        if badge.requirement_type == 'points':
+            qualifies = user.total_points >= badge.requirement_value
         
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error checking badges: {e}")
+        elif badge.requirement_type == 'activities':
+            qualifies = user.completed_count >= badge.requirement_value
+        
+        elif badge.requirement_type == 'island':
+            # Completed islands are tracked as bits on the user row
+            qualifies = has_completed_island(user, badge.requirement_value)
+        
+        elif badge.requirement_type == 'streak':
+            # Consecutive active days, read from the daily rollups
+            qualifies = get_current_streak(user.id) >= badge.requirement_value
+        
+        elif badge.requirement_type == 'weekly_activities':
+            # Completed activities over the last 7 days
+            qualifies = get_window_totals(user.id, days=7)['completions'] >= badge.requirement_value
+        
+        if qualifies:
+            qualifying.append(badge)
+    
+    # Award them; a badge a concurrent evaluation already inserted is skipped
+    awarded = set(award_badges(user.id, [badge.id for badge in qualifying], datetime.utcnow()))
+    new_badges = [badge for badge in qualifying if badge.id in awarded]
+    
+    if new_badges or earned.rebuilt:
+        db.session.commit()
     
     return new_badges
 
+@event_bus.subscribe(POINTS_AWARDED, THEME_SELECTED)
+def award_badges_on_progress(event):
+    """Event bus subscriber: award any badges the user now qualifies for"""
+    user = User.query.get(event.user_id)
+    if user:
+        check_and_award_badges(user)
+
 # Seed badges data
 def seed_badges():
-    """Seed initial badges data"""
+    """Seed badges that don't exist yet (matched by name); returns how many were created"""
     try:
-        if Badge.query.count() > 0:
-            return  # Already seeded
-        
         badges_data = [
             # Universal badges (both themes)
             {
@@ -415,6 +291,22 @@ def seed_badges():
                 'requirement_value': 500,
                 'theme': None
             },
+            {
+                'name': 'Tre Dage i Træk',
+                'description': 'Vær aktiv 3 dage i træk',
+                'icon': '🔥',
+                'requirement_type': 'streak',
+                'requirement_value': 3,
+                'theme': None
+            },
+            {
+                'name': 'Travl Uge',
+                'description': 'Fuldfør 5 aktiviteter på en uge',
+                'icon': '📅',
+                'requirement_type': 'weekly_activities',
+                'requirement_value': 5,
+                'theme': None
+            },
             
             # Superhelte theme badges
             {
@@ -469,14 +361,21 @@ def seed_badges():
             }
         ]
         
-        for badge_data in badges_data:
+        existing_names = {name for (name,) in db.session.query(Badge.name)}
+        missing = [badge_data for badge_data in badges_data if badge_data['name'] not in existing_names]
+        if not missing:
+            return 0  # Already seeded
+        
+        for badge_data in missing:
             badge = Badge(**badge_data)
             db.session.add(badge)
         
+        bump_catalogue_version(CATALOGUE)
         db.session.commit()
-        print("Badges seeded successfully!")
+        return len(missing)
         
     except Exception as e:
         db.session.rollback()
         print(f"Error seeding badges: {e}")
+        return 0
 
@@ -1,77 +1,60 @@
 from flask import Blueprint, request, jsonify, session
-from src.models.user import db, User, Island, Activity, UserProgress
+from src.models.user import db
+from src.services import progress_service
+from src.services.progress_service import ProgressError
+from src.services.read_replica import read_only
+from src.services.query_budget import query_budget
+from src.services.conditional_get import conditional, user_tag
+from src.services.catalogue import catalogue
+from src.services.current_user import current_user
+from src.services import child_dashboard
 
 islands_bp = Blueprint('islands', __name__)
 
 @islands_bp.route('/islands', methods=['GET'])
+@read_only
+@query_budget(4)
+@conditional(user_tag)
 def get_islands():
     """Get all islands for current user"""
     try:
         if 'user_id' not in session or session.get('user_type') != 'child':
             return jsonify({'error': 'Child authentication required'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        islands = Island.query.filter_by(is_active=True).order_by(Island.order_number).all()
-        
-        islands_data = []
-        for island in islands:
-            # Check if island is unlocked
-            is_unlocked = user.total_points >= island.unlock_requirement
-            
-            # Get activities for this island
-            activities = Activity.query.filter_by(island_id=island.id, is_active=True).order_by(Activity.order_number).all()
-            
-            # Get user progress for activities
-            activities_data = []
-            for activity in activities:
-                progress = UserProgress.query.filter_by(user_id=user.id, activity_id=activity.id).first()
-                activity_data = activity.to_dict()
-                activity_data['progress'] = progress.to_dict() if progress else None
-                activities_data.append(activity_data)
-            
-            island_data = island.to_dict()
-            island_data['is_unlocked'] = is_unlocked
-            island_data['activities'] = activities_data
-            islands_data.append(island_data)
-        
-        return jsonify({
-            'islands': islands_data,
-            'user': user.to_dict()
-        }), 200
+        # Islands and activities come from the in-process catalogue; progress is one query
+        progress_records = child_dashboard.load_progress(user.id)
+        return jsonify(child_dashboard.island_map(user, progress_records)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @islands_bp.route('/islands/<int:island_id>/activities', methods=['GET'])
+@read_only
+@query_budget(4)
+@conditional(user_tag)
 def get_island_activities(island_id):
     """Get activities for specific island"""
     try:
         if 'user_id' not in session or session.get('user_type') != 'child':
             return jsonify({'error': 'Child authentication required'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        island = Island.query.get(island_id)
+        island = catalogue.island(island_id)
         if not island:
             return jsonify({'error': 'Island not found'}), 404
         
-        # Check if island is unlocked
-        if user.total_points < island.unlock_requirement:
+        if not progress_service.is_unlocked(user, island):
             return jsonify({'error': 'Island not unlocked'}), 403
         
-        activities = Activity.query.filter_by(island_id=island_id, is_active=True).order_by(Activity.order_number).all()
-        
-        activities_data = []
-        for activity in activities:
-            progress = UserProgress.query.filter_by(user_id=user.id, activity_id=activity.id).first()
-            activity_data = activity.to_dict()
-            activity_data['progress'] = progress.to_dict() if progress else None
-            activities_data.append(activity_data)
+        # One progress query for the whole island instead of one per activity
+        activities_data = progress_service.island_activities(user, island)
         
         return jsonify({
             'island': island.to_dict(),
@@ -88,27 +71,15 @@ def start_activity(activity_id):
         if 'user_id' not in session or session.get('user_type') != 'child':
             return jsonify({'error': 'Child authentication required'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Check if island is unlocked
-        island = Island.query.get(activity.island_id)
-        if user.total_points < island.unlock_requirement:
-            return jsonify({'error': 'Island not unlocked'}), 403
-        
-        # Get or create progress
-        progress = UserProgress.query.filter_by(user_id=user.id, activity_id=activity_id).first()
-        if not progress:
-            progress = UserProgress(user_id=user.id, activity_id=activity_id)
-            db.session.add(progress)
-        
-        progress.status = 'in_progress'
-        progress.attempts += 1
+        progress = progress_service.start(user, activity)
         db.session.commit()
         
         return jsonify({
@@ -117,6 +88,9 @@ def start_activity(activity_id):
             'progress': progress.to_dict()
         }), 200
         
+    except ProgressError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -128,31 +102,18 @@ def complete_activity(activity_id):
         if 'user_id' not in session or session.get('user_type') != 'child':
             return jsonify({'error': 'Child authentication required'}), 401
         
-        data = request.get_json()
+        data = request.get_json() or {}
         score = data.get('score', 0)
         
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             return jsonify({'error': 'Activity not found'}), 404
         
-        # Get progress
-        progress = UserProgress.query.filter_by(user_id=user.id, activity_id=activity_id).first()
-        if not progress:
-            return jsonify({'error': 'Activity not started'}), 400
-        
-        # Update progress
-        progress.status = 'completed'
-        progress.score = score
-        progress.completed_at = db.func.now()
-        
-        # Award points
-        points_earned = activity.points_reward
-        user.total_points += points_earned
-        
+        progress, points_earned = progress_service.complete(user, activity, score)
         db.session.commit()
         
         return jsonify({
@@ -162,6 +123,9 @@ def complete_activity(activity_id):
             'progress': progress.to_dict()
         }), 200
         
+    except ProgressError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), e.status
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify, session
+from src.models.user import Parent
+from src.services.parent_dashboard import get_dashboard
+from src.services.read_replica import read_only
+from src.services.query_budget import query_budget
+
+parent_bp = Blueprint('parent', __name__)
+
+def require_parent_auth():
+    """Decorator to require parent authentication"""
+    if 'user_id' not in session or session.get('user_type') != 'parent':
+        return jsonify({'error': 'Parent authentication required'}), 401
+    return None
+
+@parent_bp.route('/dashboard', methods=['GET'])
+@read_only
+@query_budget(8)
+def get_parent_dashboard():
+    """Get progress, badges and recent activity for all of the parent's children"""
+    auth_error = require_parent_auth()
+    if auth_error:
+        return auth_error
+    
+    try:
+        parent = Parent.query.get(session['user_id'])
+        if not parent:
+            return jsonify({'error': 'Parent not found'}), 404
+        
+        dashboard = get_dashboard(parent.id)
+        
+        return jsonify({
+            'parent': parent.to_dict(),
+            'children': dashboard['children']
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -32,9 +32,9 @@ class ActivityEngine:
         """
         Henter og genererer indhold til en aktivitet baseret på brugerens tema
         """
-        from ..models.user import Activity
+        from .catalogue import catalogue
         
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             raise ValueError(f"Activity {activity_id} not found")
         
@@ -63,9 +63,9 @@ class ActivityEngine:
         """
         Evaluerer brugerens svar på en aktivitet og returnerer feedback
         """
-        from ..models.user import Activity
+        from .catalogue import catalogue
         
-        activity = Activity.query.get(activity_id)
+        activity = catalogue.activity(activity_id)
         if not activity:
             raise ValueError(f"Activity {activity_id} not found")
         
@@ -0,0 +1,207 @@
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from src.models.user import (db, User, Activity, UserProgress, ChatSession, ChatMessage, ArchivedUserProgress,
+                             ArchivedProgressRollup, ArchivedChatSession, ArchivedChatMessage)
+
+# Default horizons for `flask archive progress|chats`
+PROGRESS_DAYS = int(os.environ.get('ARCHIVE_PROGRESS_DAYS', 365))
+CHAT_DAYS = int(os.environ.get('ARCHIVE_CHAT_DAYS', 90))
+
+ARCHIVE_PAGE_SIZE = 50
+MAX_ARCHIVE_PAGE_SIZE = 200
+
+_PROGRESS_COLUMNS = ('id', 'user_id', 'activity_id', 'status', 'score', 'attempts', 'started_at', 'completed_at')
+_SESSION_COLUMNS = ('id', 'user_id', 'activity_id', 'channel', 'last_seq', 'created_at', 'updated_at')
+_MESSAGE_COLUMNS = ('id', 'session_id', 'seq', 'role', 'content', 'token_estimate', 'created_at')
+
+
+def horizon(days: int) -> datetime:
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def _move(source, target, columns, condition, archived_at=None):
+    """INSERT ... SELECT matching rows into the archive table, then DELETE them from the hot one"""
+    source, target = source.__table__, target.__table__
+    selected = [source.c[name] for name in columns]
+    target_columns = list(columns)
+    if archived_at is not None:
+        selected.append(db.literal(archived_at, db.DateTime))
+        target_columns.append('archived_at')
+
+    db.session.execute(db.insert(target).from_select(target_columns, db.select(*selected).where(condition)))
+    return db.session.execute(db.delete(source).where(condition)).rowcount
+
+
+def _add_to_rollups(progress_ids):
+    """Fold a batch of completed progress rows into the per-island rollups"""
+    groups = db.session.query(
+        UserProgress.user_id,
+        db.func.coalesce(Activity.island_id, 0),
+        db.func.count(UserProgress.id),
+        db.func.coalesce(db.func.sum(UserProgress.score), 0),
+        db.func.coalesce(db.func.sum(UserProgress.attempts), 0)
+    ).outerjoin(Activity, Activity.id == UserProgress.activity_id).filter(
+        UserProgress.id.in_(progress_ids)
+    ).group_by(UserProgress.user_id, db.func.coalesce(Activity.island_id, 0)).all()
+
+    existing = set(db.session.query(ArchivedProgressRollup.user_id, ArchivedProgressRollup.island_id).filter(
+        ArchivedProgressRollup.user_id.in_({user_id for user_id, *_ in groups})
+    ))
+
+    updates, inserts = [], []
+    for user_id, island_id, completed, score, attempts in groups:
+        row = {'b_user_id': user_id, 'b_island_id': island_id, 'b_completed': completed,
+               'b_score': int(score), 'b_attempts': int(attempts)}
+        (updates if (user_id, island_id) in existing else inserts).append(row)
+
+    rollup = ArchivedProgressRollup.__table__
+    if updates:
+        db.session.execute(
+            rollup.update().where(
+                rollup.c.user_id == db.bindparam('b_user_id'),
+                rollup.c.island_id == db.bindparam('b_island_id')
+            ).values(
+                completed=rollup.c.completed + db.bindparam('b_completed'),
+                total_score=rollup.c.total_score + db.bindparam('b_score'),
+                total_attempts=rollup.c.total_attempts + db.bindparam('b_attempts')
+            ),
+            updates
+        )
+    if inserts:
+        db.session.execute(rollup.insert(), [
+            {'user_id': row['b_user_id'], 'island_id': row['b_island_id'], 'completed': row['b_completed'],
+             'total_score': row['b_score'], 'total_attempts': row['b_attempts']}
+            for row in inserts
+        ])
+
+
+def archive_progress(before: datetime, batch_size: int = 1000, report=print) -> int:
+    """Move completed UserProgress rows finished before `before` into the archive.
+
+    Each batch copies the rows, adds them to the per-island rollups and
+    deletes them from user_progress in one transaction. The delete bypasses
+    the session, so User.completed_count and island bits keep counting
+    archived completions.
+    """
+    archived = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.session.query(UserProgress.id).filter(
+            UserProgress.id > last_id,
+            UserProgress.status == 'completed',
+            UserProgress.completed_at < before
+        ).order_by(UserProgress.id).limit(batch_size).with_for_update(skip_locked=True).all()]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        _add_to_rollups(ids)
+        # Archived rows drop out of the users' progress listings
+        db.session.execute(db.update(User).where(
+            User.id.in_(db.select(UserProgress.user_id).where(UserProgress.id.in_(ids)))
+        ).values(state_version=User.state_version + 1))
+        archived += _move(UserProgress, ArchivedUserProgress, _PROGRESS_COLUMNS,
+                          UserProgress.id.in_(ids), archived_at=datetime.utcnow())
+        db.session.commit()
+        report(f"Archive: {archived} progress rows archived")
+
+    return archived
+
+
+def archive_chats(before: datetime, batch_size: int = 200, report=print) -> int:
+    """Move chat sessions idle since before `before`, with their messages, into the archive"""
+    archived = 0
+    last_id = 0
+    while True:
+        ids = [row[0] for row in db.session.query(ChatSession.id).filter(
+            ChatSession.id > last_id,
+            ChatSession.updated_at < before
+        ).order_by(ChatSession.id).limit(batch_size).with_for_update(skip_locked=True).all()]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        _move(ChatMessage, ArchivedChatMessage, _MESSAGE_COLUMNS, ChatMessage.session_id.in_(ids))
+        archived += _move(ChatSession, ArchivedChatSession, _SESSION_COLUMNS,
+                          ChatSession.id.in_(ids), archived_at=datetime.utcnow())
+        db.session.commit()
+        report(f"Archive: {archived} chat sessions archived")
+
+    return archived
+
+
+def was_completed(user_id: int, activity_id: int) -> bool:
+    """Whether the user completed the activity in an archived period"""
+    return db.session.query(db.exists().where(
+        ArchivedUserProgress.user_id == user_id,
+        ArchivedUserProgress.activity_id == activity_id
+    )).scalar()
+
+
+def archived_activity_ids(user_id: int, activity_ids: Optional[Iterable[int]] = None) -> Set[int]:
+    """Activities the user completed in an archived period; reads only ix_archived_user_progress_user_activity"""
+    query = db.session.query(ArchivedUserProgress.activity_id).filter(ArchivedUserProgress.user_id == user_id)
+    if activity_ids is not None:
+        query = query.filter(ArchivedUserProgress.activity_id.in_(list(activity_ids)))
+    return {activity_id for (activity_id,) in query}
+
+
+def archived_progress_stub(user_id: int, activity_id: int) -> Dict[str, Any]:
+    """Listing entry for an archived completion; the full row is on /progress/archive"""
+    return {
+        'id': None,
+        'user_id': user_id,
+        'activity_id': activity_id,
+        'status': 'completed',
+        'score': None,
+        'attempts': None,
+        'started_at': None,
+        'completed_at': None,
+        'archived': True
+    }
+
+
+def archived_island_totals(user_ids: Iterable[int]) -> Dict[int, Dict[int, Tuple[int, int, int]]]:
+    """{user_id: {island_id: (completed, total_score, total_attempts)}} from the rollups"""
+    totals: Dict[int, Dict[int, Tuple[int, int, int]]] = {}
+    for row in ArchivedProgressRollup.query.filter(ArchivedProgressRollup.user_id.in_(list(user_ids))):
+        totals.setdefault(row.user_id, {})[row.island_id] = (row.completed, row.total_score, row.total_attempts)
+    return totals
+
+
+def get_archived_progress(user_id: int, before_id: Optional[int] = None,
+                          limit: int = ARCHIVE_PAGE_SIZE) -> Dict[str, Any]:
+    """One page of the user's archived progress, newest first, keyset-paginated on id"""
+    limit = max(1, min(limit, MAX_ARCHIVE_PAGE_SIZE))
+    query = ArchivedUserProgress.query.filter(ArchivedUserProgress.user_id == user_id)
+    if before_id is not None:
+        query = query.filter(ArchivedUserProgress.id < before_id)
+
+    rows = query.order_by(ArchivedUserProgress.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'progress': [row.to_dict() for row in rows],
+        'has_more': has_more,
+        'next_before': rows[-1].id if has_more else None
+    }
+
+
+def get_archived_chat_session(user_id: int, activity_id: Optional[int], channel: str) -> Optional[ArchivedChatSession]:
+    """The user's newest archived session for an activity and channel"""
+    return ArchivedChatSession.query.filter_by(
+        user_id=user_id,
+        activity_id=activity_id,
+        channel=channel
+    ).order_by(ArchivedChatSession.id.desc()).first()
+
+
+def delete_user_archive(user_id: int):
+    """Remove a deleted user's archived rows (the archive tables have no foreign keys)"""
+    session_ids = db.select(ArchivedChatSession.id).where(ArchivedChatSession.user_id == user_id)
+    db.session.execute(db.delete(ArchivedChatMessage).where(ArchivedChatMessage.session_id.in_(session_ids)))
+    db.session.execute(db.delete(ArchivedChatSession).where(ArchivedChatSession.user_id == user_id))
+    db.session.execute(db.delete(ArchivedUserProgress).where(ArchivedUserProgress.user_id == user_id))
+    db.session.execute(db.delete(ArchivedProgressRollup).where(ArchivedProgressRollup.user_id == user_id))
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from src.models.user import db, User, Badge, UserBadge, UserBadgeSet, UserDailyActivity
+
+
+def _qualifying_users(badge: Badge, first_id: int, last_id: int, today):
+    """SELECT of user ids in [first_id, last_id] that meet the badge rule, or None for unknown rules"""
+    if badge.requirement_type == 'points':
+        return db.select(User.id).where(
+            User.id.between(first_id, last_id),
+            User.total_points >= badge.requirement_value
+        )
+
+    # Activity and island rules read the counters, which include archived progress
+    if badge.requirement_type == 'activities':
+        return db.select(User.id).where(
+            User.id.between(first_id, last_id),
+            User.completed_count >= badge.requirement_value
+        )
+
+    if badge.requirement_type == 'island':
+        return db.select(User.id).where(
+            User.id.between(first_id, last_id),
+            User.island_bits.op('&')(1 << badge.requirement_value) != 0
+        )
+
+    if badge.requirement_type == 'streak':
+        # A rollup from today or yesterday carries the user's live streak
+        return db.select(UserDailyActivity.user_id).where(
+            UserDailyActivity.user_id.between(first_id, last_id),
+            UserDailyActivity.day >= today - timedelta(days=1),
+            UserDailyActivity.streak_length >= badge.requirement_value
+        ).distinct()
+
+    if badge.requirement_type == 'weekly_activities':
+        return db.select(UserDailyActivity.user_id).where(
+            UserDailyActivity.user_id.between(first_id, last_id),
+            UserDailyActivity.day > today - timedelta(days=7)
+        ).group_by(UserDailyActivity.user_id).having(
+            db.func.sum(UserDailyActivity.completions) >= badge.requirement_value
+        )
+
+    return None
+
+
+def backfill_badge(badge: Badge, chunk_size: int = 5000, report=print) -> int:
+    """Award one badge to every qualifying user with set-based INSERT ... SELECT statements.
+
+    Users are walked in id ranges of `chunk_size`; each range is one statement
+    and one commit. Affected users' cached badge sets are dropped so they are
+    rebuilt from UserBadge on next read.
+    """
+    bounds = db.session.query(db.func.min(User.id), db.func.max(User.id)).one()
+    if bounds[0] is None:
+        return 0
+
+    run_at = datetime.utcnow().replace(microsecond=0)
+    today = run_at.date()
+    awarded = 0
+
+    for first_id in range(bounds[0], bounds[1] + 1, chunk_size):
+        last_id = first_id + chunk_size - 1
+
+        qualifying = _qualifying_users(badge, first_id, last_id, today)
+        if qualifying is None:
+            report(f"Badge {badge.id} ({badge.name}): no set-based rule for '{badge.requirement_type}', skipped")
+            return 0
+
+        candidates = db.select(
+            User.id,
+            db.literal(badge.id, db.Integer),
+            db.literal(run_at, db.DateTime)
+        ).where(
+            User.id.in_(qualifying),
+            ~db.exists().where(UserBadge.user_id == User.id, UserBadge.badge_id == badge.id)
+        )
+        if badge.theme is not None:
+            candidates = candidates.where(User.chosen_theme == badge.theme)
+
+        inserted = db.session.execute(
+            db.insert(UserBadge).from_select(['user_id', 'badge_id', 'earned_at'], candidates)
+        ).rowcount
+
+        if inserted:
+            awarded_now = db.select(UserBadge.user_id).where(
+                UserBadge.badge_id == badge.id,
+                UserBadge.earned_at == run_at,
+                UserBadge.user_id.between(first_id, last_id)
+            )
+            db.session.execute(db.delete(UserBadgeSet).where(UserBadgeSet.user_id.in_(awarded_now)))
+            # Bulk inserts bypass the flush hook that maintains User.badge_count
+            db.session.execute(db.update(User).where(User.id.in_(awarded_now)).values(
+                badge_count=User.badge_count + 1,
+                state_version=User.state_version + 1
+            ))
+        db.session.commit()
+
+        awarded += inserted
+        report(f"Badge {badge.id} ({badge.name}): users {first_id}-{min(last_id, bounds[1])}, {awarded} awarded so far")
+
+    return awarded
+
+
+def backfill_badges(badge_id: Optional[int] = None, chunk_size: int = 5000, report=print) -> int:
+    """Backfill one badge, or every active badge when no id is given"""
+    query = Badge.query.filter_by(is_active=True)
+    if badge_id is not None:
+        query = Badge.query.filter_by(id=badge_id)
+
+    total = 0
+    for badge in query.order_by(Badge.id).all():
+        total += backfill_badge(badge, chunk_size=chunk_size, report=report)
+    return total
@@ -0,0 +1,118 @@
+import struct
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from src.models.user import db, UserBadge, UserBadgeSet
+from src.services.progress_repository import dialect_insert
+from src.services.user_counters import apply_counter_deltas
+
+_TIMESTAMP = struct.Struct('<I')
+
+
+class EarnedBadges:
+    """Decoded UserBadgeSet with O(1) membership by badge ordinal"""
+
+    __slots__ = ('bits', 'timestamps', 'rebuilt')
+
+    def __init__(self, bits: int = 0, timestamps=None, rebuilt: bool = False):
+        self.bits = bits
+        self.timestamps = list(timestamps or [])
+        self.rebuilt = rebuilt
+
+    @classmethod
+    def decode(cls, bits: bytes, earned_at: bytes) -> 'EarnedBadges':
+        return cls(
+            int.from_bytes(bits or b'', 'little'),
+            [value for (value,) in _TIMESTAMP.iter_unpack(earned_at or b'')]
+        )
+
+    def encode(self) -> Tuple[bytes, bytes]:
+        bits = self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little')
+        return bits, b''.join(_TIMESTAMP.pack(value) for value in self.timestamps)
+
+    @property
+    def count(self) -> int:
+        return self.bits.bit_count()
+
+    def has(self, ordinal: int) -> bool:
+        return (self.bits >> ordinal) & 1 == 1
+
+    def _rank(self, ordinal: int) -> int:
+        return (self.bits & ((1 << ordinal) - 1)).bit_count()
+
+    def earned_at(self, ordinal: int) -> Optional[datetime]:
+        if not self.has(ordinal):
+            return None
+        return datetime.utcfromtimestamp(self.timestamps[self._rank(ordinal)])
+
+    def add(self, ordinal: int, earned_at: datetime):
+        if self.has(ordinal):
+            return
+        timestamp = int((earned_at - datetime(1970, 1, 1)).total_seconds())
+        self.timestamps.insert(self._rank(ordinal), timestamp)
+        self.bits |= 1 << ordinal
+
+
+def rebuild_earned_badges(user_id: int) -> EarnedBadges:
+    """The user's earned set read from UserBadge (`rebuilt` is True)"""
+    earned = EarnedBadges(rebuilt=True)
+    for badge_id, earned_at in db.session.query(UserBadge.badge_id, UserBadge.earned_at).filter(
+        UserBadge.user_id == user_id
+    ).order_by(UserBadge.badge_id):
+        earned.add(badge_id, earned_at or datetime.utcnow())
+    return earned
+
+
+def load_earned_badges(user_id: int, persist: bool = True, badge_count: Optional[int] = None) -> EarnedBadges:
+    """Read the user's earned set in one primary-key lookup.
+
+    Users without a set yet, or whose set disagrees with their `badge_count`
+    (two concurrent awards can each write a set missing the other's badge),
+    get one rebuilt from UserBadge (`rebuilt` is True). With persist it is
+    written in the current transaction and the caller's commit stores it;
+    read-only callers pass persist=False and write nothing.
+    """
+    row = db.session.get(UserBadgeSet, user_id)
+    if row:
+        earned = EarnedBadges.decode(row.bits, row.earned_at)
+        if badge_count is None or earned.count == badge_count:
+            return earned
+
+    earned = rebuild_earned_badges(user_id)
+    if persist:
+        store_earned_badges(user_id, earned)
+    return earned
+
+
+def store_earned_badges(user_id: int, earned: EarnedBadges):
+    """Write the earned set back in the current transaction (insert or replace)"""
+    bits, earned_at = earned.encode()
+    statement = dialect_insert(UserBadgeSet).values(user_id=user_id, bits=bits, earned_at=earned_at)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserBadgeSet.user_id],
+        set_={'bits': bits, 'earned_at': earned_at}
+    ).returning(UserBadgeSet)
+    db.session.scalars(statement, execution_options={'populate_existing': True}).one()
+
+
+def award_badges(user_id: int, badge_ids: Iterable[int], earned_at: datetime) -> List[int]:
+    """Insert the given badges for the user; returns the ids actually awarded.
+
+    Two evaluations for the same user can run at once (event bus workers), so
+    a badge already inserted by the other one is skipped rather than raising,
+    and the stored set is rebuilt from UserBadge instead of being patched from
+    a set read before the other award committed.
+    """
+    rows = [{'user_id': user_id, 'badge_id': badge_id, 'earned_at': earned_at} for badge_id in badge_ids]
+    if not rows:
+        return []
+    statement = dialect_insert(UserBadge).values(rows).on_conflict_do_nothing(
+        index_elements=[UserBadge.user_id, UserBadge.badge_id]
+    ).returning(UserBadge.badge_id)
+    awarded = list(db.session.scalars(statement))
+
+    if awarded:
+        # Core inserts bypass the flush hook that maintains User.badge_count
+        apply_counter_deltas(db.session, {user_id: {'badge_count': len(awarded)}})
+        store_earned_badges(user_id, rebuild_earned_badges(user_id))
+    return awarded
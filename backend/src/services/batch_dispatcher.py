@@ -0,0 +1,215 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from flask import current_app, g, request, session
+from flask.ctx import RequestContext
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.test import EnvironBuilder
+
+from src.models.user import db
+
+# Most sub-requests one batch may carry
+MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+# Wall-clock budget for a whole batch: sub-requests not started by then get 504, and so do parallel
+# GETs still running. A sequential sub-request already running is never cut short (see BatchDispatcher).
+TIME_BUDGET_SECONDS = float(os.environ.get('BATCH_TIME_BUDGET_SECONDS', 10))
+# Threads shared by all batches of a worker for running read-only GETs side by side
+MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+
+METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+# Headers a sub-request inherits from the batch request (the session cookie above all)
+FORWARDED_HEADERS = ('Cookie', 'Authorization', 'Accept-Language', 'User-Agent')
+
+
+class BatchError(ValueError):
+    """The batch itself is malformed; nothing has been dispatched"""
+
+
+def _result(status: int, body: Any, item: Dict[str, Any]) -> Dict[str, Any]:
+    result = {'status': status, 'body': body}
+    if 'id' in item:
+        result['id'] = item['id']
+    return result
+
+
+def _error(status: int, message: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    return _result(status, {'error': message}, item)
+
+
+def validate(items) -> List[Dict[str, Any]]:
+    """Normalise a batch body into sub-requests with method, path and body"""
+    if not isinstance(items, list) or not items:
+        raise BatchError('requests must be a non-empty list')
+    if len(items) > MAX_REQUESTS:
+        raise BatchError(f'At most {MAX_REQUESTS} requests per batch')
+
+    normalised = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise BatchError(f'Request {index} must be an object')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        if method not in METHODS:
+            raise BatchError(f'Request {index}: unsupported method {method}')
+        if not isinstance(path, str) or not path.startswith('/api/'):
+            raise BatchError(f'Request {index}: path must start with /api/')
+        if path.split('?', 1)[0].rstrip('/') == request.path.rstrip('/'):
+            raise BatchError(f'Request {index}: batches cannot be nested')
+        normalised.append(dict(item, method=method, path=path))
+    return normalised
+
+
+@contextmanager
+def _own_globals():
+    """Give a sub-request a fresh `g` and put the batch request's back afterwards.
+
+    Sub-requests share the app context (and so `g`); per-request state such as
+    the query counter and the replica route must not leak between them.
+    """
+    saved = dict(g.__dict__)
+    g.__dict__.clear()
+    try:
+        yield
+    finally:
+        g.__dict__.clear()
+        g.__dict__.update(saved)
+
+
+class BatchDispatcher:
+    """Runs sub-requests through the app's routing table without leaving the process.
+
+    Sequential sub-requests reuse the batch request's app context, DB session
+    and server-side session, so authentication is checked once and every
+    write is visible to the next sub-request. With `parallel`, each run of
+    consecutive read-only GETs is spread over a thread pool; those threads
+    each get their own app context and DB session.
+
+    For sequential sub-requests the time budget only stops new ones from
+    starting. A running one uses the batch request's DB session and may be
+    midway through a write, so it cannot be abandoned; one slow call (an
+    OpenAI chat, say) can carry the batch past the budget, and the calls
+    after it then get 504.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS, time_budget_seconds: float = TIME_BUDGET_SECONDS):
+        self.max_workers = max_workers
+        self.time_budget_seconds = time_budget_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        """Create the pool lazily, once per process (so after any fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch')
+            self._pid = os.getpid()
+
+    def _environ(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+        builder = EnvironBuilder(
+            path=item['path'],
+            base_url=request.host_url,
+            method=item['method'],
+            headers=headers,
+            json=item.get('body') if item['method'] != 'GET' else None,
+            environ_base={'REMOTE_ADDR': request.remote_addr}
+        )
+        try:
+            return builder.get_environ()
+        finally:
+            builder.close()
+
+    def _is_read_only(self, app, environ) -> bool:
+        if environ['REQUEST_METHOD'] != 'GET':
+            return False
+        try:
+            endpoint, _ = app.url_map.bind_to_environ(environ).match()
+        except (NotFound, MethodNotAllowed):
+            return False
+        return getattr(app.view_functions.get(endpoint), 'read_only', False)
+
+    def _dispatch(self, app, environ, shared_session, item: Dict[str, Any]):
+        """Run one sub-request in a request context of its own; returns (result, set-cookie headers)"""
+        ctx = RequestContext(app, environ, session=shared_session)
+        ctx.push()
+        try:
+            try:
+                response = app.full_dispatch_request()
+            except Exception as e:
+                db.session.rollback()
+                return _error(500, str(e), item), []
+            # File responses stream from disk; read them into memory like any other body
+            response.direct_passthrough = False
+            body = response.get_json(silent=True)
+            if body is None:
+                body = response.get_data(as_text=True)
+            return _result(response.status_code, body, item), response.headers.getlist('Set-Cookie')
+        finally:
+            ctx.pop()
+
+    def _dispatch_here(self, app, environ, shared_session, item):
+        with _own_globals():
+            return self._dispatch(app, environ, shared_session, item)
+
+    def _dispatch_in_thread(self, app, environ, shared_session, item):
+        with app.app_context():
+            return self._dispatch(app, environ, shared_session, item)
+
+    def run(self, items: List[Dict[str, Any]], parallel: bool = False):
+        """Dispatch validated sub-requests in order; returns (results, set-cookie headers)"""
+        app = current_app._get_current_object()
+        shared_session = session._get_current_object()
+        # Load the session once here rather than racing to load it in several threads
+        shared_session.get('user_id')
+
+        deadline = time.monotonic() + self.time_budget_seconds
+        environs = [self._environ(item) for item in items]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        cookies: List[str] = []
+
+        index = 0
+        while index < len(items):
+            if time.monotonic() >= deadline:
+                results[index] = _error(504, 'Batch time budget exceeded', items[index])
+                index += 1
+                continue
+
+            group = [index]
+            if parallel and self._is_read_only(app, environs[index]):
+                while group[-1] + 1 < len(items) and self._is_read_only(app, environs[group[-1] + 1]):
+                    group.append(group[-1] + 1)
+
+            if len(group) == 1:
+                results[index], set_cookies = self._dispatch_here(app, environs[index], shared_session, items[index])
+                cookies.extend(set_cookies)
+            else:
+                self._ensure_started()
+                futures = {
+                    position: self._executor.submit(
+                        self._dispatch_in_thread, app, environs[position], shared_session, items[position]
+                    )
+                    for position in group
+                }
+                wait(futures.values(), timeout=max(deadline - time.monotonic(), 0))
+                for position, future in futures.items():
+                    if future.done():
+                        results[position], set_cookies = future.result()
+                        cookies.extend(set_cookies)
+                    else:
+                        future.cancel()
+                        results[position] = _error(504, 'Batch time budget exceeded', items[position])
+            index = group[-1] + 1
+
+        return results, cookies
+
+
+# Global instance
+batch_dispatcher = BatchDispatcher()
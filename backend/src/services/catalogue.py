@@ -0,0 +1,201 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from src.models.user import Island, Activity, Badge
+from src.services.catalogue_version import get_catalogue_version
+from src.services.query_budget import uncounted
+
+# One version row covers islands, activities and badges; bump it after editing any of them
+CATALOGUE = 'catalogue'
+
+# How often a process asks the database whether the catalogue changed
+VERSION_CHECK_SECONDS = 5.0
+
+
+def _as_id(value) -> Optional[int]:
+    """Ids arrive as ints from URLs but sometimes as strings from JSON bodies"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedIsland(NamedTuple):
+    """Immutable copy of an Island row"""
+    id: int
+    name: str
+    description: Optional[str]
+    order_number: int
+    unlock_requirement: int
+    is_active: bool
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class CachedActivity(NamedTuple):
+    """Immutable copy of an Activity row"""
+    id: int
+    island_id: int
+    name: str
+    slug: Optional[str]
+    description: Optional[str]
+    activity_type: str
+    content: Optional[str]
+    order_number: int
+    difficulty_level: int
+    points_reward: int
+    is_active: bool
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class CachedBadge(NamedTuple):
+    """Immutable copy of a Badge row. The badge id doubles as its ordinal."""
+    id: int
+    name: str
+    description: Optional[str]
+    icon: Optional[str]
+    requirement_type: str
+    requirement_value: int
+    theme: Optional[str]
+    is_active: bool
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class CatalogueSnapshot:
+    """One load of the catalogue with every index built up front; never mutated"""
+
+    def __init__(self, version: int, islands, activities, badges):
+        self.version = version
+
+        self.islands_by_id: Dict[int, CachedIsland] = {island.id: island for island in islands}
+        self.active_islands: Tuple[CachedIsland, ...] = tuple(
+            sorted((island for island in islands if island.is_active), key=lambda island: island.order_number)
+        )
+
+        self.activities_by_id: Dict[int, CachedActivity] = {activity.id: activity for activity in activities}
+        self.activities_by_slug: Dict[str, CachedActivity] = {
+            activity.slug: activity for activity in activities if activity.slug
+        }
+        island_order = {island.id: island.order_number for island in islands}
+        active = sorted(
+            (activity for activity in activities if activity.is_active),
+            key=lambda activity: (island_order.get(activity.island_id, 0), activity.island_id, activity.order_number)
+        )
+        self.activities_by_island: Dict[int, Tuple[CachedActivity, ...]] = {
+            island_id: tuple(activity for activity in active if activity.island_id == island_id)
+            for island_id in {activity.island_id for activity in active}
+        }
+        self.activities_by_order: Dict[Tuple[int, int], CachedActivity] = {
+            (activity.island_id, activity.order_number): activity for activity in active
+        }
+        self.active_activities: Tuple[CachedActivity, ...] = tuple(active)
+
+        self.badges_by_id: Dict[int, CachedBadge] = {badge.id: badge for badge in badges}
+        active_badges = tuple(badge for badge in badges if badge.is_active)
+        self.badges_by_theme: Dict[Optional[str], Tuple[CachedBadge, ...]] = {
+            theme: tuple(badge for badge in active_badges if badge.theme is None or badge.theme == theme)
+            for theme in {badge.theme for badge in active_badges} | {None}
+        }
+
+    @classmethod
+    def load(cls, version: int) -> 'CatalogueSnapshot':
+        islands = [
+            CachedIsland(i.id, i.name, i.description, i.order_number, i.unlock_requirement, bool(i.is_active))
+            for i in Island.query.order_by(Island.id)
+        ]
+        activities = [
+            CachedActivity(a.id, a.island_id, a.name, a.slug, a.description, a.activity_type, a.content,
+                           a.order_number, a.difficulty_level, a.points_reward, bool(a.is_active))
+            for a in Activity.query.order_by(Activity.id)
+        ]
+        badges = [
+            CachedBadge(b.id, b.name, b.description, b.icon, b.requirement_type,
+                        b.requirement_value, b.theme, bool(b.is_active))
+            for b in Badge.query.order_by(Badge.id)
+        ]
+        return cls(version, islands, activities, badges)
+
+
+class Catalogue:
+    """Islands, activities and badges cached in-process, reloaded when the catalogue version changes.
+
+    Lookups by id return inactive rows too (like Query.get); listings only
+    contain active rows, in map and play order.
+    """
+
+    def __init__(self, version_check_seconds: float = VERSION_CHECK_SECONDS):
+        self.version_check_seconds = version_check_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogueSnapshot] = None
+        self._checked_at = 0.0
+
+    def snapshot(self) -> CatalogueSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.version_check_seconds:
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and time.monotonic() - self._checked_at < self.version_check_seconds:
+                return snapshot
+
+            # Reloads are shared by every request of the process, so they don't count against one
+            with uncounted():
+                version = get_catalogue_version(CATALOGUE)
+                if snapshot is None or snapshot.version != version:
+                    # Readers keep whichever snapshot they already hold; the swap is a single assignment
+                    snapshot = self._snapshot = CatalogueSnapshot.load(version)
+            self._checked_at = time.monotonic()
+            return snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot().version
+
+    def island(self, island_id: int) -> Optional[CachedIsland]:
+        return self.snapshot().islands_by_id.get(_as_id(island_id))
+
+    def islands(self) -> Tuple[CachedIsland, ...]:
+        """Active islands in map order"""
+        return self.snapshot().active_islands
+
+    def activity(self, activity_id: int) -> Optional[CachedActivity]:
+        return self.snapshot().activities_by_id.get(_as_id(activity_id))
+
+    def activity_by_slug(self, slug: str) -> Optional[CachedActivity]:
+        """Resolve an activity by its stable slug (inactive ones too, like activity())"""
+        return self.snapshot().activities_by_slug.get(slug)
+
+    def activities(self, island_id: Optional[int] = None) -> Tuple[CachedActivity, ...]:
+        """Active activities of one island (or of every island) in play order"""
+        snapshot = self.snapshot()
+        if island_id is None:
+            return snapshot.active_activities
+        return snapshot.activities_by_island.get(island_id, ())
+
+    def activity_at(self, island_id: int, order_number: int) -> Optional[CachedActivity]:
+        """The active activity at a position on an island's path"""
+        return self.snapshot().activities_by_order.get((island_id, order_number))
+
+    def badge(self, badge_id: int) -> Optional[CachedBadge]:
+        return self.snapshot().badges_by_id.get(_as_id(badge_id))
+
+    def badges_for_theme(self, theme: Optional[str]) -> Tuple[CachedBadge, ...]:
+        """Active badges shown to a user with this theme: the theme's own plus universal ones"""
+        badges_by_theme = self.snapshot().badges_by_theme
+        return badges_by_theme.get(theme, badges_by_theme[None])
+
+    def invalidate(self):
+        """Drop the local copy; the next lookup reloads from the database"""
+        with self._lock:
+            self._snapshot = None
+
+
+# Global instance
+catalogue = Catalogue()
@@ -0,0 +1,17 @@
+from src.models.user import db, CatalogueVersion
+
+
+def get_catalogue_version(name: str) -> int:
+    """Current version of a cached catalogue (0 if it was never bumped)"""
+    version = db.session.query(CatalogueVersion.version).filter_by(name=name).scalar()
+    return version or 0
+
+
+def bump_catalogue_version(name: str) -> None:
+    """Invalidate every process's cached copy of `name`. The caller commits."""
+    updated = CatalogueVersion.query.filter_by(name=name).update(
+        {'version': CatalogueVersion.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CatalogueVersion(name=name, version=1))
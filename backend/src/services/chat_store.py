@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.models.user import db, ChatSession, ChatMessage
+
+MENTOR_CHANNEL = 'mentor'
+ACTIVITY_CHANNEL = 'activity'
+
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+
+# Context sent to the model when building a prompt
+PROMPT_TAIL_MESSAGES = 12
+PROMPT_TOKEN_BUDGET = 1500
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for budgeting"""
+    return len(text or '') // 4 + 1
+
+
+def get_or_create_session(user_id: int, activity_id: Optional[int], channel: str = ACTIVITY_CHANNEL) -> ChatSession:
+    """The user's chat session for an activity and channel"""
+    chat_session = ChatSession.query.filter_by(
+        user_id=user_id,
+        activity_id=activity_id,
+        channel=channel
+    ).order_by(ChatSession.id).first()
+
+    if not chat_session:
+        chat_session = ChatSession(user_id=user_id, activity_id=activity_id, channel=channel, last_seq=0)
+        db.session.add(chat_session)
+        db.session.flush()
+    return chat_session
+
+
+def append_message(chat_session: ChatSession, role: str, content: str) -> ChatMessage:
+    """Append one message without touching earlier ones.
+
+    The next seq is taken with an atomic UPDATE ... RETURNING on the session
+    row, so concurrent appends to the same session get distinct, ordered seqs.
+    """
+    now = datetime.utcnow()
+    seq = db.session.execute(
+        db.update(ChatSession).where(ChatSession.id == chat_session.id).values(
+            last_seq=ChatSession.last_seq + 1,
+            updated_at=now
+        ).returning(ChatSession.last_seq)
+    ).scalar_one()
+
+    message = ChatMessage(
+        session_id=chat_session.id,
+        seq=seq,
+        role=role,
+        content=content,
+        token_estimate=estimate_tokens(content)
+    )
+    db.session.add(message)
+    db.session.flush()
+    set_committed_value(chat_session, 'last_seq', seq)
+    set_committed_value(chat_session, 'updated_at', now)
+    return message
+
+
+def get_history(session_id: int, before_seq: Optional[int] = None, after_seq: Optional[int] = None,
+                limit: int = HISTORY_PAGE_SIZE, message_model=ChatMessage) -> Dict[str, Any]:
+    """One page of history in seq order, keyset-paginated on (session_id, seq).
+
+    Without cursors the newest page is returned; `before_seq` pages backwards
+    and `after_seq` pages forwards from a known message. `message_model`
+    selects the archive table for archived sessions.
+    """
+    limit = max(1, min(limit, MAX_HISTORY_PAGE_SIZE))
+    query = message_model.query.filter(message_model.session_id == session_id)
+
+    if after_seq is not None:
+        messages = query.filter(message_model.seq > after_seq).order_by(message_model.seq).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+    else:
+        if before_seq is not None:
+            query = query.filter(message_model.seq < before_seq)
+        messages = query.order_by(message_model.seq.desc()).limit(limit + 1).all()
+        has_more = len(messages) > limit
+        messages = list(reversed(messages[:limit]))
+
+    return {
+        'messages': [message.to_dict() for message in messages],
+        'has_more': has_more,
+        'first_seq': messages[0].seq if messages else None,
+        'last_seq': messages[-1].seq if messages else None
+    }
+
+
+def get_tail(session_id: int, max_messages: int = PROMPT_TAIL_MESSAGES,
+             max_tokens: int = PROMPT_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """The newest messages that fit the token budget, oldest first, ready for the model"""
+    rows = db.session.query(ChatMessage.role, ChatMessage.content, ChatMessage.token_estimate).filter(
+        ChatMessage.session_id == session_id
+    ).order_by(ChatMessage.seq.desc()).limit(max_messages).all()
+
+    tail = []
+    used = 0
+    for role, content, tokens in rows:
+        if tail and used + tokens > max_tokens:
+            break
+        tail.append({'role': role, 'content': content})
+        used += tokens
+    tail.reverse()
+    return tail
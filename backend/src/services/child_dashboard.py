@@ -0,0 +1,184 @@
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from src.models.user import db, User, UserProgress
+from src.services.archive_service import archived_island_totals, archived_activity_ids, archived_progress_stub
+from src.services.badge_cache import load_earned_badges
+from src.services.catalogue import catalogue
+from src.services.read_replica import routed_to_replica
+from src.services.ttl_cache import TTLCache
+
+LEADERBOARD_SIZE = 5
+RECENT_PROGRESS_LIMIT = 5
+
+# The leaderboard is the same for everyone; rebuilding it at most this often is plenty
+LEADERBOARD_TTL_SECONDS = 30
+leaderboard_cache = TTLCache(ttl_seconds=LEADERBOARD_TTL_SECONDS, max_entries=1)
+
+
+def load_progress(user_id: int) -> List[UserProgress]:
+    """All of a user's hot progress rows; shared by every section built for one request"""
+    return UserProgress.query.filter_by(user_id=user_id).all()
+
+
+def island_map(user: User, progress_records: List[UserProgress]) -> Dict[str, Any]:
+    """Active islands with their activities and the user's progress on each.
+
+    Activities completed in an archived period have no hot row; they are
+    listed as completed from one query on the archive's (user, activity) index.
+    """
+    progress_by_activity = {progress.activity_id: progress for progress in progress_records}
+    archived = archived_activity_ids(user.id)
+
+    islands_data = []
+    for island in catalogue.islands():
+        activities_data = []
+        for activity in catalogue.activities(island.id):
+            progress = progress_by_activity.get(activity.id)
+            activity_data = activity.to_dict()
+            if progress:
+                activity_data['progress'] = progress.to_dict()
+            elif activity.id in archived:
+                activity_data['progress'] = archived_progress_stub(user.id, activity.id)
+            else:
+                activity_data['progress'] = None
+            activities_data.append(activity_data)
+
+        island_data = island.to_dict()
+        island_data['is_unlocked'] = user.total_points >= island.unlock_requirement
+        island_data['activities'] = activities_data
+        islands_data.append(island_data)
+
+    return {
+        'islands': islands_data,
+        'user': user.to_dict()
+    }
+
+
+def badges(user: User) -> Dict[str, Any]:
+    """The user's theme badges with earned flags.
+
+    A missing or stale earned set is rebuilt and stored, except on replica-routed
+    requests: those never write, and the set waits for a primary read or
+    the next badge award.
+    """
+    all_badges = catalogue.badges_for_theme(user.chosen_theme)
+    persist = not routed_to_replica()
+    earned = load_earned_badges(user.id, persist=persist, badge_count=user.badge_count)
+    if earned.rebuilt and persist:
+        db.session.commit()
+
+    badges_data = []
+    for badge in all_badges:
+        badge_dict = badge.to_dict()
+        earned_at = earned.earned_at(badge.id)
+        badge_dict['earned'] = earned_at is not None
+        badge_dict['earned_at'] = earned_at.isoformat() if earned_at else None
+        badges_data.append(badge_dict)
+
+    return {
+        'badges': badges_data,
+        'total_badges': len(all_badges),
+        'earned_badges': earned.count
+    }
+
+
+def _recent(progress_records: List[UserProgress]) -> List[UserProgress]:
+    """Newest completions first, then unfinished attempts by start time (as ORDER BY ... NULLS LAST)"""
+    return sorted(
+        progress_records,
+        key=lambda p: (p.completed_at is not None, p.completed_at or datetime.min, p.started_at or datetime.min),
+        reverse=True
+    )[:RECENT_PROGRESS_LIMIT]
+
+
+def progress_summary(user: User, progress_records: List[UserProgress]) -> Dict[str, Any]:
+    """Totals, per-island completion (hot plus archived) and recent activity"""
+    total_activities = len(catalogue.activities())
+    completed_activities = user.completed_count
+    completion_percentage = (completed_activities / total_activities * 100) if total_activities > 0 else 0
+
+    archived = archived_island_totals([user.id]).get(user.id, {})
+
+    island_progress = {}
+    for island in catalogue.islands():
+        island_activities = catalogue.activities(island.id)
+        activity_ids = {activity.id for activity in island_activities}
+        island_completed = len([
+            p for p in progress_records
+            if p.status == 'completed' and p.activity_id in activity_ids
+        ]) + archived.get(island.id, (0, 0, 0))[0]
+
+        island_progress[str(island.id)] = {
+            'name': island.name,
+            'total': len(island_activities),
+            'completed': island_completed,
+            'percentage': (island_completed / len(island_activities) * 100) if island_activities else 0
+        }
+
+    return {
+        'statistics': {
+            'total_points': user.total_points,
+            'total_activities': total_activities,
+            'completed_activities': completed_activities,
+            'in_progress_activities': user.in_progress_count,
+            'completion_percentage': round(completion_percentage, 1),
+            'current_island': user.current_island,
+            'badge_count': user.badge_count
+        },
+        'island_progress': island_progress,
+        'recent_progress': [p.to_dict() for p in _recent(progress_records)]
+    }
+
+
+def leaderboard() -> Tuple[Dict[str, Any], str]:
+    """Top users by points, and the version of the rows it was built from.
+
+    Badge and completion counts come from the user rows. Every change to a
+    user row bumps its state_version, so the active users' count and
+    state_version sum (read with total_users) plus the catalogue version
+    change whenever the payload can; any worker building from the same rows
+    arrives at the same version.
+    """
+    catalogue_version = catalogue.version
+    # Ties are broken by id so every worker builds the same payload from the same rows
+    top_users = User.query.filter_by(is_active=True).order_by(
+        User.total_points.desc(), User.id
+    ).limit(LEADERBOARD_SIZE).all()
+
+    total_activities = len(catalogue.activities())
+
+    leaderboard_data = []
+    for i, user in enumerate(top_users, 1):
+        completion_percentage = (user.completed_count / total_activities * 100) if total_activities > 0 else 0
+        leaderboard_data.append({
+            'rank': i,
+            'username': user.username,
+            'theme': user.chosen_theme,
+            'total_points': user.total_points,
+            'badge_count': user.badge_count,
+            'completion_percentage': round(completion_percentage, 1),
+            'current_island': user.current_island
+        })
+
+    total_users, state_versions = db.session.query(
+        db.func.count(User.id), db.func.coalesce(db.func.sum(User.state_version), 0)
+    ).filter(User.is_active.is_(True)).one()
+
+    return {
+        'leaderboard': leaderboard_data,
+        'total_users': total_users
+    }, f'{catalogue_version}.{total_users}.{state_versions}'
+
+
+def cached_leaderboard() -> Tuple[Dict[str, Any], str]:
+    """The leaderboard payload and its version, rebuilt once per TTL.
+
+    The version comes from the database (see leaderboard()), so it is the
+    same on every worker and a conditional GET costs nothing to validate.
+    """
+    entry = leaderboard_cache.get('leaderboard')
+    if entry is None:
+        entry = leaderboard()
+        leaderboard_cache.set('leaderboard', entry)
+    return entry
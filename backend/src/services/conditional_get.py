@@ -0,0 +1,65 @@
+import os
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import make_response, request, session
+
+from src.services.catalogue import catalogue
+from src.services.child_dashboard import cached_leaderboard
+from src.services.current_user import current_user
+
+# Part of every ETag, so a deploy that changes a payload's shape invalidates what clients hold
+RELEASE = (os.environ.get('RELEASE_VERSION') or os.environ.get('RAILWAY_GIT_COMMIT_SHA') or 'dev')[:12]
+
+# Per-user payloads: only the browser may keep them, and it must revalidate every time
+PRIVATE = 'private, no-cache'
+# Shared payloads that are fine to serve slightly stale
+PUBLIC = 'public, max-age=30'
+
+
+def catalogue_tag() -> str:
+    return f'{RELEASE}.c{catalogue.version}'
+
+
+def user_tag() -> Optional[str]:
+    """Catalogue version plus the signed-in child's state_version; None without a child session.
+
+    Reads the user from the database rather than a cached snapshot, so another
+    worker's write is never answered with 304. The view's current_user() then
+    reuses the loaded row.
+    """
+    if session.get('user_type') != 'child':
+        return None
+    user = current_user()
+    if user is None:
+        return None
+    return f'{catalogue_tag()}.u{user.id}.{user.state_version}'
+
+
+def leaderboard_tag() -> str:
+    return f'{RELEASE}.l{cached_leaderboard()[1]}'
+
+
+def conditional(tag: Callable[[], Optional[str]], cache_control: str = PRIVATE):
+    """Answer If-None-Match from version counters before the view runs.
+
+    `tag` returns the ETag value for the current request (or None to skip
+    validation); ETags are per URL, so it needn't encode the view arguments.
+    A match returns 304 without running the view; otherwise the view's 200
+    response is tagged.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = tag()
+            if etag is not None and etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if etag is None or response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return wrapper
+    return decorator
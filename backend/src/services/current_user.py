@@ -0,0 +1,106 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import g, session
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.user import db, User
+from src.services.ttl_cache import TTLCache
+
+# How long a worker may answer theme/points reads from its snapshot without asking the database.
+# Writes made by this worker invalidate at once; the TTL bounds staleness from other workers.
+SNAPSHOT_TTL_SECONDS = float(os.environ.get('USER_SNAPSHOT_TTL_SECONDS', 5))
+SNAPSHOT_MAX_ENTRIES = int(os.environ.get('USER_SNAPSHOT_MAX_ENTRIES', 10000))
+
+# session.info key: {user_id: state_version} written by this transaction (see user_counters._update_user)
+WRITTEN_VERSIONS_KEY = '_user_versions_written'
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """The few User fields most routes read, safe to share between requests"""
+    id: int
+    chosen_theme: Optional[str]
+    total_points: int
+    current_island: int
+    state_version: int
+
+
+snapshot_cache = TTLCache(SNAPSHOT_TTL_SECONDS, SNAPSHOT_MAX_ENTRIES)
+# Lowest state_version a snapshot may carry after a committed write; kept a little
+# longer than the snapshots so a slow request can't cache a pre-write read.
+_version_floors = TTLCache(SNAPSHOT_TTL_SECONDS * 2, SNAPSHOT_MAX_ENTRIES)
+
+
+def _child_id() -> Optional[int]:
+    """The session's child id; parent ids live in another table and are never looked up here"""
+    if session.get('user_type', 'child') != 'child':
+        return None
+    return session.get('user_id')
+
+
+def _is_current(snapshot: UserSnapshot) -> bool:
+    floor = _version_floors.get(snapshot.id)
+    return floor is None or snapshot.state_version >= floor
+
+
+def _remember(user: User) -> UserSnapshot:
+    snapshot = UserSnapshot(
+        id=user.id,
+        chosen_theme=user.chosen_theme,
+        total_points=user.total_points,
+        current_island=user.current_island,
+        state_version=user.state_version
+    )
+    # A read from before a write this worker has since committed (or from a lagging replica) isn't cached
+    if _is_current(snapshot):
+        snapshot_cache.set(user.id, snapshot)
+    return snapshot
+
+
+def current_user() -> Optional[User]:
+    """The signed-in child, loaded at most once per request and held on `g`.
+
+    Holding it on `g` also keeps it in the session's identity map (which only
+    keeps weak references), so later lookups of the same row are free.
+    """
+    if 'current_user' not in g:
+        user_id = _child_id()
+        user = db.session.get(User, user_id) if user_id is not None else None
+        if user is not None:
+            g.user_snapshot = _remember(user)
+        g.current_user = user
+    return g.current_user
+
+
+def current_snapshot() -> Optional[UserSnapshot]:
+    """The signed-in child's snapshot; served from this worker's cache when it is fresh.
+
+    For routes that only read the theme, points or current island. Anything
+    that writes to the user needs current_user().
+    """
+    if 'user_snapshot' in g:
+        return g.user_snapshot
+    user_id = _child_id()
+    if user_id is None:
+        return None
+    snapshot = snapshot_cache.get(user_id)
+    if snapshot is not None and _is_current(snapshot):
+        g.user_snapshot = snapshot
+        return snapshot
+    user = current_user()
+    return g.user_snapshot if user is not None else None
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_written(session):
+    for user_id, version in session.info.pop(WRITTEN_VERSIONS_KEY, {}).items():
+        _version_floors.set(user_id, version)
+        snapshot_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_written(session, previous_transaction):
+    session.info.pop(WRITTEN_VERSIONS_KEY, None)
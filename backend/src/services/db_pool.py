@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Checkouts slower than this are counted and logged as pool pressure
+SLOW_CHECKOUT_MS = float(os.environ.get('DB_POOL_SLOW_CHECKOUT_MS', 100))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options_from_env(database_url: str) -> Dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS from DB_POOL_* variables (applied to every bind)"""
+    if database_url.startswith('sqlite') and ':memory:' in database_url:
+        # In-memory SQLite uses a single shared connection; there is no pool to size
+        return {}
+
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True)
+    }
+
+
+class PoolMetrics:
+    """Counters for one engine's pool since boot (or since fork, in a worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.overflow_events = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+
+    def record_checkout(self, wait_seconds: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+            if wait_seconds * 1000 >= SLOW_CHECKOUT_MS:
+                self.slow_checkouts += 1
+            if overflowed:
+                self.overflow_events += 1
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'wait_ms_avg': round(self.wait_seconds_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'wait_ms_max': round(self.wait_seconds_max * 1000, 3),
+                'slow_checkouts': self.slow_checkouts,
+                'timeouts': self.timeouts,
+                'overflow_events': self.overflow_events,
+                'connects': self.connects,
+                'closes': self.closes,
+                'invalidations': self.invalidations
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long callers wait for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.increment('timeouts')
+            print(f"DB pool exhausted: waited {time.perf_counter() - started:.1f}s ({self.status()})")
+            raise
+
+        waited = time.perf_counter() - started
+        self.metrics.record_checkout(waited, overflowed=self._overflow > max(overflow_before, 0))
+        if waited * 1000 >= SLOW_CHECKOUT_MS:
+            print(f"Slow DB pool checkout: {waited * 1000:.0f} ms ({self.status()})")
+        return record
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _instrument(engine):
+    pool = engine.pool
+    if not isinstance(pool, InstrumentedQueuePool):
+        return
+
+    # Listeners live on the pool's dispatch, which survives recreate()
+    event.listen(pool, 'connect', lambda *args: engine.pool.metrics.increment('connects'))
+    event.listen(pool, 'close', lambda *args: engine.pool.metrics.increment('closes'))
+    event.listen(pool, 'close_detached', lambda *args: engine.pool.metrics.increment('closes'))
+    event.listen(pool, 'invalidate', lambda *args: engine.pool.metrics.increment('invalidations'))
+
+
+def pool_status(engines) -> Dict[str, Any]:
+    """Live pool occupancy plus counters for every bind ('default', 'replica', ...)"""
+    status = {}
+    for bind_key, engine in engines.items():
+        pool = engine.pool
+        entry: Dict[str, Any] = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0)
+            })
+        if isinstance(pool, InstrumentedQueuePool):
+            entry.update(pool.metrics.snapshot())
+        status[bind_key or 'default'] = entry
+    return status
+
+
+def init_db_pool(app, db):
+    """Instrument the app's engines and make them fork-safe (call after db.init_app)"""
+    with app.app_context():
+        engines = list(db.engines.values())
+
+    for engine in engines:
+        _instrument(engine)
+
+    def _after_fork_in_child():
+        # Connections inherited from the parent (e.g. gunicorn --preload) must
+        # not be shared; drop them without closing the parent's sockets.
+        for engine in engines:
+            engine.dispose(close=False)
+            if isinstance(engine.pool, InstrumentedQueuePool):
+                engine.pool.metrics.reset()
+
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.models.user import db, EventOutbox
+
+ACTIVITY_STARTED = 'activity_started'
+STEP_COMPLETED = 'step_completed'
+ACTIVITY_COMPLETED = 'activity_completed'
+POINTS_AWARDED = 'points_awarded'
+THEME_SELECTED = 'theme_selected'
+
+EVENT_TYPES = (ACTIVITY_STARTED, STEP_COMPLETED, ACTIVITY_COMPLETED, POINTS_AWARDED, THEME_SELECTED)
+
+_PENDING_KEY = 'event_bus_pending'
+_FLUSHED_KEY = 'event_bus_flushed'
+
+
+class ProgressEvent(NamedTuple):
+    """An event as handed to subscribers"""
+    id: int
+    type: str
+    user_id: Optional[int]
+    payload: Dict[str, Any]
+    created_at: datetime
+
+
+class EventBus:
+    """In-process bus with a transactional outbox.
+
+    `publish` adds an EventOutbox row to the caller's transaction. Once that
+    transaction commits, the event is handed to a bounded worker pool that
+    runs the subscribers in their own app context and session. Rows are only
+    marked delivered after every subscriber succeeded, and a sweeper thread
+    retries anything left pending, so delivery is at-least-once: subscribers
+    must be idempotent. Delivered rows are purged once they are older than
+    `retain_days`; failed rows stay for inspection.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queued: int = 1000, max_attempts: int = 5,
+                 lease_seconds: int = 60, sweep_seconds: int = 30, retain_days: int = 7,
+                 purge_seconds: int = 3600):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.sweep_seconds = sweep_seconds
+        self.retain_days = retain_days
+        self.purge_seconds = purge_seconds
+        self.app = None
+        self._subscribers: Dict[str, List[Callable[[ProgressEvent], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = int(os.environ.get('EVENT_BUS_WORKERS', self.max_workers))
+        self.max_queued = int(os.environ.get('EVENT_BUS_MAX_QUEUED', self.max_queued))
+        self.retain_days = int(os.environ.get('EVENT_OUTBOX_RETAIN_DAYS', self.retain_days))
+        app.extensions['event_bus'] = self
+
+        event.listen(Session, 'after_flush', self._after_flush)
+        event.listen(Session, 'after_commit', self._after_commit)
+        event.listen(Session, 'after_soft_rollback', self._after_rollback)
+
+    def subscribe(self, *event_types: str):
+        """Decorator registering a subscriber for one or more event types"""
+        def decorator(fn):
+            for event_type in event_types:
+                if event_type not in EVENT_TYPES:
+                    raise ValueError(f"Unknown event type: {event_type}")
+                self._subscribers[event_type].append(fn)
+            return fn
+        return decorator
+
+    def publish(self, event_type: str, user_id: Optional[int] = None, **payload) -> EventOutbox:
+        """Queue an event in the current transaction. It is dispatched only if that transaction commits."""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+
+        row = EventOutbox(
+            event_type=event_type,
+            user_id=user_id,
+            payload=json.dumps(payload, default=str),
+            status='pending',
+            attempts=0,
+            available_at=datetime.utcnow()
+        )
+        db.session.add(row)
+        db.session.info.setdefault(_PENDING_KEY, []).append(row)
+        return row
+
+    # Session hooks
+
+    def _after_flush(self, session, flush_context):
+        pending = session.info.get(_PENDING_KEY)
+        if not pending:
+            return
+        flushed = session.info.setdefault(_FLUSHED_KEY, [])
+        still_pending = []
+        for row in pending:
+            if row.id is None:
+                still_pending.append(row)
+            else:
+                flushed.append(row.id)
+        session.info[_PENDING_KEY] = still_pending
+
+    def _after_commit(self, session):
+        event_ids = session.info.pop(_FLUSHED_KEY, None)
+        session.info.pop(_PENDING_KEY, None)
+        if event_ids and self.app is not None:
+            for event_id in event_ids:
+                self._dispatch(event_id)
+
+    def _after_rollback(self, session, previous_transaction):
+        session.info.pop(_FLUSHED_KEY, None)
+        session.info.pop(_PENDING_KEY, None)
+
+    # Delivery
+
+    def _ensure_started(self):
+        """Create the worker pool and sweeper lazily, once per process (so after any fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='event-bus')
+            self._slots = threading.BoundedSemaphore(self.max_queued)
+            sweeper = threading.Thread(target=self._sweep_forever, name='event-bus-sweeper', daemon=True)
+            sweeper.start()
+            self._pid = os.getpid()
+
+    def _dispatch(self, event_id: int):
+        self._ensure_started()
+        # When the pool is saturated the row simply stays pending for the sweeper
+        if not self._slots.acquire(blocking=False):
+            return
+        self._executor.submit(self._run_in_app, event_id)
+
+    def _run_in_app(self, event_id: int):
+        try:
+            with self.app.app_context():
+                self.deliver(event_id)
+        except Exception:
+            self.app.logger.exception("Event delivery error (%s)", event_id)
+        finally:
+            self._slots.release()
+
+    def _sweep_forever(self):
+        purged_at = 0.0
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                with self.app.app_context():
+                    for event_id in self.due_event_ids():
+                        self._dispatch(event_id)
+                    if time.monotonic() - purged_at >= self.purge_seconds:
+                        self.purge()
+                        purged_at = time.monotonic()
+            except Exception:
+                self.app.logger.exception("Event sweeper error")
+
+    def due_event_ids(self, limit: int = 100) -> List[int]:
+        """Pending events whose retry time has come, and processing events whose lease expired"""
+        now = datetime.utcnow()
+        rows = db.session.query(EventOutbox.id).filter(
+            EventOutbox.status.in_(['pending', 'processing']),
+            EventOutbox.available_at <= now
+        ).order_by(EventOutbox.id).limit(limit).all()
+        return [row[0] for row in rows]
+
+    def deliver(self, event_id: int) -> bool:
+        """Claim one outbox row, run its subscribers and record the outcome"""
+        now = datetime.utcnow()
+        claimed = EventOutbox.query.filter(
+            EventOutbox.id == event_id,
+            EventOutbox.status.in_(['pending', 'processing']),
+            EventOutbox.available_at <= now
+        ).update({
+            'status': 'processing',
+            'attempts': EventOutbox.attempts + 1,
+            'available_at': now + timedelta(seconds=self.lease_seconds)
+        }, synchronize_session=False)
+        db.session.commit()
+        if not claimed:
+            return False
+
+        row = EventOutbox.query.get(event_id)
+        progress_event = ProgressEvent(
+            row.id,
+            row.event_type,
+            row.user_id,
+            json.loads(row.payload) if row.payload else {},
+            row.created_at
+        )
+
+        try:
+            for subscriber in self._subscribers.get(row.event_type, []):
+                subscriber(progress_event)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning("Event %s (%s) failed on attempt %s: %s",
+                                       event_id, progress_event.type, row.attempts, e)
+            row = EventOutbox.query.get(event_id)
+            row.last_error = str(e)
+            if row.attempts >= self.max_attempts:
+                row.status = 'failed'
+            else:
+                row.status = 'pending'
+                row.available_at = datetime.utcnow() + timedelta(seconds=2 ** row.attempts)
+            db.session.commit()
+            return False
+
+        row = EventOutbox.query.get(event_id)
+        row.status = 'delivered'
+        row.delivered_at = datetime.utcnow()
+        row.last_error = None
+        db.session.commit()
+        return True
+
+    def purge(self, retain_days: Optional[int] = None) -> int:
+        """Delete delivered rows older than the retention window; returns how many"""
+        retain_days = self.retain_days if retain_days is None else retain_days
+        cutoff = datetime.utcnow() - timedelta(days=retain_days)
+        deleted = EventOutbox.query.filter(
+            EventOutbox.status == 'delivered',
+            EventOutbox.delivered_at < cutoff
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+
+    def drain(self, limit: int = 1000) -> int:
+        """Deliver every due event synchronously in the current app context"""
+        delivered = 0
+        for event_id in self.due_event_ids(limit):
+            if self.deliver(event_id):
+                delivered += 1
+        return delivered
+
+
+def publish_completion(user_id: int, activity_id: int, points: int, score: Optional[int] = None):
+    """Publish the pair of events every activity completion produces"""
+    event_bus.publish(ACTIVITY_COMPLETED, user_id, activity_id=activity_id, score=score)
+    event_bus.publish(POINTS_AWARDED, user_id, activity_id=activity_id, points=points)
+
+
+# Global instance
+event_bus = EventBus()
@@ -689,6 +689,26 @@ class OpenAIService:
             print(f"Themed AI response error: {e}")
             return "Tak for din besked! Jeg vil gerne hjælpe dig."
 
+    def chat_with_ai(self, messages: List[Dict], theme: str, activity_type: str) -> str:
+        """Continue a conversation; `messages` is the recent history, oldest first"""
+        try:
+            system_prompt = self.get_system_prompt(theme, activity_type)
+
+            response = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "system", "content": system_prompt}] + [
+                    {"role": m['role'], "content": m['content']} for m in messages
+                ],
+                temperature=0.7,
+                max_tokens=200
+            )
+
+            return response.choices[0].message.content
+
+        except Exception as e:
+            print(f"Chat error: {e}")
+            return "Tak for din besked! Jeg vil gerne hjælpe dig."
+
     def evaluate_prompt_for_beginners(self, prompt: str, ai_response: str, theme: str) -> Dict:
         """Evaluate a prompt specifically for beginner level"""
         try:
@@ -0,0 +1,132 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from src.models.user import db, User, ParentChildRelation, Activity, UserProgress, UserDailyActivity
+from src.services.archive_service import archived_island_totals
+from src.services.catalogue import catalogue
+from src.services.ttl_cache import TTLCache
+
+RECENT_ACTIVITY_LIMIT = 5
+
+# Parents refresh the dashboard often; a short TTL keeps it cheap while
+# still showing a child's progress within half a minute.
+dashboard_cache = TTLCache(ttl_seconds=30, max_entries=2048)
+
+
+def get_children(parent_id: int) -> List[User]:
+    """All children linked to a parent, in one joined query"""
+    return User.query.join(
+        ParentChildRelation, ParentChildRelation.child_id == User.id
+    ).filter(
+        ParentChildRelation.parent_id == parent_id
+    ).order_by(ParentChildRelation.id).all()
+
+
+def build_dashboard(parent_id: int) -> Dict[str, Any]:
+    """Progress summary for every child of a parent.
+
+    Uses the same five queries however many children there are: children
+    (carrying their progress and badge counters), per-island completions and
+    their archived rollups, last-7-day rollups and a windowed recent-activity
+    query. Islands and activity totals come from the catalogue.
+    """
+    children = get_children(parent_id)
+    child_ids = [child.id for child in children]
+    if not child_ids:
+        return {'children': []}
+
+    islands = [(island.id, island.name, len(catalogue.activities(island.id))) for island in catalogue.islands()]
+    total_activities = sum(total for _, _, total in islands)
+
+    island_completed: Dict[int, Dict[int, int]] = {child_id: {} for child_id in child_ids}
+    for user_id, island_id, count in db.session.query(
+        UserProgress.user_id, Activity.island_id, db.func.count(UserProgress.id)
+    ).join(
+        Activity, Activity.id == UserProgress.activity_id
+    ).filter(
+        UserProgress.user_id.in_(child_ids),
+        UserProgress.status == 'completed',
+        Activity.is_active.is_(True)
+    ).group_by(UserProgress.user_id, Activity.island_id):
+        island_completed[user_id][island_id] = count
+    for user_id, by_island in archived_island_totals(child_ids).items():
+        for island_id, (completed, _, _) in by_island.items():
+            island_completed[user_id][island_id] = island_completed[user_id].get(island_id, 0) + completed
+
+    week_start = datetime.utcnow().date() - timedelta(days=6)
+    weekly = {user_id: (points, completions, minutes) for user_id, points, completions, minutes in db.session.query(
+        UserDailyActivity.user_id,
+        db.func.sum(UserDailyActivity.points),
+        db.func.sum(UserDailyActivity.completions),
+        db.func.sum(UserDailyActivity.active_minutes)
+    ).filter(
+        UserDailyActivity.user_id.in_(child_ids),
+        UserDailyActivity.day >= week_start
+    ).group_by(UserDailyActivity.user_id)}
+
+    activity_time = db.func.coalesce(UserProgress.completed_at, UserProgress.started_at)
+    ranked = db.session.query(
+        UserProgress.user_id.label('user_id'),
+        UserProgress.activity_id.label('activity_id'),
+        UserProgress.status.label('status'),
+        UserProgress.score.label('score'),
+        activity_time.label('at'),
+        db.func.row_number().over(
+            partition_by=UserProgress.user_id,
+            order_by=activity_time.desc()
+        ).label('rank')
+    ).filter(UserProgress.user_id.in_(child_ids)).subquery()
+
+    recent: Dict[int, List[Dict[str, Any]]] = {child_id: [] for child_id in child_ids}
+    for row in db.session.query(ranked, Activity.name).join(
+        Activity, Activity.id == ranked.c.activity_id
+    ).filter(ranked.c.rank <= RECENT_ACTIVITY_LIMIT).order_by(ranked.c.user_id, ranked.c.rank):
+        recent[row.user_id].append({
+            'activity_id': row.activity_id,
+            'activity_name': row.name,
+            'status': row.status,
+            'score': row.score,
+            'at': row.at.isoformat() if row.at else None
+        })
+
+    children_data = []
+    for child in children:
+        completed = child.completed_count
+        points, completions, minutes = weekly.get(child.id, (0, 0, 0))
+        children_data.append({
+            'user': child.to_dict(),
+            'progress': {
+                'total_activities': total_activities,
+                'completed_activities': completed,
+                'in_progress_activities': child.in_progress_count,
+                'completion_percentage': round(completed / total_activities * 100, 1) if total_activities else 0
+            },
+            'badge_count': child.badge_count,
+            'island_progress': [
+                {
+                    'island_id': island_id,
+                    'name': name,
+                    'total': total,
+                    'completed': island_completed[child.id].get(island_id, 0),
+                    'percentage': round(island_completed[child.id].get(island_id, 0) / total * 100, 1) if total else 0
+                }
+                for island_id, name, total in islands
+            ],
+            'this_week': {
+                'points': int(points or 0),
+                'completions': int(completions or 0),
+                'active_minutes': int(minutes or 0)
+            },
+            'recent_activity': recent[child.id]
+        })
+
+    return {'children': children_data}
+
+
+def get_dashboard(parent_id: int) -> Dict[str, Any]:
+    """Cached dashboard for a parent"""
+    dashboard = dashboard_cache.get(parent_id)
+    if dashboard is None:
+        dashboard = build_dashboard(parent_id)
+        dashboard_cache.set(parent_id, dashboard)
+    return dashboard
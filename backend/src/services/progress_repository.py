@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.models.user import db, UserProgress
+from src.services.archive_service import was_completed
+from src.services.user_counters import sync_upserted_progress
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def dialect_insert(model):
+    """INSERT for `model` in the engine's dialect, with on_conflict_do_update()"""
+    return _INSERTS[db.engine.dialect.name](model)
+
+
+def _upsert(user_id: int, activity_id: int, insert_values: Dict[str, Any], update_values: Dict[str, Any],
+            where=None) -> Optional[UserProgress]:
+    """One statement: insert the row, or update it when (user_id, activity_id) exists and `where` holds.
+
+    Returns the resulting row as a persistent UserProgress, or None when the
+    row exists but `where` rejected the update.
+    """
+    statement = dialect_insert(UserProgress).values(user_id=user_id, activity_id=activity_id, **insert_values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserProgress.user_id, UserProgress.activity_id],
+        set_=update_values,
+        where=where
+    ).returning(UserProgress)
+    return db.session.scalars(statement, execution_options={'populate_existing': True}).one_or_none()
+
+
+def start(user_id: int, activity_id: int, allow_completed: bool = True) -> Optional[UserProgress]:
+    """Start (or restart) an activity and count the attempt.
+
+    A completed activity stays completed; with allow_completed=False it is
+    left untouched and None is returned instead. An activity completed in an
+    archived period has no hot row to keep completed, so it is never started
+    again (None).
+    """
+    if was_completed(user_id, activity_id):
+        return None
+
+    now = datetime.utcnow()
+    table = UserProgress.__table__
+    progress = _upsert(
+        user_id, activity_id,
+        {'status': 'in_progress', 'attempts': 1, 'started_at': now},
+        {
+            'status': db.case((table.c.status == 'completed', 'completed'), else_='in_progress'),
+            'attempts': db.func.coalesce(table.c.attempts, 0) + 1
+        },
+        where=None if allow_completed else table.c.status != 'completed'
+    )
+    if progress is not None:
+        sync_upserted_progress(db.session, user_id)
+    return progress
+
+
+def record_attempt(user_id: int, activity_id: int) -> UserProgress:
+    """Count one more attempt at an activity, starting it if needed"""
+    now = datetime.utcnow()
+    table = UserProgress.__table__
+    progress = _upsert(
+        user_id, activity_id,
+        {'status': 'in_progress', 'attempts': 1, 'started_at': now},
+        {
+            'status': db.case((table.c.status == 'not_started', 'in_progress'), else_=table.c.status),
+            'attempts': db.func.coalesce(table.c.attempts, 0) + 1
+        }
+    )
+    sync_upserted_progress(db.session, user_id)
+    return progress
+
+
+def complete(user_id: int, activity_id: int, score: int, require_started: bool = False) -> Optional[UserProgress]:
+    """Complete an activity with a score; None if it already was (so points are never awarded twice).
+
+    With require_started=True only an in-progress row is completed (a plain
+    UPDATE, never an insert), and None is also returned when there is none.
+    """
+    now = datetime.utcnow()
+    table = UserProgress.__table__
+    if require_started:
+        statement = db.update(UserProgress).where(
+            UserProgress.user_id == user_id,
+            UserProgress.activity_id == activity_id,
+            UserProgress.status == 'in_progress'
+        ).values(status='completed', score=score, completed_at=now).returning(UserProgress)
+        progress = db.session.scalars(
+            statement, execution_options={'populate_existing': True, 'synchronize_session': False}
+        ).one_or_none()
+    else:
+        progress = _upsert(
+            user_id, activity_id,
+            {'status': 'completed', 'score': score, 'attempts': 1, 'started_at': now, 'completed_at': now},
+            {'status': 'completed', 'score': score, 'completed_at': now},
+            where=table.c.status != 'completed'
+        )
+    if progress is not None:
+        sync_upserted_progress(db.session, user_id, completed_activity_id=activity_id)
+    return progress
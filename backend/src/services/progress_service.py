@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.models.user import User, UserProgress
+from src.services import progress_repository
+from src.services.archive_service import was_completed, archived_activity_ids, archived_progress_stub
+from src.services.catalogue import catalogue, CachedActivity, CachedIsland
+from src.services.event_bus import event_bus, publish_completion, ACTIVITY_STARTED
+from src.services.rollup_service import record_completion
+
+
+class ProgressError(Exception):
+    """A start/complete request the user's state doesn't allow; carries the HTTP status"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def is_unlocked(user: User, island: Optional[CachedIsland]) -> bool:
+    """Islands come from the catalogue, so this never queries"""
+    return island is not None and user.total_points >= island.unlock_requirement
+
+
+def island_activities(user: User, island: CachedIsland) -> List[Dict[str, Any]]:
+    """An island's active activities with the user's progress on each.
+
+    One query for hot progress and one for activities completed in an
+    archived period, which are listed as completed.
+    """
+    activities = catalogue.activities(island.id)
+    activity_ids = [activity.id for activity in activities]
+    progress_by_activity = {
+        progress.activity_id: progress for progress in UserProgress.query.filter(
+            UserProgress.user_id == user.id,
+            UserProgress.activity_id.in_(activity_ids)
+        )
+    }
+    archived = archived_activity_ids(user.id, activity_ids)
+
+    activities_data = []
+    for activity in activities:
+        progress = progress_by_activity.get(activity.id)
+        activity_data = activity.to_dict()
+        if progress:
+            activity_data['progress'] = progress.to_dict()
+        elif activity.id in archived:
+            activity_data['progress'] = archived_progress_stub(user.id, activity.id)
+        else:
+            activity_data['progress'] = None
+        activities_data.append(activity_data)
+    return activities_data
+
+
+def start(user: User, activity: CachedActivity) -> UserProgress:
+    """Mark an activity in progress and count the attempt. The caller commits."""
+    if not is_unlocked(user, catalogue.island(activity.island_id)):
+        raise ProgressError('Island not unlocked', 403)
+
+    progress = progress_repository.start(user.id, activity.id)
+    if progress is None:
+        raise ProgressError('Activity already completed')
+    event_bus.publish(ACTIVITY_STARTED, user.id, activity_id=activity.id)
+    return progress
+
+
+def complete(user: User, activity: CachedActivity, score: int) -> Tuple[UserProgress, int]:
+    """Complete a started activity and award its points; returns the progress and points earned.
+
+    The caller commits.
+    """
+    if not is_unlocked(user, catalogue.island(activity.island_id)):
+        raise ProgressError('Island not unlocked', 403)
+    if was_completed(user.id, activity.id):
+        raise ProgressError('Activity already completed')
+
+    progress = progress_repository.complete(user.id, activity.id, score, require_started=True)
+    if progress is None:
+        completed = UserProgress.query.filter_by(user_id=user.id, activity_id=activity.id, status='completed').first()
+        raise ProgressError('Activity already completed' if completed else 'Activity not started')
+
+    points_earned = activity.points_reward
+    user.total_points += points_earned
+    record_completion(user.id, points_earned, progress.started_at, progress.completed_at)
+    publish_completion(user.id, activity.id, points_earned, score=score)
+    return progress, points_earned
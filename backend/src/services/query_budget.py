@@ -0,0 +1,153 @@
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Tuple
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# off: no counting; log: print budget overruns and N+1 suspects; raise: fail the request
+MODE = os.environ.get('QUERY_BUDGET_MODE', 'log')
+# The same statement shape this many times in one request is reported as N+1
+REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
+
+_IN_LIST = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)|\((?:\s*%\(\w+\)s\s*,)+\s*%\(\w+\)s\s*\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(max_queries: int):
+    """Declare the most statements a view may run per request"""
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def statement_shape(statement: str) -> str:
+    """A statement with IN-lists and inlined numbers collapsed, so repeats group together"""
+    return _NUMBER.sub('N', _IN_LIST.sub('(?)', ' '.join(statement.split())))
+
+
+class QueryStats:
+    """Statements executed while this collector was active"""
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed_seconds = 0.0
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.elapsed_seconds += elapsed
+        self.statements[statement] += 1
+
+    def shapes(self) -> Counter:
+        shapes: Counter = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return shapes
+
+    def repeated(self, threshold: int = REPEAT_THRESHOLD) -> List[Tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes().most_common() if count >= threshold]
+
+
+def _collectors() -> List[QueryStats]:
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    return _local.collectors
+
+
+@contextmanager
+def count_queries():
+    """Collect every statement run by this thread inside the block (tests, scripts)"""
+    stats = QueryStats()
+    _collectors().append(stats)
+    try:
+        yield stats
+    finally:
+        _collectors().remove(stats)
+
+
+@contextmanager
+def uncounted():
+    """Hide the block's statements from every collector (amortised work such as cache reloads)"""
+    saved = _collectors()
+    _local.collectors = []
+    try:
+        yield
+    finally:
+        _local.collectors = saved
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors():
+        conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors()
+    started = conn.info.pop('query_started', None)
+    if not collectors or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+# Every engine (primary, replica, scripts); a no-op unless a collector is active
+event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def _start_request():
+    stats = QueryStats()
+    _collectors().append(stats)
+    g.query_stats = stats
+
+
+def _check_budget(response):
+    stats = g.get('query_stats')
+    if stats is None:
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    budget = getattr(view, 'query_budget', None)
+    repeated = stats.repeated()
+    problems = []
+    if budget is not None and stats.count > budget:
+        problems.append(f"{stats.count} queries (budget {budget})")
+    for shape, count in repeated:
+        problems.append(f"{count}x {shape[:200]}")
+
+    if problems:
+        message = f"Query budget: {request.method} {request.path}: " + '; '.join(problems)
+        # Only declared budgets fail the request; N+1 suspects elsewhere are logged
+        if MODE == 'raise' and budget is not None:
+            raise QueryBudgetExceeded(message)
+        print(message)
+    return response
+
+
+def _end_request(exc=None):
+    stats = g.pop('query_stats', None)
+    if stats is not None and stats in _collectors():
+        _collectors().remove(stats)
+
+
+def init_query_budget(app):
+    """Count statements per request and enforce @query_budget declarations"""
+    if MODE == 'off':
+        return
+    app.before_request(_start_request)
+    app.after_request(_check_budget)
+    app.teardown_request(_end_request)
@@ -0,0 +1,175 @@
+import functools
+import os
+import threading
+import time
+from typing import Optional
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+
+# A user who wrote within this window reads from the primary (read-your-writes)
+STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+# Replicas further behind than this are skipped
+MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+HEALTH_CHECK_SECONDS = 5
+
+LAST_WRITE_KEY = '_db_last_write'
+
+
+def read_only(view):
+    """Mark a view as safe to serve from the read replica.
+
+    When the replica fails during the request (before the next health probe
+    would have noticed), the view runs once more on the primary instead of
+    answering with the replica's error.
+    """
+    @functools.wraps(view)
+    def serve(*args, **kwargs):
+        try:
+            response = view(*args, **kwargs)
+        except Exception:
+            if not g.pop('db_replica_failed', False):
+                raise
+        else:
+            if not g.pop('db_replica_failed', False):
+                return response
+        current_app.extensions['sqlalchemy'].session.rollback()
+        g.pop('db_route', None)
+        return view(*args, **kwargs)
+
+    serve.read_only = True
+    return serve
+
+
+def routed_to_replica() -> bool:
+    """Whether this request's reads currently go to the replica (such requests must not write)"""
+    return has_request_context() and g.get('db_route') == REPLICA_BIND
+
+
+class ReplicaHealth:
+    """Cached reachability and lag of the replica, probed at most every few seconds"""
+
+    def __init__(self, check_seconds: int = HEALTH_CHECK_SECONDS, max_lag_seconds: float = MAX_LAG_SECONDS):
+        self.check_seconds = check_seconds
+        self.max_lag_seconds = max_lag_seconds
+        self.usable = False
+        self.lag_seconds: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_usable(self, engine) -> bool:
+        if time.monotonic() - self._checked_at >= self.check_seconds and self._lock.acquire(blocking=False):
+            try:
+                self._checked_at = time.monotonic()
+                self.lag_seconds = self._probe(engine)
+                self.usable = self.lag_seconds <= self.max_lag_seconds
+            except Exception as e:
+                print(f"Replica unavailable, reading from primary: {e}")
+                self.lag_seconds = None
+                self.usable = False
+            finally:
+                self._lock.release()
+        return self.usable
+
+    def mark_failed(self):
+        self.usable = False
+        self._checked_at = time.monotonic()
+
+    def _probe(self, engine) -> float:
+        with engine.connect() as connection:
+            if connection.dialect.name != 'postgresql':
+                connection.execute(text('SELECT 1'))
+                return 0.0
+            # An idle primary makes replay timestamps look old, so equal LSNs count as caught up
+            lag = connection.execute(text(
+                "SELECT CASE WHEN NOT pg_is_in_recovery() "
+                "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+            )).scalar()
+            return float(lag or 0)
+
+
+replica_health = ReplicaHealth()
+
+
+class RoutingSession(Session):
+    """Sends reads of replica-routed requests to the replica bind; flushes and DML always go to the primary"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and routed_to_replica()
+        ):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _choose_route():
+    g.pop('db_route', None)
+    g.pop('db_wrote', None)
+
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, 'read_only', False):
+        return
+
+    engine = current_app.extensions['sqlalchemy'].engines.get(REPLICA_BIND)
+    if engine is None:
+        return
+
+    last_write = session.get(LAST_WRITE_KEY)
+    if last_write and time.time() - last_write < STICKY_SECONDS:
+        return
+
+    if replica_health.is_usable(engine):
+        g.db_route = REPLICA_BIND
+
+
+def _record_write(response):
+    if g.get('db_wrote') and session.get('user_id'):
+        session[LAST_WRITE_KEY] = time.time()
+    response.headers['X-DB-Route'] = g.get('db_route') or 'primary'
+    return response
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    if has_request_context():
+        # Later reads in this request must see the write
+        g.db_wrote = True
+        g.pop('db_route', None)
+
+
+def configure_read_replica(app):
+    """Add the replica bind from DATABASE_REPLICA_URL (call before db.init_app)"""
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if not replica_url:
+        return
+    if replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica_url
+
+
+def _on_replica_error(context):
+    if context.is_disconnect or context.connection is None:
+        replica_health.mark_failed()
+        if routed_to_replica():
+            # read_only retries the request on the primary
+            g.db_replica_failed = True
+
+
+def init_read_replica(app):
+    """Route read-only endpoints to the replica when one is configured (call after db.init_app)"""
+    with app.app_context():
+        engine = app.extensions['sqlalchemy'].engines.get(REPLICA_BIND)
+    if engine is not None:
+        # Connection failures take the replica out of rotation until the next health probe,
+        # and the request that hit one is retried on the primary
+        event.listen(engine, 'handle_error', _on_replica_error)
+    app.before_request(_choose_route)
+    app.after_request(_record_write)
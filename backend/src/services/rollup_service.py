@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from src.models.user import db, User, UserProgress, UserDailyActivity, ArchivedUserProgress
+from src.services.progress_repository import dialect_insert
+
+# A single completion never counts for more than this many active minutes,
+# so an activity left open overnight doesn't inflate the rollup.
+MAX_ACTIVE_MINUTES_PER_COMPLETION = 60
+
+
+def active_minutes_between(started_at: Optional[datetime], completed_at: Optional[datetime]) -> int:
+    """Minutes spent on an activity, capped per completion"""
+    if not started_at or not completed_at or completed_at < started_at:
+        return 0
+    minutes = int((completed_at - started_at).total_seconds() // 60)
+    return min(minutes, MAX_ACTIVE_MINUTES_PER_COMPLETION)
+
+
+def record_activity(user_id: int, points: int = 0, completions: int = 0,
+                    active_minutes: int = 0, day=None) -> UserDailyActivity:
+    """Add an award to the user's rollup for the day.
+
+    One INSERT ... ON CONFLICT DO UPDATE: the first award of the day creates
+    the row, carrying the streak forward from yesterday's row, and concurrent
+    awards add to it instead of racing into the unique constraint. The caller
+    owns the transaction.
+    """
+    day = day or datetime.utcnow().date()
+    table = UserDailyActivity.__table__
+
+    yesterday_streak = db.select(UserDailyActivity.streak_length).where(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day == day - timedelta(days=1)
+    ).scalar_subquery()
+    statement = dialect_insert(UserDailyActivity).values(
+        user_id=user_id,
+        day=day,
+        points=points,
+        completions=completions,
+        active_minutes=active_minutes,
+        streak_length=db.func.coalesce(yesterday_streak, 0) + 1
+    ).on_conflict_do_update(
+        index_elements=[UserDailyActivity.user_id, UserDailyActivity.day],
+        set_={
+            'points': table.c.points + points,
+            'completions': table.c.completions + completions,
+            'active_minutes': table.c.active_minutes + active_minutes
+        }
+    ).returning(UserDailyActivity)
+    return db.session.scalars(statement, execution_options={'populate_existing': True}).one()
+
+
+def record_completion(user_id: int, points: int, started_at: Optional[datetime] = None,
+                      completed_at: Optional[datetime] = None) -> UserDailyActivity:
+    """Record a completed activity and the points it awarded"""
+    completed_at = completed_at or datetime.utcnow()
+    return record_activity(
+        user_id,
+        points=points,
+        completions=1,
+        active_minutes=active_minutes_between(started_at, completed_at),
+        day=completed_at.date()
+    )
+
+
+def get_current_streak(user_id: int, today=None) -> int:
+    """Length of the user's current run of active days.
+
+    The streak is still alive if the user was last active yesterday.
+    """
+    today = today or datetime.utcnow().date()
+
+    latest = UserDailyActivity.query.filter_by(user_id=user_id).order_by(
+        UserDailyActivity.day.desc()
+    ).first()
+
+    if not latest or latest.day < today - timedelta(days=1):
+        return 0
+    return latest.streak_length
+
+
+def get_window_totals(user_id: int, days: int = 7, today=None) -> Dict[str, int]:
+    """Sum the user's rollups over the last `days` days, including today"""
+    today = today or datetime.utcnow().date()
+
+    totals = db.session.query(
+        db.func.coalesce(db.func.sum(UserDailyActivity.points), 0),
+        db.func.coalesce(db.func.sum(UserDailyActivity.completions), 0),
+        db.func.coalesce(db.func.sum(UserDailyActivity.active_minutes), 0)
+    ).filter(
+        UserDailyActivity.user_id == user_id,
+        UserDailyActivity.day > today - timedelta(days=days),
+        UserDailyActivity.day <= today
+    ).one()
+
+    return {
+        'points': int(totals[0]),
+        'completions': int(totals[1]),
+        'active_minutes': int(totals[2])
+    }
+
+
+def _build_user_rollups(user_id: int, completions: Iterable) -> List[Dict]:
+    """Fold one user's completed progress rows (ordered by time) into daily rows"""
+    by_day: Dict = {}
+    for score, started_at, completed_at in completions:
+        day = completed_at.date()
+        row = by_day.get(day)
+        if row is None:
+            row = by_day[day] = {
+                'user_id': user_id,
+                'day': day,
+                'points': 0,
+                'completions': 0,
+                'active_minutes': 0,
+                'streak_length': 1
+            }
+        row['points'] += score or 0
+        row['completions'] += 1
+        row['active_minutes'] += active_minutes_between(started_at, completed_at)
+
+    rows = [by_day[day] for day in sorted(by_day)]
+    for previous, row in zip(rows, rows[1:]):
+        if row['day'] - previous['day'] == timedelta(days=1):
+            row['streak_length'] = previous['streak_length'] + 1
+    return rows
+
+
+def backfill_rollups(chunk_size: int = 500, report=print) -> int:
+    """Rebuild all daily rollups from completed UserProgress history.
+
+    Users are processed in id-ordered chunks: each chunk's rollups are
+    deleted and re-inserted with one bulk statement, so the command is
+    idempotent and memory stays bounded by the chunk size.
+    """
+    inserted = 0
+    processed_users = 0
+    last_user_id = 0
+
+    while True:
+        user_ids = [row[0] for row in db.session.query(User.id).filter(
+            User.id > last_user_id
+        ).order_by(User.id).limit(chunk_size).all()]
+
+        if not user_ids:
+            break
+
+        first_id, last_user_id = user_ids[0], user_ids[-1]
+
+        # Archived completions keep contributing to streaks and history
+        completions = db.union_all(
+            db.select(
+                UserProgress.user_id,
+                UserProgress.score,
+                UserProgress.started_at,
+                UserProgress.completed_at
+            ).where(
+                UserProgress.user_id.between(first_id, last_user_id),
+                UserProgress.status == 'completed',
+                UserProgress.completed_at.isnot(None)
+            ),
+            db.select(
+                ArchivedUserProgress.user_id,
+                ArchivedUserProgress.score,
+                ArchivedUserProgress.started_at,
+                ArchivedUserProgress.completed_at
+            ).where(
+                ArchivedUserProgress.user_id.between(first_id, last_user_id),
+                ArchivedUserProgress.completed_at.isnot(None)
+            )
+        ).subquery()
+        completions = db.session.query(completions).order_by(completions.c.user_id, completions.c.completed_at)
+
+        rows = []
+        current_user = None
+        current_completions = []
+        for user_id, score, started_at, completed_at in completions:
+            if user_id != current_user:
+                if current_completions:
+                    rows.extend(_build_user_rollups(current_user, current_completions))
+                current_user = user_id
+                current_completions = []
+            current_completions.append((score, started_at, completed_at))
+        if current_completions:
+            rows.extend(_build_user_rollups(current_user, current_completions))
+
+        UserDailyActivity.query.filter(
+            UserDailyActivity.user_id.between(first_id, last_user_id)
+        ).delete(synchronize_session=False)
+        if rows:
+            db.session.execute(db.insert(UserDailyActivity), rows)
+        db.session.commit()
+
+        inserted += len(rows)
+        processed_users += len(user_ids)
+        report(f"Rollups: {processed_users} users processed, {inserted} daily rows written")
+
+    return inserted
@@ -0,0 +1,25 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# '<int:island_id>' and '<int:id>' match the same URLs
+_VARIABLE = re.compile(r'<(?:([a-zA-Z_][a-zA-Z0-9_]*)(?:\([^)]*\))?:)?[a-zA-Z_][a-zA-Z0-9_]*>')
+
+
+def duplicate_rules(app) -> Dict[Tuple[str, str], List[str]]:
+    """(rule, method) pairs served by more than one endpoint; only the first registered would ever run"""
+    endpoints = defaultdict(list)
+    for rule in app.url_map.iter_rules():
+        shape = _VARIABLE.sub(lambda match: f"<{match.group(1) or 'default'}>", rule.rule)
+        for method in rule.methods - {'HEAD', 'OPTIONS'}:
+            endpoints[(shape, method)].append(rule.endpoint)
+    return {key: names for key, names in endpoints.items() if len(names) > 1}
+
+
+def check_unique_rules(app):
+    """Refuse to start when two views claim the same URL and method"""
+    duplicates = duplicate_rules(app)
+    if duplicates:
+        raise RuntimeError('Duplicate URL rules: ' + '; '.join(
+            f"{method} {rule} -> {', '.join(names)}" for (rule, method), names in sorted(duplicates.items())
+        ))
@@ -0,0 +1,224 @@
+import os
+import secrets
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from itsdangerous import BadSignature, Signer
+
+from src.models.user import db, StoredSession
+
+# How often each worker deletes expired sessions as a side effect of saving one
+SWEEP_INTERVAL_SECONDS = 600
+
+
+class LocalSessionBackend:
+    """In-process key-value store; for development and single-worker deployments"""
+
+    def __init__(self):
+        self._records: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> Optional[Tuple[str, datetime]]:
+        with self._lock:
+            record = self._records.get(sid)
+        if record is None or record[1] <= datetime.utcnow():
+            return None
+        return record
+
+    def save(self, sid: str, payload: str, expires_at: datetime):
+        with self._lock:
+            self._records[sid] = (payload, expires_at)
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._records.pop(sid, None)
+
+    def sweep(self) -> int:
+        now = datetime.utcnow()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._records.items() if expires_at <= now]
+            for sid in expired:
+                del self._records[sid]
+        return len(expired)
+
+
+class SQLSessionBackend:
+    """Sessions in the stored_session table.
+
+    Uses its own short transaction on the engine, so saving a session never
+    commits (or is rolled back with) the request's ORM session.
+    """
+
+    def load(self, sid: str) -> Optional[Tuple[str, datetime]]:
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                db.select(StoredSession.data, StoredSession.expires_at).where(
+                    StoredSession.sid == sid,
+                    StoredSession.expires_at > datetime.utcnow()
+                )
+            ).first()
+        return (row.data, row.expires_at) if row else None
+
+    def save(self, sid: str, payload: str, expires_at: datetime):
+        with db.engine.begin() as connection:
+            updated = connection.execute(
+                db.update(StoredSession).where(StoredSession.sid == sid).values(data=payload, expires_at=expires_at)
+            ).rowcount
+            if not updated:
+                connection.execute(db.insert(StoredSession).values(sid=sid, data=payload, expires_at=expires_at))
+
+    def delete(self, sid: str):
+        with db.engine.begin() as connection:
+            connection.execute(db.delete(StoredSession).where(StoredSession.sid == sid))
+
+    def sweep(self) -> int:
+        with db.engine.begin() as connection:
+            return connection.execute(
+                db.delete(StoredSession).where(StoredSession.expires_at <= datetime.utcnow())
+            ).rowcount
+
+
+class ServerSession(SessionMixin):
+    """Session whose data is only fetched from the backend on first access"""
+
+    def __init__(self, backend, sid: Optional[str] = None):
+        self.sid = sid
+        self.expires_at: Optional[datetime] = None
+        self.modified = False
+        self.accessed = False
+        self._backend = backend
+        self._data: Optional[Dict[str, Any]] = None if sid else {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._data is not None
+
+    def _load(self) -> Dict[str, Any]:
+        self.accessed = True
+        if self._data is None:
+            record = self._backend.load(self.sid)
+            if record is None:
+                self.sid = None  # Expired or unknown; a new id is issued on save
+                self._data = {}
+            else:
+                self._data = session_json_serializer.loads(record[0])
+                self.expires_at = record[1]
+        return self._data
+
+    def regenerate(self):
+        """Move the data to a fresh id (call on login to prevent session fixation)"""
+        self._load()
+        if self.sid:
+            self._backend.delete(self.sid)
+        self.sid = None
+        self.modified = True
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def clear(self):
+        self._load().clear()
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data server-side; the cookie holds only a signed, opaque id.
+
+    Requests that never touch `session` (static files, health checks) cost no
+    backend round trip, and a session is only written when it changed or is
+    past half its lifetime.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._last_sweep = time.monotonic()
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request) -> ServerSession:
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        sid = None
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+        return ServerSession(self.backend, sid)
+
+    def save_session(self, app, session: ServerSession, response):
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not session.loaded:
+            return
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime
+        now = datetime.utcnow()
+        needs_refresh = session.expires_at is not None and session.expires_at - now < lifetime / 2
+        if not (session.modified or needs_refresh or session.sid is None):
+            return
+
+        is_new = session.sid is None
+        if is_new:
+            session.sid = secrets.token_urlsafe(32)
+        self.backend.save(session.sid, session_json_serializer.dumps(dict(session)), now + lifetime)
+        # Saved state is now current; a session shared by batched sub-requests is written once per change
+        session.modified = False
+        session.expires_at = now + lifetime
+        self._maybe_sweep()
+
+        if is_new or session.permanent:
+            response.set_cookie(
+                name,
+                self._signer(app).sign(session.sid).decode(),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=domain,
+                path=path,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app)
+            )
+
+    def _maybe_sweep(self):
+        if time.monotonic() - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = time.monotonic()
+        try:
+            self.backend.sweep()
+        except Exception as e:
+            print(f"Session sweep error: {e}")
+
+
+def init_sessions(app):
+    """Install the server-side session interface (SESSION_BACKEND=sql|local, default sql)"""
+    backend_name = os.environ.get('SESSION_BACKEND', 'sql')
+    backend = LocalSessionBackend() if backend_name == 'local' else SQLSessionBackend()
+    app.session_interface = ServerSessionInterface(backend)
+    return app.session_interface
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from typing import List, Tuple
+
+from sqlalchemy import event, text
+
+# How often each process runs a passive WAL checkpoint (0 disables)
+CHECKPOINT_SECONDS = int(os.environ.get('SQLITE_CHECKPOINT_SECONDS', 300))
+
+
+def sqlite_pragmas() -> List[Tuple[str, str]]:
+    """PRAGMAs applied to every new SQLite connection, overridable via SQLITE_* variables"""
+    return [
+        # Readers no longer block the writer and vice versa
+        ('journal_mode', os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        # Durable at checkpoints; safe against corruption in WAL mode, far fewer fsyncs
+        ('synchronous', os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')),
+        # Wait for a competing writer instead of failing with "database is locked"
+        ('busy_timeout', os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+        ('mmap_size', os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+        # Negative values are KiB
+        ('cache_size', os.environ.get('SQLITE_CACHE_SIZE', '-20000')),
+        ('temp_store', os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'))
+    ]
+
+
+def tune_sqlite_connection(dbapi_connection, in_memory: bool = False):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas():
+            if in_memory and name in ('journal_mode', 'mmap_size'):
+                continue
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+class WalCheckpointer:
+    """Background PASSIVE checkpoints so the WAL file doesn't grow between auto-checkpoints"""
+
+    def __init__(self, engine, interval_seconds: int = CHECKPOINT_SECONDS):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # Threads don't survive fork, so each worker process starts its own
+        if self.interval_seconds <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='sqlite-wal-checkpoint', daemon=True).start()
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> Tuple[int, int, int]:
+        """(busy, wal pages, checkpointed pages)"""
+        with self.engine.connect() as connection:
+            return tuple(connection.execute(text(f"PRAGMA wal_checkpoint({mode})")).one())
+
+    def _run(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.interval_seconds)
+            try:
+                self.checkpoint()
+            except Exception as e:
+                print(f"WAL checkpoint error: {e}")
+
+
+def init_sqlite_tuning(app, db):
+    """Tune every SQLite engine of the app (call after db.init_app)"""
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+
+    checkpointers = []
+    for engine in engines:
+        in_memory = engine.url.database in (None, '', ':memory:')
+        checkpointer = None if in_memory else WalCheckpointer(engine)
+
+        def on_connect(dbapi_connection, connection_record, in_memory=in_memory, checkpointer=checkpointer):
+            tune_sqlite_connection(dbapi_connection, in_memory=in_memory)
+            if checkpointer:
+                checkpointer.ensure_started()
+
+        event.listen(engine, 'connect', on_connect)
+        if checkpointer:
+            checkpointers.append(checkpointer)
+
+    app.extensions['sqlite_checkpointers'] = checkpointers
+    return checkpointers
@@ -0,0 +1,276 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.models.user import db, User, UserProgress, UserBadge, Activity, ArchivedUserProgress, ArchivedProgressRollup
+from src.services.catalogue import catalogue
+from src.services.current_user import WRITTEN_VERSIONS_KEY
+
+COUNTER_COLUMNS = ('completed_count', 'in_progress_count', 'badge_count', 'island_bits')
+
+_STATUS_COUNTERS = {
+    'completed': 'completed_count',
+    'in_progress': 'in_progress_count'
+}
+
+
+def has_completed_island(user: User, island_id: int) -> bool:
+    return bool((user.island_bits or 0) >> island_id & 1)
+
+
+def _add_status(deltas, user_id: int, status: Optional[str], amount: int):
+    column = _STATUS_COUNTERS.get(status)
+    if column:
+        deltas[user_id][column] += amount
+
+
+def _touched_users(session) -> Set[int]:
+    """Users whose progress or badges this flush changes (their state_version moves on).
+
+    Users whose own row is flushed are bumped in that UPDATE (see _bump_flushed_users).
+    """
+    touched = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (UserProgress, UserBadge)):
+            if obj in session.new or obj in session.deleted or session.is_modified(obj):
+                touched.add(obj.user_id)
+    touched.discard(None)
+    return touched
+
+
+def _flushed_users(session) -> List[User]:
+    return [obj for obj in session.dirty if isinstance(obj, User) and session.is_modified(obj)]
+
+
+def _collect(session) -> Tuple[Dict[int, Dict[str, int]], set]:
+    """Counter deltas per user and newly completed (user_id, activity_id) pairs in this flush"""
+    deltas: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    completed = set()
+
+    for obj in session.new:
+        if isinstance(obj, UserProgress):
+            _add_status(deltas, obj.user_id, obj.status, 1)
+            if obj.status == 'completed':
+                completed.add((obj.user_id, obj.activity_id))
+        elif isinstance(obj, UserBadge):
+            deltas[obj.user_id]['badge_count'] += 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, UserProgress):
+            continue
+        history = inspect(obj).attrs.status.history
+        if not history.has_changes():
+            continue
+        old_status = history.deleted[0] if history.deleted else None
+        new_status = history.added[0] if history.added else None
+        _add_status(deltas, obj.user_id, old_status, -1)
+        _add_status(deltas, obj.user_id, new_status, 1)
+        if new_status == 'completed':
+            completed.add((obj.user_id, obj.activity_id))
+
+    for obj in session.deleted:
+        if isinstance(obj, UserProgress):
+            history = inspect(obj).attrs.status.history
+            old_status = history.deleted[0] if history.deleted else obj.status
+            _add_status(deltas, obj.user_id, old_status, -1)
+        elif isinstance(obj, UserBadge):
+            deltas[obj.user_id]['badge_count'] -= 1
+
+    return deltas, completed
+
+
+def _completed_activities(first_id: int, last_id: int):
+    """(user_id, activity_id) pairs completed by users in [first_id, last_id], hot or archived"""
+    return db.union(
+        db.select(UserProgress.user_id, UserProgress.activity_id).where(
+            UserProgress.user_id.between(first_id, last_id),
+            UserProgress.status == 'completed'
+        ),
+        db.select(ArchivedUserProgress.user_id, ArchivedUserProgress.activity_id).where(
+            ArchivedUserProgress.user_id.between(first_id, last_id)
+        )
+    ).subquery()
+
+
+def _completed_islands(session, completed: Iterable[Tuple[int, int]]) -> Dict[int, int]:
+    """Island bits to set for users whose completion in this flush finished an island"""
+    masks: Dict[int, int] = defaultdict(int)
+    for user_id, activity_id in completed:
+        activity = catalogue.activity(activity_id)
+        if activity is None:
+            continue
+        island_id = activity.island_id
+        total = len(catalogue.activities(island_id))
+        done_activities = _completed_activities(user_id, user_id)
+        done = session.query(db.func.count(db.distinct(done_activities.c.activity_id))).join(
+            Activity, Activity.id == done_activities.c.activity_id
+        ).filter(
+            Activity.island_id == island_id,
+            Activity.is_active.is_(True)
+        ).scalar()
+        if total and done >= total:
+            masks[user_id] |= 1 << island_id
+    return masks
+
+
+def apply_counter_deltas(session, deltas: Dict[int, Dict[str, int]], island_masks: Dict[int, int] = None,
+                         touched: Iterable[int] = ()):
+    """Apply relative counter changes with atomic UPDATEs in the current transaction.
+
+    Users in `touched` get their state_version bumped even without counter changes.
+    """
+    island_masks = island_masks or {}
+    touched = set(touched)
+    for user_id in set(deltas) | set(island_masks) | touched:
+        values = {
+            column: getattr(User, column) + amount
+            for column, amount in deltas.get(user_id, {}).items() if amount
+        }
+        if island_masks.get(user_id):
+            values['island_bits'] = User.island_bits.op('|')(island_masks[user_id])
+        if values or user_id in touched:
+            values['state_version'] = User.state_version + 1
+        if not values:
+            continue
+        _update_user(session, user_id, values)
+
+
+def _update_user(session, user_id: int, values):
+    state_version = session.execute(
+        db.update(User).where(User.id == user_id).values(**values).returning(User.state_version),
+        execution_options={'synchronize_session': False}
+    ).scalar()
+
+    # Cached user snapshots older than this are dropped once the transaction commits
+    if state_version is not None:
+        session.info.setdefault(WRITTEN_VERSIONS_KEY, {})[user_id] = state_version
+
+    # Keep an already loaded User from serving stale counters
+    user = session.identity_map.get(inspect(User).identity_key_from_primary_key((user_id,)))
+    if user is not None:
+        session.expire(user, list(values))
+
+
+def sync_upserted_progress(session, user_id: int, completed_activity_id: Optional[int] = None):
+    """Counters for a UserProgress row written by an upsert statement, which the flush hook never sees.
+
+    RETURNING only yields the new row, so in_progress_count is recounted from
+    the user's rows (one indexed COUNT in the same UPDATE). An upsert that
+    completed an activity adds it to completed_count and the island bits.
+    """
+    values = {
+        'in_progress_count': db.select(db.func.count(UserProgress.id)).where(
+            UserProgress.user_id == user_id,
+            UserProgress.status == 'in_progress'
+        ).scalar_subquery(),
+        'state_version': User.state_version + 1
+    }
+    if completed_activity_id is not None:
+        values['completed_count'] = User.completed_count + 1
+        mask = _completed_islands(session, {(user_id, completed_activity_id)}).get(user_id)
+        if mask:
+            values['island_bits'] = User.island_bits.op('|')(mask)
+    _update_user(session, user_id, values)
+
+
+@event.listens_for(Session, 'before_flush')
+def _bump_flushed_users(session, flush_context, instances):
+    """Fold the state_version bump into the UPDATE of every modified User row"""
+    for user in _flushed_users(session):
+        user.state_version = User.state_version + 1
+
+
+@event.listens_for(Session, 'after_flush')
+def _maintain_counters(session, flush_context):
+    # eager_defaults fetched the bumped versions with the UPDATE
+    written = session.info.setdefault(WRITTEN_VERSIONS_KEY, {})
+    for user in _flushed_users(session):
+        written[user.id] = user.state_version
+
+    deltas, completed = _collect(session)
+    touched = _touched_users(session)
+    if not deltas and not completed and not touched:
+        return
+    apply_counter_deltas(session, deltas, _completed_islands(session, completed), touched)
+
+
+def check_counters(repair: bool = False, chunk_size: int = 1000, first_id: int = None,
+                   last_id: int = None, report=print) -> int:
+    """Recompute counters from UserProgress/UserBadge (plus archived progress) and report (or repair) drift.
+
+    Users are checked in id-ordered chunks with grouped queries; drifted rows
+    of a chunk are fixed with a single executemany UPDATE.
+    """
+    bounds = db.session.query(db.func.min(User.id), db.func.max(User.id)).one()
+    if bounds[0] is None:
+        return 0
+    low = max(bounds[0], first_id or bounds[0])
+    high = min(bounds[1], last_id or bounds[1])
+
+    island_totals = {island_id: len(catalogue.activities(island_id))
+                     for island_id in {activity.island_id for activity in catalogue.activities()}}
+
+    drifted_total = 0
+    for chunk_start in range(low, high + 1, chunk_size):
+        chunk_end = min(chunk_start + chunk_size - 1, high)
+        in_chunk = UserProgress.user_id.between(chunk_start, chunk_end)
+
+        expected = {
+            user_id: {'completed_count': 0, 'in_progress_count': 0, 'badge_count': 0, 'island_bits': 0}
+            for (user_id,) in db.session.query(User.id).filter(User.id.between(chunk_start, chunk_end))
+        }
+
+        for user_id, status, count in db.session.query(
+            UserProgress.user_id, UserProgress.status, db.func.count(UserProgress.id)
+        ).filter(in_chunk).group_by(UserProgress.user_id, UserProgress.status):
+            column = _STATUS_COUNTERS.get(status)
+            if column and user_id in expected:
+                expected[user_id][column] = count
+
+        # Archived completions still count towards completed_count
+        for user_id, count in db.session.query(
+            ArchivedProgressRollup.user_id, db.func.sum(ArchivedProgressRollup.completed)
+        ).filter(ArchivedProgressRollup.user_id.between(chunk_start, chunk_end)).group_by(ArchivedProgressRollup.user_id):
+            if user_id in expected:
+                expected[user_id]['completed_count'] += int(count or 0)
+
+        for user_id, count in db.session.query(
+            UserBadge.user_id, db.func.count(UserBadge.id)
+        ).filter(UserBadge.user_id.between(chunk_start, chunk_end)).group_by(UserBadge.user_id):
+            if user_id in expected:
+                expected[user_id]['badge_count'] = count
+
+        done_activities = _completed_activities(chunk_start, chunk_end)
+        for user_id, island_id, done in db.session.query(
+            done_activities.c.user_id, Activity.island_id, db.func.count(db.distinct(done_activities.c.activity_id))
+        ).join(Activity, Activity.id == done_activities.c.activity_id).filter(
+            Activity.is_active.is_(True)
+        ).group_by(done_activities.c.user_id, Activity.island_id):
+            if user_id in expected and done >= island_totals.get(island_id, 0) > 0:
+                expected[user_id]['island_bits'] |= 1 << island_id
+
+        drifted = []
+        for row in db.session.query(User.id, *[getattr(User, c) for c in COUNTER_COLUMNS]).filter(
+            User.id.between(chunk_start, chunk_end)
+        ):
+            actual = dict(zip(COUNTER_COLUMNS, row[1:]))
+            if actual != expected[row.id]:
+                drifted.append({'user_id': row.id, **expected[row.id]})
+
+        if drifted and repair:
+            db.session.execute(
+                db.update(User.__table__).where(User.__table__.c.id == db.bindparam('user_id')).values(
+                    **{column: db.bindparam(column) for column in COUNTER_COLUMNS},
+                    state_version=User.__table__.c.state_version + 1
+                ),
+                drifted
+            )
+            db.session.commit()
+
+        drifted_total += len(drifted)
+        report(f"Counters: users {chunk_start}-{chunk_end}, {len(drifted)} drifted"
+               f"{' (repaired)' if drifted and repair else ''}")
+
+    return drifted_total
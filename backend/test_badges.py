@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Badge tests: the earned-badge bitset, concurrent awards and the set-based
+backfill.
+
+Usage:
+  python test_badges.py
+  python -m pytest test_badges.py
+"""
+import sys
+from datetime import datetime, timedelta
+
+from testing_harness import app, add_child, run_tests
+from src.models.user import db, User, UserProgress, Badge, UserBadge
+from src.services.catalogue import catalogue
+from src.services.badge_cache import EarnedBadges, load_earned_badges, store_earned_badges, award_badges
+from src.services.badge_backfill import backfill_badges
+from src.services.rollup_service import record_activity
+from src.routes.gamification import check_and_award_badges
+
+
+def test_earned_badges_bitset_round_trip():
+    earned = EarnedBadges()
+    moments = {9: datetime(2026, 1, 3, 8, 0), 2: datetime(2026, 1, 1, 9, 30), 40: datetime(2026, 2, 1, 12, 0)}
+    for ordinal, moment in moments.items():
+        earned.add(ordinal, moment)
+    earned.add(2, datetime(2030, 1, 1))  # Already earned: keeps the first timestamp
+
+    decoded = EarnedBadges.decode(*earned.encode())
+    assert decoded.count == 3 and not decoded.rebuilt
+    assert [ordinal for ordinal in range(64) if decoded.has(ordinal)] == [2, 9, 40]
+    assert {ordinal: decoded.earned_at(ordinal) for ordinal in moments} == moments
+    assert decoded.earned_at(3) is None
+    assert EarnedBadges().encode() == (b'', b'')
+    assert EarnedBadges.decode(b'', b'').count == 0
+
+
+def test_concurrent_badge_awards_keep_both_bits():
+    user_id = add_child('badge_race')
+    def earned_ids():
+        return {ordinal for ordinal in (first, second) if load_earned_badges(user_id).has(ordinal)}
+
+    with app.app_context():
+        first, second = [badge.id for badge in catalogue.badges_for_theme('superhelte')][:2]
+        # Two evaluations read the same empty set; each app context has its own session
+        assert load_earned_badges(user_id).count == 0
+        db.session.commit()
+        with app.app_context():
+            assert load_earned_badges(user_id).count == 0
+            assert award_badges(user_id, [first], datetime.utcnow()) == [first]
+            db.session.commit()
+        # The other worker's badge is skipped instead of hitting uq_user_badge_user_badge
+        assert award_badges(user_id, [first, second], datetime.utcnow()) == [second]
+        db.session.commit()
+
+        assert earned_ids() == {first, second}
+        assert db.session.get(User, user_id).badge_count == 2
+
+        # A set written from a stale read is rebuilt once it disagrees with badge_count
+        stale = EarnedBadges()
+        stale.add(first, datetime.utcnow())
+        store_earned_badges(user_id, stale)
+        db.session.commit()
+        user = db.session.get(User, user_id)
+        assert load_earned_badges(user_id, badge_count=user.badge_count).count == 2
+        assert check_and_award_badges(user) == []
+        assert earned_ids() == {first, second}
+
+
+def test_badge_backfill_matches_live_award():
+    live_id, backfilled_id = add_child('badge_live'), add_child('badge_backfill')
+    today = datetime.utcnow().date()
+    with app.app_context():
+        for user_id in (live_id, backfilled_id):
+            db.session.get(User, user_id).total_points = 300
+            for activity_id in (1, 2, 3):
+                db.session.add(UserProgress(user_id=user_id, activity_id=activity_id, status='completed', score=5,
+                                            attempts=1, completed_at=datetime.utcnow()))
+            for day in (today - timedelta(days=2), today - timedelta(days=1), today):
+                record_activity(user_id, points=5, completions=2, day=day)
+        db.session.commit()
+
+        live = check_and_award_badges(db.session.get(User, live_id))
+        backfill_badges(report=lambda line: None)
+
+        def earned(user_id):
+            badges = load_earned_badges(user_id)
+            assert UserBadge.query.filter_by(user_id=user_id).count() == badges.count
+            return {badge.id for badge in Badge.query if badges.has(badge.id)}
+
+        assert len(live) >= 2
+        assert earned(backfilled_id) == earned(live_id) == {badge.id for badge in live}
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
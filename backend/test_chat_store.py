@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Chat store tests: keyset paging of ChatMessage rows and the prompt tail.
+
+Usage:
+  python test_chat_store.py
+  python -m pytest test_chat_store.py
+"""
+import sys
+from datetime import datetime
+
+from testing_harness import app, add_child, run_tests
+from src.models.user import db, ChatMessage
+from src.services.chat_store import get_or_create_session, append_message, get_history, get_tail, estimate_tokens
+
+
+def test_chat_history_keyset_pages_and_tail():
+    user_id = add_child('chat_barn')
+    with app.app_context():
+        chat_session = get_or_create_session(user_id, 1)
+        for number in range(1, 46):
+            append_message(chat_session, 'user' if number % 2 else 'assistant', f'besked {number}')
+        # Same timestamp everywhere: paging must rely on seq alone
+        ChatMessage.query.filter_by(session_id=chat_session.id).update({'created_at': datetime(2026, 1, 1)})
+        db.session.commit()
+
+        seen, before, pages = [], None, 0
+        while True:
+            page = get_history(chat_session.id, before_seq=before, limit=10)
+            seen = [message['seq'] for message in page['messages']] + seen
+            pages += 1
+            if not page['has_more']:
+                break
+            before = page['first_seq']
+        assert seen == list(range(1, 46)) and pages == 5
+
+        seen, after = [], 0
+        while after is not None:
+            page = get_history(chat_session.id, after_seq=after, limit=10)
+            seen += [message['seq'] for message in page['messages']]
+            after = page['last_seq'] if page['has_more'] else None
+        assert seen == list(range(1, 46))
+        assert get_history(chat_session.id, after_seq=45)['messages'] == []
+
+        # Newest messages first into the budget, returned oldest first
+        tail = get_tail(chat_session.id, max_messages=12)
+        assert [message['content'] for message in tail] == [f'besked {n}' for n in range(34, 46)]
+        tokens = estimate_tokens('besked 45')
+        assert len(get_tail(chat_session.id, max_tokens=tokens * 3)) == 3
+        # The newest message is always included, even over budget
+        assert [message['content'] for message in get_tail(chat_session.id, max_tokens=1)] == ['besked 45']
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
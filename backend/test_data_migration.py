@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Data migration tests: migrate_to_postgresql.py copying the seeded test
+database into a second SQLite file, interrupted after one chunk and resumed.
+
+Usage:
+  python test_data_migration.py
+  python -m pytest test_data_migration.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+
+from testing_harness import copy_database, run_tests
+
+CHUNK_SIZE = 3
+
+# Runs in a subprocess: the target is the app's DATABASE_URL, read when the app is created
+_INTERRUPTED_MIGRATION = """
+import sys
+import migrate_to_postgresql as migrator
+
+loaded = []
+load_rows = migrator._load_rows
+
+def load_one_chunk(connection, table, columns, rows):
+    if loaded:
+        raise KeyboardInterrupt
+    loaded.append(table.name)
+    load_rows(connection, table, columns, rows)
+
+migrator._load_rows = load_one_chunk
+migrator.migrate(sys.argv[1], int(sys.argv[2]), fresh=False)
+"""
+
+
+def _migrator(target, *args):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{target}')
+    env.pop('QUERY_BUDGET_MODE', None)
+    return subprocess.run([sys.executable, *args], cwd=os.path.dirname(os.path.abspath(__file__)),
+                          env=env, capture_output=True, text=True, timeout=300)
+
+
+def _rows(path):
+    """{table: sorted primary keys} for every data table in a SQLite file"""
+    connection = sqlite3.connect(path)
+    try:
+        tables = [name for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' "
+            "AND name NOT IN ('alembic_version', '_sqlite_migration_progress')"
+        )]
+        rows = {}
+        for table in tables:
+            key = next(column[1] for column in connection.execute(f'PRAGMA table_info("{table}")') if column[5])
+            rows[table] = sorted(value for (value,) in connection.execute(f'SELECT "{key}" FROM "{table}"'))
+        return rows
+    finally:
+        connection.close()
+
+
+def test_interrupted_migration_resumes_with_the_same_ids():
+    source, connection = copy_database('migration-source.db')
+    connection.close()
+    target = os.path.join(tempfile.mkdtemp(prefix='utopai-migration-'), 'target.db')
+
+    interrupted = _migrator(target, '-c', _INTERRUPTED_MIGRATION, source, str(CHUNK_SIZE))
+    assert interrupted.returncode != 0 and 'KeyboardInterrupt' in interrupted.stderr
+
+    # Only the committed chunk is recorded, in the same transaction as its rows
+    status = _migrator(target, 'migrate_to_postgresql.py', 'status')
+    assert status.returncode == 0, status.stderr
+    recorded = [line for line in status.stdout.splitlines() if ' rows' in line and not line.endswith('(done)')]
+    assert len(recorded) == 1 and recorded[0].endswith(f': {CHUNK_SIZE} rows'), status.stdout
+    table = recorded[0].split(':')[0]
+    assert len(_rows(target)[table]) == CHUNK_SIZE
+
+    resumed = _migrator(target, 'migrate_to_postgresql.py', 'migrate', '--source', source,
+                        '--chunk-size', str(CHUNK_SIZE))
+    assert resumed.returncode == 0, resumed.stderr
+    assert 'Resuming migration' in resumed.stdout and 'Migration complete!' in resumed.stdout
+
+    copied, original = _rows(target), _rows(source)
+    # Some tables span several chunks, so the resumed run pages past its recorded key
+    assert max(len(ids) for ids in original.values()) > 2 * CHUNK_SIZE
+    # Every row arrives exactly once with its original primary key
+    assert {name: ids for name, ids in copied.items() if name in original} == original
+    assert '_sqlite_migration_progress' not in {name for (name,) in sqlite3.connect(target).execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
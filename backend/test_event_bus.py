@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Event bus tests: outbox delivery retries and purging delivered events.
+
+Usage:
+  python test_event_bus.py
+  python -m pytest test_event_bus.py
+"""
+import sys
+from datetime import datetime, timedelta
+
+from testing_harness import app, run_tests
+from src.models.user import db, EventOutbox
+from src.services.event_bus import EventBus, THEME_SELECTED
+
+
+def test_failing_subscriber_is_retried_until_failed():
+    bus = EventBus(max_attempts=3)
+    calls = []
+
+    @bus.subscribe(THEME_SELECTED)
+    def failing(event):
+        calls.append(event.id)
+        raise RuntimeError('boom')
+
+    with app.app_context():
+        # Not yet due, so the app's own sweeper leaves it alone between attempts
+        row = EventOutbox(event_type=THEME_SELECTED, payload='{}', status='pending', attempts=0,
+                          available_at=datetime.utcnow() + timedelta(days=1))
+        db.session.add(row)
+        db.session.commit()
+        event_id = row.id
+
+        for attempt in range(1, bus.max_attempts + 1):
+            EventOutbox.query.filter_by(id=event_id).update({'available_at': datetime.utcnow()})
+            db.session.commit()
+            assert bus.deliver(event_id) is False
+            row = db.session.get(EventOutbox, event_id)
+            assert (row.attempts, row.last_error) == (attempt, 'boom')
+        assert row.status == 'failed' and calls == [event_id] * bus.max_attempts
+        assert bus.deliver(event_id) is False and len(calls) == bus.max_attempts
+
+        old = EventOutbox(event_type=THEME_SELECTED, payload='{}', status='delivered', attempts=1,
+                          available_at=datetime.utcnow(), delivered_at=datetime.utcnow() - timedelta(days=30))
+        db.session.add(old)
+        db.session.commit()
+        old_id = old.id
+        assert bus.purge(retain_days=7) >= 1
+        assert db.session.get(EventOutbox, old_id) is None
+        assert db.session.get(EventOutbox, event_id).status == 'failed'
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Progress tests: start/complete rules, the user counters kept beside
+UserProgress, daily activity rollups and archiving of old completions.
+
+Usage:
+  python test_progress.py
+  python -m pytest test_progress.py
+"""
+import sys
+from datetime import date, datetime, timedelta
+
+from testing_harness import app, CHILD, child_client, add_child, run_tests
+from src.models.user import db, User, UserProgress, Island, Activity, UserDailyActivity, ChatSession
+from src.services.catalogue_version import bump_catalogue_version
+from src.services.catalogue import catalogue, CATALOGUE
+from src.services import progress_repository
+from src.services.user_counters import check_counters
+from src.services.archive_service import archive_progress, archive_chats
+from src.services.chat_store import get_or_create_session, append_message
+from src.services.rollup_service import record_activity, get_current_streak, get_window_totals, backfill_rollups
+
+
+def test_locked_island_cannot_be_completed():
+    with app.app_context():
+        island = Island(name='Låst ø', description='Test', order_number=98, unlock_requirement=10 ** 6)
+        db.session.add(island)
+        db.session.flush()
+        activity = Activity(island_id=island.id, name='Låst aktivitet', description='Test',
+                            activity_type='quiz', order_number=1, points_reward=500)
+        db.session.add(activity)
+        bump_catalogue_version(CATALOGUE)
+        db.session.commit()
+        activity_id = activity.id
+    catalogue.invalidate()
+
+    client = child_client()
+    points = client.get('/api/auth/me').get_json()['user']['total_points']
+    assert client.post(f'/api/activities/{activity_id}/complete', json={'score': 5}).status_code == 403
+    assert client.post(f'/api/activities/{activity_id}/submit', json={'answer': 'a'}).status_code == 403
+    assert client.post('/api/gamification/points/award',
+                       json={'activity_id': activity_id, 'points': 500}).status_code == 403
+    assert client.get('/api/auth/me').get_json()['user']['total_points'] == points
+    with app.app_context():
+        assert UserProgress.query.filter_by(activity_id=activity_id).count() == 0
+
+    # Unlocked but never started: nothing to complete
+    assert client.post('/api/activities/5/complete', json={'score': 5}).status_code == 400
+
+
+def test_upserts_keep_counters_in_sync():
+    user_id = add_child('counter_barn')
+    with app.app_context():
+        def counters():
+            user = db.session.get(User, user_id)
+            return user.completed_count, user.in_progress_count
+
+        progress_repository.start(user_id, 1)
+        progress_repository.start(user_id, 2)
+        assert counters() == (0, 2)
+        progress_repository.complete(user_id, 1, 10, require_started=True)
+        assert counters() == (1, 1)
+        # Restarting a completed activity and counting an attempt leave it completed
+        progress_repository.start(user_id, 1)
+        progress_repository.record_attempt(user_id, 1)
+        progress_repository.record_attempt(user_id, 3)
+        assert counters() == (1, 2)
+        db.session.commit()
+        assert check_counters(first_id=user_id, last_id=user_id, report=lambda line: None) == 0
+
+
+def test_check_counters_repairs_drift():
+    user_id = add_child('drift_barn')
+    with app.app_context():
+        progress_repository.start(user_id, 1)
+        progress_repository.complete(user_id, 1, 10, require_started=True)
+        progress_repository.start(user_id, 2)
+        db.session.commit()
+        expected = db.session.get(User, user_id)
+        expected = (expected.completed_count, expected.in_progress_count, expected.badge_count, expected.island_bits)
+
+        db.session.execute(db.update(User).where(User.id == user_id).values(
+            completed_count=40, in_progress_count=-3, badge_count=7, island_bits=0b1110
+        ))
+        db.session.commit()
+
+        def check(repair):
+            return check_counters(repair=repair, first_id=user_id, last_id=user_id, report=lambda line: None)
+
+        assert check(repair=False) == 1
+        assert db.session.get(User, user_id).completed_count == 40  # Reporting alone changes nothing
+        assert check(repair=True) == 1
+        db.session.expire_all()
+        user = db.session.get(User, user_id)
+        assert (user.completed_count, user.in_progress_count, user.badge_count, user.island_bits) == expected == (1, 1, 0, 0)
+        assert check(repair=False) == 0
+
+
+def test_daily_rollups_streak_and_backfill():
+    user_id = add_child('rollup_barn')
+    today = date(2026, 3, 10)
+    with app.app_context():
+        for day in (today - timedelta(days=2), today - timedelta(days=1), today, today):
+            record_activity(user_id, points=5, completions=1, day=day)
+        db.session.commit()
+
+        rollups = UserDailyActivity.query.filter_by(user_id=user_id).order_by(UserDailyActivity.day).all()
+        assert [(r.streak_length, r.points, r.completions) for r in rollups] == [(1, 5, 1), (2, 5, 1), (3, 10, 2)]
+        assert get_current_streak(user_id, today=today) == 3
+        # Still alive the day after, broken after a missed day
+        assert get_current_streak(user_id, today=today + timedelta(days=1)) == 3
+        assert get_current_streak(user_id, today=today + timedelta(days=2)) == 0
+        assert get_window_totals(user_id, days=2, today=today)['points'] == 15
+
+        # Backfill rebuilds the same rows from completed progress alone
+        UserDailyActivity.query.filter_by(user_id=user_id).delete()
+        for activity_id, day in ((1, today - timedelta(days=2)), (2, today - timedelta(days=1)),
+                                 (3, today), (4, today), (5, today + timedelta(days=2))):
+            completed_at = datetime.combine(day, datetime.min.time()) + timedelta(hours=12)
+            db.session.add(UserProgress(user_id=user_id, activity_id=activity_id, status='completed', score=5,
+                                        attempts=1, started_at=completed_at, completed_at=completed_at))
+        db.session.commit()
+        backfill_rollups(chunk_size=1, report=lambda line: None)
+
+        rollups = UserDailyActivity.query.filter_by(user_id=user_id).order_by(UserDailyActivity.day).all()
+        assert [(r.day, r.streak_length, r.points) for r in rollups] == [
+            (today - timedelta(days=2), 1, 5), (today - timedelta(days=1), 2, 5), (today, 3, 10),
+            (today + timedelta(days=2), 1, 5)
+        ]
+
+
+def test_archiving_keeps_completions_readable():
+    user_id = add_child('arkiv_barn')
+    old = datetime(2024, 5, 1)
+    with app.app_context():
+        for activity_id in (1, 2):
+            progress_repository.start(user_id, activity_id)
+            progress_repository.complete(user_id, activity_id, 7, require_started=True)
+        progress_repository.start(user_id, 3)
+        UserProgress.query.filter_by(user_id=user_id, status='completed').update({'completed_at': old})
+        chat_session = get_or_create_session(user_id, 1)
+        append_message(chat_session, 'user', 'gammel besked')
+        ChatSession.query.filter_by(id=chat_session.id).update({'updated_at': old})
+        db.session.commit()
+
+        assert archive_progress(before=datetime(2025, 1, 1), report=lambda line: None) == 2
+        assert archive_chats(before=datetime(2025, 1, 1), report=lambda line: None) == 1
+        assert [p.activity_id for p in UserProgress.query.filter_by(user_id=user_id)] == [3]
+        assert ChatSession.query.filter_by(user_id=user_id).count() == 0
+        assert check_counters(first_id=user_id, last_id=user_id, report=lambda line: None) == 0
+
+        # Restarting an archived completion neither reopens it nor undercounts completions
+        assert progress_repository.start(user_id, 1) is None
+        db.session.commit()
+        assert UserProgress.query.filter_by(user_id=user_id, activity_id=1).count() == 0
+
+    client = app.test_client()
+    assert client.post('/api/auth/login', json={'email': 'arkiv_barn@utopai.dk',
+                                                'password': CHILD['password']}).status_code == 200
+    assert client.post('/api/activities/1/start').status_code == 400
+    assert client.post('/api/gamification/activity/start', json={'activity_id': 2}).status_code == 400
+    # Listings show archived completions as completed, matching the refused start
+    island = next(island for island in client.get('/api/islands').get_json()['islands'] if island['id'] == 1)
+    progress = {activity['id']: activity['progress'] for activity in island['activities']}
+    assert progress[1]['status'] == progress[2]['status'] == 'completed'
+    assert progress[1]['archived'] and progress[2]['archived']
+    assert progress[3]['status'] == 'in_progress' and 'archived' not in progress[3]
+    listed = client.get('/api/islands/1/activities').get_json()['activities']
+    assert {activity['id']: (activity['progress'] or {}).get('status') for activity in listed} == {
+        activity_id: entry and entry['status'] for activity_id, entry in progress.items()
+    }
+    statistics = client.get('/api/gamification/progress').get_json()['statistics']
+    assert (statistics['completed_activities'], statistics['in_progress_activities']) == (2, 1)
+    archived = client.get('/api/gamification/progress/archive').get_json()['progress']
+    assert sorted(row['activity_id'] for row in archived) == [1, 2]
+    history = client.get('/api/activities/1/chat/history?channel=activity&archived=1').get_json()
+    assert [message['content'] for message in history['messages']] == ['gammel besked']
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
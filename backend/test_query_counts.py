@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Query count tests for UTOPAI's hot endpoints.
+
+Each test runs a route against the fresh, seeded SQLite database from
+testing_harness and asserts how many SQL statements it executes, so an N+1
+regression (a query per island, activity or child) fails here instead of in
+production. Budgets declared with @query_budget are enforced in raise mode
+while testing.
+
+Usage:
+  python test_query_counts.py
+  python -m pytest test_query_counts.py
+"""
+import sys
+
+from testing_harness import (app, CHILD, child_client, get_queries, add_activity, add_island_with_activities,
+                             run_tests)
+from src.models.user import db, User, UserProgress, ParentChildRelation
+from src.services.parent_dashboard import dashboard_cache
+from src.services.child_dashboard import leaderboard_cache
+from src.services.current_user import snapshot_cache
+from src.services.query_budget import count_queries
+
+
+def test_leaderboard():
+    leaderboard_cache.clear()
+    assert get_queries(app.test_client(), '/api/gamification/leaderboard') == 2
+    # Served from the TTL cache until it expires
+    assert get_queries(app.test_client(), '/api/gamification/leaderboard') == 0
+    client = app.test_client()
+    etag = client.get('/api/gamification/leaderboard').headers['ETag']
+    with count_queries() as stats:
+        assert client.get('/api/gamification/leaderboard', headers={'If-None-Match': etag}).status_code == 304
+    assert stats.count == 0
+    # Another worker (or the next rebuild) derives the same tag from unchanged rows
+    leaderboard_cache.clear()
+    assert client.get('/api/gamification/leaderboard', headers={'If-None-Match': etag}).status_code == 304
+    # Any write to an active user moves it on
+    with app.app_context():
+        User.query.filter_by(email=CHILD['email']).one().total_points += 1
+        db.session.commit()
+    leaderboard_cache.clear()
+    assert client.get('/api/gamification/leaderboard', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_island_activities_constant_in_activities():
+    client = child_client()
+    before = get_queries(client, '/api/islands/1/activities')
+    add_activity(1)
+    # Session, user, the island's UserProgress rows and its archived completions
+    assert get_queries(client, '/api/islands/1/activities') == before == 4
+
+
+def test_island_map_constant_in_islands_and_activities():
+    client = child_client()
+    before = get_queries(client, '/api/islands')
+    add_island_with_activities(4)
+    after = get_queries(client, '/api/islands')
+    assert client.get('/api/islands').get_json()['islands'][-1]['name'] == 'Ekstra ø'
+    # Session, user, a single UserProgress query and the archived completion ids
+    assert after == before == 4
+
+
+def test_gamification_progress():
+    assert get_queries(child_client(), '/api/gamification/progress') == 4
+
+
+def test_bootstrap_shares_queries():
+    client = child_client()
+    data = client.get('/api/bootstrap').get_json()
+    assert set(data) == {'user', 'user_type', 'islands', 'badges', 'progress', 'leaderboard'}
+    # Session, user, one UserProgress query, archived completion ids, badge set, archived rollups,
+    # leaderboard and its count
+    leaderboard_cache.clear()
+    assert get_queries(client, '/api/bootstrap') == 8
+    assert get_queries(client, '/api/bootstrap?include=islands') == 4
+    assert client.get('/api/bootstrap?include=friends').status_code == 400
+
+
+def test_batch_shares_session_and_identity_map():
+    client = child_client()
+    urls = ['/api/islands', '/api/gamification/leaderboard', '/api/gamification/progress']
+    leaderboard_cache.clear()
+    separate = sum(get_queries(client, url) for url in urls)
+    leaderboard_cache.clear()
+    with count_queries() as stats:
+        response = client.post('/api/batch', json={'requests': [{'path': url} for url in urls]})
+    assert [result['status'] for result in response.get_json()['responses']] == [200, 200, 200]
+    # One session lookup and one user load for the whole batch
+    assert stats.count == 9 < separate
+    assert client.post('/api/batch', json={'requests': [{'path': '/api/batch'}]}).status_code == 400
+
+
+def test_conditional_get_skips_the_view():
+    client = child_client()
+    etag = client.get('/api/islands').headers['ETag']
+    with count_queries() as stats:
+        response = client.get('/api/islands', headers={'If-None-Match': etag})
+    # Session and user (for its state_version) only
+    assert response.status_code == 304 and stats.count == 2
+    assert client.post('/api/gamification/activity/start', json={'activity_id': 3}).status_code == 200
+    assert client.get('/api/islands', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_theme_only_routes_use_the_user_snapshot():
+    client = child_client()
+    assert client.get('/api/auth/me').status_code == 200
+    with count_queries() as stats:
+        assert client.get('/api/activity/1/step/99').status_code == 404
+    # The session lookup only; the theme comes from the worker's snapshot
+    assert stats.count == 1
+
+    for theme in ('prinsesse', 'superhelte'):
+        assert client.post('/api/auth/select-theme', json={'theme': theme}).status_code == 200
+        # The write dropped the snapshot, so the next read loads the user again
+        with count_queries() as stats:
+            client.get('/api/activity/1/step/99')
+        assert stats.count == 2
+        user_id = client.get('/api/auth/me').get_json()['user']['id']
+        assert snapshot_cache.get(user_id).chosen_theme == theme
+
+
+def test_start_and_complete_upsert_progress():
+    client = child_client()
+    for _ in range(2):
+        with count_queries() as stats:
+            assert client.post('/api/activities/2/start').status_code == 200
+        statements = list(stats.statements.elements())
+        writes = [i for i, statement in enumerate(statements) if statement.startswith('INSERT INTO user_progress')]
+        # A single INSERT ... ON CONFLICT, not SELECT-then-INSERT
+        assert len(writes) == 1 and 'ON CONFLICT' in statements[writes[0]]
+        assert not any('FROM user_progress' in statement for statement in statements[:writes[0]])
+    assert client.post('/api/activities/2/complete', json={'score': 5}).status_code == 200
+    assert client.post('/api/activities/2/complete', json={'score': 5}).status_code == 400
+    with app.app_context():
+        user = User.query.filter_by(email=CHILD['email']).one()
+        assert UserProgress.query.filter_by(user_id=user.id, activity_id=2).count() == 1
+
+
+def test_user_write_bumps_state_version_in_the_same_update():
+    client = child_client()
+    for theme in ('prinsesse', 'superhelte'):
+        with count_queries() as stats:
+            assert client.post('/api/auth/select-theme', json={'theme': theme}).status_code == 200
+        user_updates = [statement for statement in stats.statements if statement.startswith('UPDATE user ')]
+        assert len(user_updates) == 1 and 'state_version' in user_updates[0]
+
+
+def test_parent_dashboard_constant_in_children():
+    client = app.test_client()
+    assert client.post('/api/auth/register', json={
+        'child_username': 'querytest', 'child_email': 'querytest@utopai.dk', 'child_password': 'password123',
+        'child_date_of_birth': '2015-05-01', 'parent_email': 'forælder@utopai.dk', 'parent_password': 'password123',
+        'parent_first_name': 'Test', 'parent_last_name': 'Forælder'
+    }).status_code == 201
+    assert client.post('/api/auth/login', json={
+        'email': 'forælder@utopai.dk', 'password': 'password123', 'user_type': 'parent'
+    }).status_code == 200
+
+    one_child = get_queries(client, '/api/parent/dashboard')
+    with app.app_context():
+        relation = ParentChildRelation.query.filter_by(child_id=User.query.filter_by(username='querytest').one().id).one()
+        for child in User.query.filter(User.id != relation.child_id).all():
+            db.session.add(ParentChildRelation(parent_id=relation.parent_id, child_id=child.id))
+        db.session.commit()
+    dashboard_cache.clear()
+    assert get_queries(client, '/api/parent/dashboard') == one_child == 7
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Read replica tests: routing read-only endpoints to the replica,
+read-your-writes stickiness, skipping an unreachable replica and falling
+back to the primary when the replica fails mid-request.
+
+Usage:
+  python test_read_replica.py
+  python -m pytest test_read_replica.py
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from testing_harness import copy_database, run_tests
+
+
+# Runs in a subprocess: the replica bind is read from the environment when the app is created
+_REPLICA_CHECK = """
+import json, time
+from src.main import app
+
+client = app.test_client()
+routes = []
+
+def progress():
+    response = client.get('/api/gamification/progress')
+    routes.append((response.headers['X-DB-Route'], response.get_json()['statistics']['total_points']))
+
+assert client.post('/api/auth/login', json={'email': 'superhelt@utopai.dk', 'password': 'password123'}).status_code == 200
+time.sleep(1.1)
+progress()
+client.post('/api/activities/4/start')
+progress()
+time.sleep(1.1)
+progress()
+print(json.dumps(routes))
+"""
+
+# The replica disappears after a successful read, before the next health probe
+_REPLICA_FAILURE = """
+import json, os, shutil, time
+from src.main import app
+from src.models.user import db
+
+client = app.test_client()
+routes = []
+
+def progress():
+    response = client.get('/api/gamification/progress')
+    points = (response.get_json() or {}).get('statistics', {}).get('total_points')
+    routes.append((response.status_code, response.headers['X-DB-Route'], points))
+
+assert client.post('/api/auth/login', json={'email': 'superhelt@utopai.dk', 'password': 'password123'}).status_code == 200
+time.sleep(1.1)
+progress()
+with app.app_context():
+    db.engines['replica'].dispose()
+shutil.rmtree(os.path.dirname(os.environ['DATABASE_REPLICA_URL'][len('sqlite:///'):]))
+progress()
+progress()
+print(json.dumps(routes))
+"""
+
+
+def _replica_routes(replica_url, script=_REPLICA_CHECK):
+    primary, connection = copy_database('primary.db')
+    connection.close()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{primary}', DATABASE_REPLICA_URL=replica_url,
+               REPLICA_STICKY_SECONDS='1')
+    env.pop('QUERY_BUDGET_MODE', None)
+    result = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    return [tuple(route) for route in json.loads(result.stdout.strip().splitlines()[-1])]
+
+
+def _marked_replica(name):
+    """A copy of the database where the child has a marker score, so each read shows where it came from"""
+    replica, connection = copy_database(name)
+    connection.execute("UPDATE user SET total_points = 4242 WHERE email = 'superhelt@utopai.dk'")
+    connection.commit()
+    connection.close()
+    return replica
+
+
+def test_read_replica_routing_and_stickiness():
+    replica = _marked_replica('replica.db')
+
+    replica_read, after_write, after_sticky_window = _replica_routes(f'sqlite:///{replica}')
+    assert replica_read == ('replica', 4242)
+    # Read-your-writes: the user's next read goes to the primary
+    assert after_write[0] == 'primary' and after_write[1] != 4242
+    assert after_sticky_window == ('replica', 4242)
+
+    # An unreachable replica is skipped
+    unreachable = _replica_routes('sqlite:////nonexistent-dir/replica.db')
+    assert [route for route, _ in unreachable] == ['primary'] * 3
+
+
+def test_replica_failure_mid_request_falls_back_to_the_primary():
+    replica = shutil.move(_marked_replica('failing-replica.db'), tempfile.mkdtemp(prefix='utopai-replica-'))
+    replica_read, failed_over, after_failure = _replica_routes(f'sqlite:///{replica}', _REPLICA_FAILURE)
+    assert replica_read == (200, 'replica', 4242)
+    # The request that hit the failure is answered from the primary, not with a 500
+    assert failed_over[:2] == (200, 'primary') and failed_over[2] != 4242
+    assert after_failure == failed_over
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Route tests: the duplicate-rule startup guard and the dedicated activity
+routes that resolve their activity by slug.
+
+Usage:
+  python test_routes.py
+  python -m pytest test_routes.py
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+from flask import Flask
+
+from testing_harness import app, CHILD, add_child, run_tests
+from src.routes.islands import islands_bp
+from src.routes import activity_1, activity_2
+from src.services.openai_service import openai_service
+from src.services.query_budget import count_queries
+from src.services.route_check import check_unique_rules
+
+_ACTIVITY_QUERY = re.compile(r'\bFROM activity\b')
+
+# Runs in a subprocess on an empty database: rows that exist before 0008 get their slug from the migration
+_SLUG_BACKFILL = """
+import json
+import sqlalchemy as sa
+from flask_migrate import upgrade
+from src.main import app
+from src.models.user import db
+from src.database_init import ISLANDS
+
+with app.app_context():
+    upgrade(revision='0007')
+    island_table = sa.Table('island', sa.MetaData(), autoload_with=db.engine)
+    activity_table = sa.Table('activity', sa.MetaData(), autoload_with=db.engine)
+    with db.engine.begin() as connection:
+        for island in ISLANDS:
+            island_id = connection.execute(island_table.insert().values(
+                {key: value for key, value in island.items() if key in island_table.c}
+            )).inserted_primary_key[0]
+            for activity in island['activities']:
+                connection.execute(activity_table.insert().values(
+                    island_id=island_id, **{key: value for key, value in activity.items() if key in activity_table.c}
+                ))
+    upgrade()
+    with db.engine.connect() as connection:
+        print(json.dumps(dict(connection.execute(sa.text("SELECT name, slug FROM activity")).fetchall())))
+"""
+
+
+def test_duplicate_rules_refuse_to_start():
+    check_unique_rules(app)
+
+    scratch = Flask(__name__)
+    scratch.register_blueprint(islands_bp, url_prefix='/api')
+    check_unique_rules(scratch)
+
+    # Same URL and method under another variable name: only the first view would ever run
+    scratch.add_url_rule('/api/activities/<int:id>/start', 'shadowed_start', lambda id: '', methods=['POST'])
+    try:
+        check_unique_rules(scratch)
+    except RuntimeError as error:
+        assert 'POST /api/activities/<int>/start' in str(error)
+        assert 'islands.start_activity' in str(error) and 'shadowed_start' in str(error)
+    else:
+        raise AssertionError('duplicate rule was accepted')
+
+
+def test_dedicated_activity_routes_resolve_by_slug():
+    add_child('slug_barn')
+    client = app.test_client()
+    assert client.post('/api/auth/login', json={'email': 'slug_barn@utopai.dk',
+                                                'password': CHILD['password']}).status_code == 200
+
+    intros = {name: getattr(openai_service, name) for name in ('generate_activity_1_intro', 'generate_activity_2_intro')}
+    for name in intros:
+        setattr(openai_service, name, lambda theme: {'welcome_message': 'Hej'})
+    try:
+        for number, module in ((1, activity_1), (2, activity_2)):
+            with count_queries() as stats:
+                response = client.post(f'/api/activity/{number}/start')
+            assert response.status_code == 200, response.get_json()
+            assert response.get_json()['activity']['slug'] == module.ACTIVITY_SLUG
+            # The activity comes from the in-process catalogue, not the database
+            assert not any(_ACTIVITY_QUERY.search(statement) for statement in stats.statements)
+    finally:
+        for name, method in intros.items():
+            setattr(openai_service, name, method)
+
+
+def test_slug_backfill_matches_dedicated_routes():
+    database = os.path.join(tempfile.mkdtemp(prefix='utopai-slugs-'), 'slugs.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}')
+    env.pop('QUERY_BUDGET_MODE', None)
+    result = subprocess.run([sys.executable, '-c', _SLUG_BACKFILL], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+
+    slugs = json.loads(result.stdout.strip().splitlines()[-1])
+    assert slugs['Hvad er ChatGPT?'] == activity_1.ACTIVITY_SLUG
+    assert slugs['Dit første prompt'] == activity_2.ACTIVITY_SLUG
+    assert len(set(slugs.values())) == len(slugs)
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
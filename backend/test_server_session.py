@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Server-side session tests: the opaque cookie id, regeneration on login,
+tampering, expiry and logout.
+
+Usage:
+  python test_server_session.py
+  python -m pytest test_server_session.py
+"""
+import sys
+from datetime import datetime
+
+from testing_harness import app, CHILD, child_client, run_tests
+from src.models.user import db, StoredSession
+
+
+def test_server_session_lifecycle():
+    name = app.config['SESSION_COOKIE_NAME']
+    client = child_client()
+    first = client.get_cookie(name).value
+    sid = first.rsplit('.', 1)[0]
+    with app.app_context():
+        # The cookie only carries the signed id; the data lives server-side
+        assert db.session.get(StoredSession, sid) is not None
+    assert client.get('/api/auth/me').status_code == 200
+
+    # Logging in again moves the data to a fresh id and drops the old one
+    assert client.post('/api/auth/login', json=CHILD).status_code == 200
+    second = client.get_cookie(name).value
+    assert second != first
+    with app.app_context():
+        assert db.session.get(StoredSession, sid) is None
+    fixated = app.test_client()
+    fixated.set_cookie(name, first)
+    assert fixated.get('/api/auth/me').status_code == 401
+
+    # A tampered signature or id is treated as no session
+    for tampered in (second[:-2] + ('AA' if second[-2:] != 'AA' else 'BB'), 'x' + second):
+        forged = app.test_client()
+        forged.set_cookie(name, tampered)
+        assert forged.get('/api/auth/me').status_code == 401
+
+    # Expired sessions are not loaded, and the sweep deletes them
+    with app.app_context():
+        StoredSession.query.filter_by(sid=second.rsplit('.', 1)[0]).update({'expires_at': datetime(2000, 1, 1)})
+        db.session.commit()
+    assert client.get('/api/auth/me').status_code == 401
+    with app.app_context():
+        assert app.session_interface.backend.sweep() >= 1
+        assert db.session.get(StoredSession, second.rsplit('.', 1)[0]) is None
+
+    # Logout deletes the stored session
+    client = child_client()
+    sid = client.get_cookie(name).value.rsplit('.', 1)[0]
+    assert client.post('/api/auth/logout').status_code == 200
+    with app.app_context():
+        assert db.session.get(StoredSession, sid) is None
+    assert client.get('/api/auth/me').status_code == 401
+
+
+if __name__ == '__main__':
+    sys.exit(run_tests(globals()))
@@ -0,0 +1,103 @@
+"""
+Shared setup for the backend test modules (test_*.py in this directory).
+
+Importing this module points DATABASE_URL at a fresh SQLite file, migrates
+and seeds it, and puts @query_budget in raise mode. Every test module in a
+run shares that database and the app, so tests create their own children
+(add_child) when they need state nobody else touches.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+_database = os.path.join(tempfile.mkdtemp(prefix='utopai-tests-'), 'test.db')
+os.environ['DATABASE_URL'] = f"sqlite:///{_database}"
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ['QUERY_BUDGET_MODE'] = 'raise'
+
+from flask_migrate import upgrade
+
+from src.main import app
+from src.database_init import seed_database
+from src.models.user import db, User, Island, Activity
+from src.services.catalogue_version import bump_catalogue_version
+from src.services.catalogue import catalogue, CATALOGUE
+from src.services.query_budget import count_queries
+
+CHILD = {'email': 'superhelt@utopai.dk', 'password': 'password123'}
+
+app.config['TESTING'] = True
+with app.app_context():
+    upgrade()
+    seed_database(with_test_users=True, report=lambda line: None)
+
+
+def child_client():
+    client = app.test_client()
+    assert client.post('/api/auth/login', json=CHILD).status_code == 200
+    return client
+
+
+def get_queries(client, url):
+    with count_queries() as stats:
+        response = client.get(url)
+    assert response.status_code == 200, response.get_json()
+    return stats.count
+
+
+def add_activity(island_id):
+    with app.app_context():
+        db.session.add(Activity(island_id=island_id, name='Ekstra aktivitet', description='Test',
+                                activity_type='quiz', order_number=99, points_reward=10))
+        bump_catalogue_version(CATALOGUE)
+        db.session.commit()
+    catalogue.invalidate()
+
+
+def add_island_with_activities(count):
+    with app.app_context():
+        island = Island(name='Ekstra ø', description='Test', order_number=99, unlock_requirement=0)
+        db.session.add(island)
+        db.session.flush()
+        for order in range(1, count + 1):
+            db.session.add(Activity(island_id=island.id, name=f'Aktivitet {order}', description='Test',
+                                    activity_type='quiz', order_number=order, points_reward=10))
+        bump_catalogue_version(CATALOGUE)
+        db.session.commit()
+    catalogue.invalidate()
+
+
+def add_child(username):
+    with app.app_context():
+        user = User(username=username, email=f'{username}@utopai.dk', chosen_theme='superhelte')
+        user.set_password(CHILD['password'])
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+def copy_database(name):
+    """Consistent copy of the test database (WAL contents included)"""
+    path = os.path.join(os.path.dirname(_database), name)
+    source, target = sqlite3.connect(_database), sqlite3.connect(path)
+    source.backup(target)
+    source.close()
+    return path, target
+
+
+def run_tests(namespace) -> int:
+    """Run a module's test_* functions in name order (for `python test_<module>.py`)"""
+    tests = [(name, test) for name, test in sorted(namespace.items()) if name.startswith('test_') and callable(test)]
+    failed = 0
+    for name, test in tests:
+        try:
+            test()
+            print(f"✅ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    return 1 if failed else 0
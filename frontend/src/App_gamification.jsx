@@ -47,6 +47,28 @@ const api = {
   }
 };
 
+// Badges are awarded by the backend shortly after the points are committed,
+// so new badges are found by comparing the earned list before and after.
+const BADGE_POLL_ATTEMPTS = 3;
+const BADGE_POLL_DELAY_MS = 400;
+
+const fetchEarnedBadges = async () => {
+  const response = await api.get('/gamification/badges');
+  return response.badges.filter(badge => badge.earned);
+};
+
+const waitForNewBadges = async (earnedBefore) => {
+  const earnedIds = new Set(earnedBefore.map(badge => badge.id));
+  for (let attempt = 0; attempt < BADGE_POLL_ATTEMPTS; attempt++) {
+    await new Promise(resolve => setTimeout(resolve, BADGE_POLL_DELAY_MS));
+    const newBadges = (await fetchEarnedBadges()).filter(badge => !earnedIds.has(badge.id));
+    if (newBadges.length > 0) {
+      return newBadges;
+    }
+  }
+  return [];
+};
+
 function App() {
   const [currentView, setCurrentView] = useState('login');
   const [user, setUser] = useState(null);
@@ -102,6 +124,8 @@ function App() {
 
   const simulateActivityCompletion = async () => {
     try {
+      const earnedBefore = await fetchEarnedBadges();
+
       // Simulate completing an activity
       const response = await api.post('/gamification/points/award', {
         activity_id: 1,
@@ -115,10 +139,11 @@ function App() {
       }));
 
       // Show achievement notification if there are new badges
-      if (response.new_badges && response.new_badges.length > 0) {
+      const newBadges = await waitForNewBadges(earnedBefore);
+      if (newBadges.length > 0) {
         setAchievementNotification({
           visible: true,
-          badges: response.new_badges,
+          badges: newBadges,
           points: response.points_awarded
         });
       } else {